@@ -7,7 +7,7 @@ API路由主文件
 
 from fastapi import APIRouter
 
-from app.api.endpoints import students, schools, study_plans, web
+from app.api.endpoints import students, schools, study_plans, metrics, web
 
 api_router = APIRouter()
 
@@ -17,6 +17,7 @@ api_router.include_router(schools.router, prefix="/api/schools", tags=["schools"
 api_router.include_router(
     study_plans.router, prefix="/api/study_plans", tags=["study_plans"]
 )
+api_router.include_router(metrics.router, prefix="/api/metrics", tags=["metrics"])
 
 # 注册Web页面路由
 api_router.include_router(web.router, tags=["web"])
@@ -0,0 +1,44 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+运行指标API端点
+"""
+
+from fastapi import APIRouter
+
+from app.services.llm_prompts import token_usage
+from app.services.llm_service import llm_breaker, llm_latency
+from app.services.plan_template_cache import plan_template_cache
+
+router = APIRouter()
+
+
+@router.get("/llm_tokens")
+async def get_llm_token_usage(recent: int = 20):
+    """获取LLM请求的token用量统计"""
+    return token_usage.snapshot(recent=recent)
+
+
+@router.get("/llm_breaker")
+async def get_llm_breaker_state():
+    """获取LLM熔断器状态与延迟分位数"""
+    return {
+        **llm_breaker.snapshot(),
+        "latency_samples": len(llm_latency),
+        "latency_p50": llm_latency.percentile(50),
+        "latency_p95": llm_latency.percentile(95),
+    }
+
+
+@router.get("/study_plan_cache")
+async def get_study_plan_cache_stats():
+    """获取学习计划模板缓存命中率等统计"""
+    return plan_template_cache.stats()
+
+
+@router.delete("/study_plan_cache")
+async def clear_study_plan_cache():
+    """清空学习计划模板缓存"""
+    plan_template_cache.clear()
+    return {"message": "学习计划模板缓存已清空"}
@@ -5,7 +5,7 @@
 学校API端点
 """
 
-from typing import List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
@@ -14,12 +14,48 @@ from app.db.base import get_db
 from app.models.school import School
 from app.models.major import Major
 from app.models.score_line import ScoreLine
-from app.schemas.school import School as SchoolSchema, SchoolDetail
+from app.models.score_forecast import ScoreForecast
+from app.schemas.school import (
+    School as SchoolSchema,
+    SchoolDetail,
+    SchoolFilterRequest,
+    SchoolFilterResult,
+)
 from app.schemas.major import Major as MajorSchema
+from app.services.school_bitmap_index import BitmapFilterError, school_bitmap_index
 
 router = APIRouter()
 
 
+async def _filter_schools(
+    db: AsyncSession,
+    expression: Optional[Dict[str, Any]],
+    name: Optional[str],
+    skip: int,
+    limit: int,
+) -> Tuple[int, List[School]]:
+    """按位图索引筛选学校，返回(总数, 当前页学校)，结果按排名排序"""
+    await school_bitmap_index.ensure_fresh(db)
+    try:
+        bitmap = school_bitmap_index.evaluate(expression)
+    except BitmapFilterError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    # 名称为模糊匹配，交由数据库查询后再与位图求交
+    if name:
+        result = await db.execute(select(School.id).filter(School.name.contains(name)))
+        bitmap &= school_bitmap_index.bitmap_of(result.scalars().all())
+
+    page_ids = school_bitmap_index.ids(bitmap, skip=skip, limit=limit)
+    if not page_ids:
+        return school_bitmap_index.count(bitmap), []
+
+    result = await db.execute(select(School).filter(School.id.in_(page_ids)))
+    by_id = {school.id: school for school in result.scalars().all()}
+    schools = [by_id[school_id] for school_id in page_ids if school_id in by_id]
+    return school_bitmap_index.count(bitmap), schools
+
+
 @router.get("/", response_model=List[SchoolSchema])
 async def get_schools(
     skip: int = 0,
@@ -32,28 +68,32 @@ async def get_schools(
     db: AsyncSession = Depends(get_db),
 ):
     """获取学校列表"""
-    query = select(School)
-
     # 应用过滤条件
-    if name:
-        query = query.filter(School.name.contains(name))
+    expression: Dict[str, Any] = {}
     if province:
-        query = query.filter(School.province == province)
+        expression["province"] = province
     if is_985 is not None:
-        query = query.filter(School.is_985 == is_985)
+        expression["is_985"] = is_985
     if is_211 is not None:
-        query = query.filter(School.is_211 == is_211)
+        expression["is_211"] = is_211
     if type:
-        query = query.filter(School.type == type)
+        expression["type"] = type
 
-    # 默认按排名排序
-    query = query.order_by(School.rank)
-
-    result = await db.execute(query.offset(skip).limit(limit))
-    schools = result.scalars().all()
+    _, schools = await _filter_schools(db, expression, name, skip, limit)
     return schools
 
 
+@router.post("/filter", response_model=SchoolFilterResult)
+async def filter_schools(
+    request: SchoolFilterRequest, db: AsyncSession = Depends(get_db)
+):
+    """按任意AND/OR/NOT组合条件筛选学校"""
+    total, schools = await _filter_schools(
+        db, request.filter, request.name, request.skip, request.limit
+    )
+    return {"total": total, "items": schools}
+
+
 @router.get("/{school_id}", response_model=SchoolDetail)
 async def get_school(school_id: int, db: AsyncSession = Depends(get_db)):
     """获取学校详细信息"""
@@ -142,6 +182,48 @@ async def get_school_score_lines(
     ]
 
 
+@router.get("/{school_id}/score_forecasts")
+async def get_school_score_forecasts(
+    school_id: int,
+    province: Optional[str] = None,
+    major_id: Optional[int] = None,
+    db: AsyncSession = Depends(get_db),
+):
+    """获取学校下一年分数线预测"""
+    result = await db.execute(select(School).filter(School.id == school_id))
+    school = result.scalars().first()
+
+    if not school:
+        raise HTTPException(status_code=404, detail="学校不存在")
+
+    query = select(ScoreForecast).filter(ScoreForecast.school_id == school_id)
+
+    if province:
+        query = query.filter(ScoreForecast.province == province)
+    if major_id:
+        query = query.filter(ScoreForecast.major_id == major_id)
+    else:
+        # 默认查询学校总体分数线预测
+        query = query.filter(ScoreForecast.major_id == None)
+
+    result = await db.execute(query.order_by(ScoreForecast.province))
+    return [
+        {
+            "school_id": f.school_id,
+            "major_id": f.major_id,
+            "province": f.province,
+            "year": f.year,
+            "predicted_score": f.predicted_score,
+            "std_error": f.std_error,
+            "slope": f.slope,
+            "n_years": f.n_years,
+            "last_year": f.last_year,
+            "last_score": f.last_score,
+        }
+        for f in result.scalars().all()
+    ]
+
+
 @router.get("/compare")
 async def compare_schools(
     school_ids: List[int] = Query(...), db: AsyncSession = Depends(get_db)
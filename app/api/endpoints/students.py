@@ -18,7 +18,7 @@ from app.schemas.student import (
     Student as StudentSchema,
     StudentDetail,
 )
-from app.schemas.recommendation import RecommendRequest
+from app.schemas.recommendation import PairRecommendRequest, RecommendRequest
 from app.services.recommender import SchoolRecommender
 
 router = APIRouter()
@@ -123,6 +123,36 @@ async def recommend_schools(
         include_majors=request.include_majors,
         prefer_provinces=request.prefer_provinces,
         prefer_school_types=request.prefer_school_types,
+        school_filter=request.school_filter,
+        matching=request.matching,
+        student_rank=request.student_rank,
+        simulation_seed=request.simulation_seed,
     )
 
     return recommendations
+
+
+@router.post("/{student_id}/recommend_pairs")
+async def recommend_pairs(
+    student_id: int, request: PairRecommendRequest, db: AsyncSession = Depends(get_db)
+):
+    """为学生推荐院校×专业组合"""
+    result = await db.execute(select(Student).filter(Student.id == student_id))
+    student = result.scalars().first()
+
+    if not student:
+        raise HTTPException(status_code=404, detail="学生不存在")
+
+    recommender = SchoolRecommender(db)
+    recommendations = await recommender.recommend_pairs(
+        student_id=student_id,
+        strategy=request.strategy,
+        num_recommendations=request.num_recommendations,
+        school_filter=request.school_filter,
+        simulation_seed=request.simulation_seed,
+    )
+
+    if recommendations["status"] == "error":
+        raise HTTPException(status_code=400, detail=recommendations["message"])
+
+    return recommendations
@@ -5,19 +5,41 @@
 学习计划API端点
 """
 
+from datetime import date, timedelta
 from typing import List, Optional
 from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import delete
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 
+from app.core.config import settings
 from app.db.base import get_db
 from app.models.student import Student
-from app.models.study_plan import StudyPlan
+from app.models.study_plan import (
+    StudyPlan,
+    StudyPlanTaskOverride,
+    StudyPlanProgressEvent,
+    StudyPlanProgressSummary,
+)
 from app.schemas.study_plan import (
     StudyPlanCreate,
     StudyPlan as StudyPlanSchema,
     StudyPlanDetail,
     StudyPlanRequest,
+    BulkStudyPlanRequest,
+    DailyTask,
+    DailyTaskWindow,
+    DailyTaskUpdate,
+    ProgressUpdate,
+    ProgressSummary,
+)
+from app.services.daily_tasks import DailyTaskExpander
+from app.services.progress_tracker import (
+    ProgressEventError,
+    ensure_task_override,
+    get_progress,
+    record_progress,
+    set_task_completed,
 )
 from app.services.study_plan_generator import StudyPlanGenerator
 
@@ -51,6 +73,38 @@ async def generate_study_plan(
     return plan
 
 
+@router.post("/bulk_generate", response_model=dict)
+async def bulk_generate_study_plans(
+    request: BulkStudyPlanRequest, db: AsyncSession = Depends(get_db)
+):
+    """为一批学生批量生成学习计划
+
+    各批次的进度（已处理数、成功/失败数、耗时）在返回结果的batches字段中
+    """
+    if not request.student_ids and not request.province and not request.current_school:
+        raise HTTPException(status_code=400, detail="请指定学生ID列表或筛选条件")
+
+    generator = StudyPlanGenerator(
+        db,
+        llm_concurrency=request.concurrency or settings.STUDY_PLAN_BULK_CONCURRENCY,
+        dedupe_requests=True,
+    )
+    result = await generator.generate_bulk_study_plans(
+        student_ids=request.student_ids,
+        province=request.province,
+        current_school=request.current_school,
+        plan_type=request.plan_type,
+        duration=request.duration,
+        focus_subjects=request.focus_subjects,
+        target_score=request.target_score,
+        target_schools=request.target_schools,
+        target_majors=request.target_majors,
+        batch_size=request.batch_size,
+    )
+
+    return result
+
+
 @router.get("/", response_model=List[StudyPlanSchema])
 async def get_study_plans(
     student_id: Optional[int] = None,
@@ -91,21 +145,15 @@ async def get_study_plan(plan_id: int, db: AsyncSession = Depends(get_db)):
 
 @router.put("/{plan_id}", response_model=StudyPlanSchema)
 async def update_study_plan(plan_id: int, db: AsyncSession = Depends(get_db)):
-    """更新学习计划（标记完成情况等）"""
+    """更新学习计划（打卡，详细进度请使用 /{plan_id}/progress）"""
     result = await db.execute(select(StudyPlan).filter(StudyPlan.id == plan_id))
     plan = result.scalars().first()
 
     if not plan:
         raise HTTPException(status_code=404, detail="学习计划不存在")
 
-    # 更新进度跟踪信息
-    if not plan.progress_tracking:
-        plan.progress_tracking = {}
-
-    plan.progress_tracking["last_updated"] = "now()"  # 实际应使用datetime.now()的字符串
-
-    await db.commit()
-    await db.refresh(plan)
+    # 记录一次打卡进度事件（不再改写计划记录中的进度JSON）
+    await record_progress(db, plan_id, [{"event_type": "check_in"}])
 
     return plan
 
@@ -119,7 +167,131 @@ async def delete_study_plan(plan_id: int, db: AsyncSession = Depends(get_db)):
     if not plan:
         raise HTTPException(status_code=404, detail="学习计划不存在")
 
+    for model in [
+        StudyPlanTaskOverride,
+        StudyPlanProgressEvent,
+        StudyPlanProgressSummary,
+    ]:
+        await db.execute(delete(model).where(model.plan_id == plan_id))
     await db.delete(plan)
     await db.commit()
 
     return {"message": "学习计划删除成功"}
+
+
+@router.get("/{plan_id}/daily_tasks", response_model=DailyTaskWindow)
+async def get_daily_tasks(
+    plan_id: int,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    db: AsyncSession = Depends(get_db),
+):
+    """获取日期范围内的每日任务（由周安排模板惰性展开）"""
+    result = await db.execute(select(StudyPlan).filter(StudyPlan.id == plan_id))
+    plan = result.scalars().first()
+
+    if not plan:
+        raise HTTPException(status_code=404, detail="学习计划不存在")
+
+    expander = DailyTaskExpander(plan)
+    max_days = settings.STUDY_PLAN_TASK_WINDOW_DAYS
+
+    # 默认从计划开始日起展开一周
+    start = start or expander.start_date
+    end = end or start + timedelta(days=6)
+    if end < start:
+        raise HTTPException(status_code=400, detail="结束日期不能早于开始日期")
+    if (end - start).days + 1 > max_days:
+        raise HTTPException(status_code=400, detail=f"单次最多查询{max_days}天的任务")
+
+    start, end = expander.clamp(start, end)
+    overrides = []
+    if start <= end:
+        result = await db.execute(
+            select(StudyPlanTaskOverride).filter(
+                StudyPlanTaskOverride.plan_id == plan_id,
+                StudyPlanTaskOverride.date >= start,
+                StudyPlanTaskOverride.date <= end,
+            )
+        )
+        overrides = result.scalars().all()
+
+    return {
+        "plan_id": plan_id,
+        "plan_start": expander.start_date,
+        "plan_end": expander.end_date,
+        "start_date": start,
+        "end_date": end,
+        "days": expander.expand(start, end, overrides),
+    }
+
+
+@router.put("/{plan_id}/daily_tasks/{task_date}", response_model=DailyTask)
+async def update_daily_task(
+    plan_id: int,
+    task_date: date,
+    update: DailyTaskUpdate,
+    db: AsyncSession = Depends(get_db),
+):
+    """修改某天的任务或标记完成（只存储覆盖记录）"""
+    result = await db.execute(select(StudyPlan).filter(StudyPlan.id == plan_id))
+    plan = result.scalars().first()
+
+    if not plan:
+        raise HTTPException(status_code=404, detail="学习计划不存在")
+
+    expander = DailyTaskExpander(plan)
+    if not expander.start_date <= task_date <= expander.end_date:
+        raise HTTPException(status_code=400, detail="日期不在计划周期内")
+
+    # 完成状态以条件UPDATE修改，状态确有变化时在同一事务中追加进度事件
+    if update.completed is not None:
+        await set_task_completed(db, plan_id, task_date, update.completed)
+    else:
+        await ensure_task_override(db, plan_id, task_date)
+
+    result = await db.execute(
+        select(StudyPlanTaskOverride).filter(
+            StudyPlanTaskOverride.plan_id == plan_id,
+            StudyPlanTaskOverride.date == task_date,
+        )
+    )
+    override = result.scalars().first()
+    if update.reset_tasks:
+        override.tasks = None
+    elif update.tasks is not None:
+        override.tasks = update.tasks
+    if update.note is not None:
+        override.note = update.note
+    await db.commit()
+
+    return expander.apply_override(expander.expand_day(task_date), override)
+
+
+@router.post("/{plan_id}/progress", response_model=ProgressSummary)
+async def report_progress(
+    plan_id: int, update: ProgressUpdate, db: AsyncSession = Depends(get_db)
+):
+    """上报进度事件（完成任务、记录学习时长等），增量更新进度汇总"""
+    result = await db.execute(select(StudyPlan.id).filter(StudyPlan.id == plan_id))
+    if result.scalar() is None:
+        raise HTTPException(status_code=404, detail="学习计划不存在")
+
+    try:
+        await record_progress(db, plan_id, [e.dict() for e in update.events])
+    except ProgressEventError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return await get_progress(db, plan_id, recent=0)
+
+
+@router.get("/{plan_id}/progress", response_model=ProgressSummary)
+async def get_plan_progress(
+    plan_id: int, recent: int = 20, db: AsyncSession = Depends(get_db)
+):
+    """获取学习计划进度汇总与最近的进度事件"""
+    result = await db.execute(select(StudyPlan.id).filter(StudyPlan.id == plan_id))
+    if result.scalar() is None:
+        raise HTTPException(status_code=404, detail="学习计划不存在")
+
+    return await get_progress(db, plan_id, recent=recent)
@@ -25,6 +25,92 @@ class Settings(BaseSettings):
     # LLM配置
     OPENAI_API_KEY: Optional[str] = os.getenv("OPENAI_API_KEY")
     DEFAULT_MODEL: str = os.getenv("DEFAULT_MODEL", "gpt-3.5-turbo")
+    # OpenAI兼容接口地址，可指向本地桩服务（scripts/llm_stub_server.py）做离线压测
+    OPENAI_API_BASE: str = os.getenv("OPENAI_API_BASE", "https://api.openai.com/v1")
+    # 单次请求用户消息的token预算（超出时截断职业目标等长文本字段）
+    LLM_PROMPT_TOKEN_BUDGET: int = int(os.getenv("LLM_PROMPT_TOKEN_BUDGET", "400"))
+    LLM_MAX_TOKENS: int = int(os.getenv("LLM_MAX_TOKENS", "2000"))
+    LLM_TIMEOUT_SECONDS: float = float(os.getenv("LLM_TIMEOUT_SECONDS", "30"))
+
+    # LLM熔断与对冲请求配置
+    # 连续失败多少次后熔断
+    LLM_BREAKER_FAILURE_THRESHOLD: int = int(os.getenv("LLM_BREAKER_FAILURE_THRESHOLD", "5"))
+    # 熔断后多久进入半开探测
+    LLM_BREAKER_RECOVERY_SECONDS: float = float(os.getenv("LLM_BREAKER_RECOVERY_SECONDS", "30"))
+    LLM_HEDGE_ENABLED: bool = os.getenv("LLM_HEDGE_ENABLED", "false").lower() == "true"
+    # 使用p95延迟作为对冲延迟所需的最少样本数
+    LLM_HEDGE_MIN_SAMPLES: int = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20"))
+    # 样本不足时的对冲延迟
+    LLM_HEDGE_DEFAULT_DELAY_SECONDS: float = float(
+        os.getenv("LLM_HEDGE_DEFAULT_DELAY_SECONDS", "5")
+    )
+
+    # 多学科计划生成时同时请求LLM的最大学科数
+    STUDY_PLAN_SUBJECT_CONCURRENCY: int = 4
+    # 批量生成学习计划时的LLM并发上限
+    STUDY_PLAN_BULK_CONCURRENCY: int = 8
+
+    # 学习计划模板缓存（按计划类型、时长、重点科目与分数段复用LLM生成的计划结构）
+    STUDY_PLAN_CACHE_ENABLED: bool = True
+    STUDY_PLAN_CACHE_MAX_SIZE: int = 512
+    STUDY_PLAN_CACHE_TTL_SECONDS: float = 24 * 3600
+    STUDY_PLAN_CACHE_SCORE_BAND: int = 20  # 分数段宽度
+
+    # 单次请求最多展开的每日任务天数
+    STUDY_PLAN_TASK_WINDOW_DAYS: int = 62
+
+    # 按分数索引的院校分类预计算表（内存映射文件目录、分数上限）
+    SCORE_TABLE_DIR: str = os.getenv("SCORE_TABLE_DIR", "./data/score_tables")
+    SCORE_TABLE_MAX_SCORE: int = 750
+
+    # 城市参考数据（省份、区域、坐标、一线城市、消费指数），与Django端共用
+    CITY_DATA_PATH: str = os.getenv(
+        "CITY_DATA_PATH",
+        os.path.join(
+            os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+            "data",
+            "cities.csv",
+        ),
+    )
+    # 地域匹配的距离衰减特征距离（公里）
+    LOCATION_DECAY_KM: float = 300.0
+
+    # 分数线趋势预测：历史不少于MIN_YEARS年时按线性趋势外推，年均变化不超过MAX_SLOPE分；
+    # 历史过短无法估计残差时使用DEFAULT_STD作为预测标准误
+    CUTOFF_FORECAST_MIN_YEARS: int = 3
+    CUTOFF_FORECAST_MAX_SLOPE: float = 15.0
+    CUTOFF_FORECAST_DEFAULT_STD: float = 10.0
+
+    # 录取概率蒙特卡洛模拟：考生分数标准差、样本数，以及划分保底/稳妥的概率下限
+    ADMISSION_SIMULATION_ENABLED: bool = True
+    ADMISSION_SIMULATION_SAMPLES: int = 10000
+    ADMISSION_SCORE_STD: float = 5.0
+    ADMISSION_SAFETY_PROBABILITY: float = 0.8
+    ADMISSION_MATCH_PROBABILITY: float = 0.4
+
+    # 院校×专业组合推荐：录取概率与专业背景匹配度的权重
+    MAJOR_PAIR_WEIGHTS: Dict[str, float] = {
+        "probability": 0.6,
+        "background": 0.4,
+    }
+
+    # 协同过滤参考的相似学生数（由学生画像近似最近邻索引查找）
+    CF_NEIGHBOURS: int = 10
+
+    # 学生画像聚类：簇数上限（未指定簇数时取sqrt(学生数/2)）、LLM并发数、
+    # 每簇缓存的协同过滤院校数、内容推荐候选院校的分数线范围（簇内分数范围上下浮动MARGIN分）；
+    # 学生画像与最近簇中心的余弦相似度低于MIN_SIMILARITY时不使用簇缓存
+    STUDENT_CLUSTER_MAX: int = 1000
+    STUDENT_CLUSTER_LLM_CONCURRENCY: int = 4
+    STUDENT_CLUSTER_CF_SCHOOLS: int = 30
+    STUDENT_CLUSTER_CANDIDATE_MARGIN: float = 60.0
+    STUDENT_CLUSTER_MIN_SIMILARITY: float = 0.95
+
+    # 基于内容推荐的(学生, 维度)匹配度向量缓存最多保留的学生数（按最近使用淘汰）
+    DIMENSION_CACHE_MAX_STUDENTS: int = 1024
+
+    # 位次匹配时参考的院校分数线年数
+    RANK_MATCH_YEARS: int = 3
 
     # 用户验证
     SECRET_KEY: str = os.getenv("SECRET_KEY", "your-secret-key-here")
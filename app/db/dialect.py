@@ -0,0 +1,26 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+按数据库方言构造支持ON CONFLICT的INSERT语句
+SQLite与PostgreSQL的insert()都提供on_conflict_do_nothing/on_conflict_do_update，
+用于以单条语句完成“不存在则插入、存在则更新”，避免先查后写的竞态
+"""
+
+from typing import Any
+
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+_INSERTS = {
+    "sqlite": sqlite.insert,
+    "postgresql": postgresql.insert,
+}
+
+
+def dialect_insert(db: AsyncSession, model: Any):
+    """返回当前会话所用数据库方言的insert(model)"""
+    name = db.get_bind().dialect.name
+    if name not in _INSERTS:
+        raise NotImplementedError(f"不支持的数据库方言: {name}")
+    return _INSERTS[name](model)
@@ -0,0 +1,54 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+提交后执行的缓存失效
+映射器的after_insert/after_update/after_delete事件在flush时触发，此时事务尚未提交；
+若当场标记缓存失效，并发请求可能在提交前就用旧数据重建缓存并清除失效标记。
+这里在flush时只记录待执行的失效操作，会话提交后再执行，回滚时丢弃
+"""
+
+from typing import Any, Callable, List
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session, object_session
+
+_PENDING_KEY = "pending_invalidations"
+
+
+def invalidate_on_commit(target: Any, invalidate: Callable[..., None], *args: Any) -> None:
+    """在target所属会话提交后调用invalidate(*args)，不属于任何会话时立即调用"""
+    session = object_session(target)
+    if session is None:
+        invalidate(*args)
+        return
+    pending = session.info.setdefault(_PENDING_KEY, {})
+    pending[(invalidate, args)] = None  # 保持登记顺序并去重
+
+
+def changed_values(target: Any, attribute: str) -> List[Any]:
+    """属性的当前值及本次flush前的旧值（去重、去空）"""
+    history = inspect(target).attrs[attribute].history
+    values = [getattr(target, attribute), *history.deleted]
+    return [value for value in dict.fromkeys(values) if value]
+
+
+@event.listens_for(Session, "after_commit")
+def _run_pending_invalidations(session):
+    """提交后执行登记的失效操作（SAVEPOINT提交时外层事务尚未提交，留待外层提交）"""
+    if session.in_nested_transaction():
+        return
+    pending = session.info.pop(_PENDING_KEY, None)
+    for invalidate, args in pending or ():
+        invalidate(*args)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending_invalidations(session):
+    """回滚后丢弃登记的失效操作
+
+    SAVEPOINT回滚时保留（外层事务登记的操作仍需执行，多执行一次失效只会多重建一次）
+    """
+    if session.in_nested_transaction():
+        return
+    session.info.pop(_PENDING_KEY, None)
@@ -12,10 +12,14 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from app.db.base import engine, Base, async_session
 from app.models.student import Student
 from app.models.school import School
+from app.models.school_feature import SchoolFeature
 from app.models.major import Major
 from app.models.score_line import ScoreLine
+from app.models.score_segment import ScoreSegment
+from app.models.score_forecast import ScoreForecast
 from app.models.study_plan import StudyPlan
 from app.models.recommendation import Recommendation
+from app.models.student_cluster import StudentCluster
 from app.models.education_path import EducationPath
 
 
@@ -1,7 +1,16 @@
 from app.models.student import Student
 from app.models.school import School
+from app.models.school_feature import SchoolFeature
 from app.models.major import Major
 from app.models.score_line import ScoreLine
+from app.models.score_segment import ScoreSegment
+from app.models.score_forecast import ScoreForecast
 from app.models.recommendation import Recommendation
-from app.models.study_plan import StudyPlan
+from app.models.student_cluster import StudentCluster
+from app.models.study_plan import (
+    StudyPlan,
+    StudyPlanTaskOverride,
+    StudyPlanProgressEvent,
+    StudyPlanProgressSummary,
+)
 from app.models.education_path import EducationPath
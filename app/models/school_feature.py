@@ -0,0 +1,29 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+院校特征模型（由院校与分数线数据派生）
+"""
+
+from sqlalchemy import Column, Integer, String, ForeignKey, JSON, DateTime, func
+from app.db.base import Base
+
+
+class SchoolFeature(Base):
+    """院校派生特征
+
+    推荐时反复使用的院校属性（层次、消费水平、区域、关键词、最新分数线）预先计算后存储，
+    院校或分数线变更时重新计算。
+    """
+
+    __tablename__ = "school_features"
+
+    school_id = Column(Integer, ForeignKey("schools.id"), primary_key=True)
+
+    tier = Column(Integer)  # 院校层次：1-985, 2-211, 3-双一流, 4-其他
+    cost_class = Column(String(10))  # 所在城市消费水平：high, medium, low
+    region = Column(String(20))  # 所在区域代码
+    keywords = Column(JSON)  # 规范化的特色关键词
+    latest_cutoffs = Column(JSON)  # 各省最新一年的院校分数线 {省份: {year, min_score, ...}}
+
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
@@ -0,0 +1,38 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+分数线预测模型
+"""
+
+from sqlalchemy import Column, Integer, String, Float, ForeignKey, DateTime, func
+from app.db.base import Base
+
+
+class ScoreForecast(Base):
+    """下一年分数线预测（由历年分数线批量拟合趋势得到）
+
+    每个(院校, 专业, 省份)序列一条记录，major_id为空表示院校整体分数线
+    """
+
+    __tablename__ = "score_forecasts"
+
+    id = Column(Integer, primary_key=True, index=True)
+
+    school_id = Column(Integer, ForeignKey("schools.id"), nullable=False, index=True)
+    major_id = Column(Integer, ForeignKey("majors.id"), nullable=True)
+    province = Column(String(20), nullable=False, index=True)
+
+    # 预测结果
+    year = Column(Integer, nullable=False)  # 预测年份
+    predicted_score = Column(Float, nullable=False)  # 预测最低分
+    std_error = Column(Float, nullable=False)  # 预测标准误
+    slope = Column(Float)  # 年均变化
+
+    # 拟合所用历史数据
+    n_years = Column(Integer)  # 历史年数
+    last_year = Column(Integer)  # 最近一年
+    last_score = Column(Float)  # 最近一年最低分
+
+    # 时间戳
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
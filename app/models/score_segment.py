@@ -0,0 +1,32 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+一分一段表模型
+"""
+
+from sqlalchemy import Column, Integer, String, JSON, DateTime, UniqueConstraint, func
+from app.db.base import Base
+
+
+class ScoreSegment(Base):
+    """一分一段表（每个省份、年份一条记录）
+
+    分数与累计人数以两个等长的有序数组存储：
+    scores按分数降序排列，cumulative为对应分数及以上的累计人数（即该分数的位次）
+    """
+
+    __tablename__ = "score_segments"
+    __table_args__ = (UniqueConstraint("province", "year", name="uq_segment_province_year"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+
+    province = Column(String(20), nullable=False)  # 省份
+    year = Column(Integer, nullable=False)  # 年份
+
+    scores = Column(JSON, nullable=False)  # 分数（降序）
+    cumulative = Column(JSON, nullable=False)  # 累计人数（升序）
+
+    # 时间戳
+    created_at = Column(DateTime, server_default=func.now())
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
@@ -0,0 +1,36 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+学生画像簇模型
+"""
+
+from sqlalchemy import Column, Integer, Float, ForeignKey, JSON, DateTime, func
+from app.db.base import Base
+
+
+class StudentCluster(Base):
+    """学生画像簇（由离线聚类任务生成）
+
+    画像相近的学生共用推荐中代价较高的部分：LLM推荐、协同过滤的候选院校、
+    基于内容推荐的候选院校集合；在线推荐时按学生画像找到最近的簇中心，只做个性化部分
+    """
+
+    __tablename__ = "student_clusters"
+
+    id = Column(Integer, primary_key=True, index=True)
+
+    # 聚类结果
+    centroid = Column(JSON, nullable=False)  # 簇中心（学生画像向量）
+    size = Column(Integer, nullable=False)  # 簇内学生数
+    medoid_student_id = Column(Integer, ForeignKey("students.id"))  # 最接近簇中心的学生
+    score_min = Column(Float)  # 簇内学生最低分
+    score_max = Column(Float)  # 簇内学生最高分
+
+    # 缓存的共享推荐结果
+    llm_recommendations = Column(JSON)  # {策略: LLM推荐结果}
+    cf_school_ids = Column(JSON)  # 簇内学生目标院校（按出现次数降序）
+    candidate_school_ids = Column(JSON)  # {省份: 分数线在簇内分数范围附近的院校ID}
+
+    # 时间戳
+    created_at = Column(DateTime, server_default=func.now())
@@ -13,7 +13,10 @@ from sqlalchemy import (
     ForeignKey,
     JSON,
     Text,
+    Date,
+    Boolean,
     DateTime,
+    UniqueConstraint,
     func,
 )
 from sqlalchemy.orm import relationship
@@ -33,7 +36,7 @@ class StudyPlan(Base):
 
     # 计划信息
     title = Column(String(200), nullable=False)  # 计划标题
-    plan_type = Column(String(50))  # 计划类型：overall, weekly, subject, etc.
+    plan_type = Column(String(50))  # 计划类型：overall, weekly, subject, multi_subject, etc.
     duration = Column(String(50))  # 计划时长：1周、1个月、3个月等
 
     # 计划内容
@@ -58,3 +61,59 @@ class StudyPlan(Base):
     # 时间戳
     created_at = Column(DateTime, server_default=func.now())
     updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
+
+
+class StudyPlanTaskOverride(Base):
+    """学习计划每日任务覆盖记录
+
+    每日任务由周安排模板和里程碑按日期惰性展开，只有被修改或标记完成的日期才落库。
+    """
+
+    __tablename__ = "study_plan_task_overrides"
+    __table_args__ = (UniqueConstraint("plan_id", "date", name="uq_plan_task_date"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    plan_id = Column(Integer, ForeignKey("study_plans.id"), nullable=False, index=True)
+    date = Column(Date, nullable=False)  # 任务日期
+
+    tasks = Column(JSON)  # 覆盖当天的任务安排（为空时使用模板展开的任务）
+    completed = Column(Boolean, default=False)  # 当天任务是否完成
+    note = Column(Text)  # 备注
+
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
+
+
+class StudyPlanProgressEvent(Base):
+    """学习计划进度事件（只追加）"""
+
+    __tablename__ = "study_plan_progress_events"
+    __table_args__ = (UniqueConstraint("plan_id", "event_id", name="uq_plan_progress_event"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    plan_id = Column(Integer, ForeignKey("study_plans.id"), nullable=False, index=True)
+    event_id = Column(String(64))  # 客户端生成的幂等键（可为空），重复上报时只记录一次
+
+    event_type = Column(String(50), nullable=False)  # task_completed, hours_logged等
+    date = Column(Date)  # 事件对应的计划日期
+    subject = Column(String(50))  # 相关学科
+    hours = Column(Float)  # 学习时长（小时）
+    detail = Column(JSON)  # 附加信息
+
+    created_at = Column(DateTime, server_default=func.now())
+
+
+class StudyPlanProgressSummary(Base):
+    """学习计划进度汇总（随进度事件增量更新）"""
+
+    __tablename__ = "study_plan_progress_summaries"
+
+    plan_id = Column(Integer, ForeignKey("study_plans.id"), primary_key=True)
+
+    tasks_completed = Column(Integer, default=0)  # 已完成的每日任务数
+    hours_logged = Column(Float, default=0.0)  # 累计学习时长
+    milestones_reached = Column(Integer, default=0)  # 已达成的里程碑数
+    check_ins = Column(Integer, default=0)  # 打卡次数
+    events_count = Column(Integer, default=0)  # 事件总数
+
+    last_event_type = Column(String(50))
+    last_event_at = Column(DateTime)
@@ -104,3 +104,19 @@ class RecommendRequest(BaseModel):
     include_majors: Optional[bool] = True
     prefer_provinces: Optional[List[str]] = None
     prefer_school_types: Optional[List[str]] = None
+    # 院校筛选表达式，如 {"or": [{"is_985": true}, {"province": ["重庆", "四川"]}]}
+    school_filter: Optional[Dict[str, Any]] = None
+    # 分数预测比较方式：score=按最新分数线，rank=按一分一段表换算的历年等效位次
+    matching: Optional[str] = "score"
+    student_rank: Optional[int] = None  # 学生位次（为空时由分数换算）
+    simulation_seed: Optional[int] = None  # 录取概率模拟的随机种子（指定后结果可复现）
+
+
+class PairRecommendRequest(BaseModel):
+    """院校×专业组合推荐请求模型"""
+
+    strategy: Optional[str] = "balanced"  # balanced, aggressive, conservative
+    num_recommendations: Optional[int] = 9
+    # 院校筛选表达式（同RecommendRequest）
+    school_filter: Optional[Dict[str, Any]] = None
+    simulation_seed: Optional[int] = None  # 录取概率模拟的随机种子（指定后结果可复现）
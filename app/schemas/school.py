@@ -107,3 +107,23 @@ class SchoolDetail(School):
 
     class Config:
         orm_mode = True
+
+
+class SchoolFilterRequest(BaseModel):
+    """院校组合筛选请求
+
+    filter为嵌套的筛选表达式，如：
+    {"or": [{"province": ["北京", "上海"], "is_985": true}, {"type": "师范"}]}
+    """
+
+    filter: Optional[Dict[str, Any]] = None
+    name: Optional[str] = None
+    skip: int = 0
+    limit: int = 100
+
+
+class SchoolFilterResult(BaseModel):
+    """院校组合筛选结果"""
+
+    total: int
+    items: List[School]
@@ -6,8 +6,9 @@
 """
 
 from typing import Optional, List, Dict, Any
-from pydantic import BaseModel
-from datetime import datetime
+from pydantic import BaseModel, Field
+from datetime import date, datetime
+from datetime import date as date_type  # 字段名为date时使用，避免字段名遮蔽类型
 
 
 class StudyPlanBase(BaseModel):
@@ -97,9 +98,84 @@ class StudyPlanDetail(StudyPlan):
 class StudyPlanRequest(BaseModel):
     """学习计划生成请求"""
 
-    plan_type: str = "overall"  # overall, weekly, subject
+    plan_type: str = "overall"  # overall, weekly, subject, multi_subject
     duration: Optional[str] = "3个月"  # 计划时长
     focus_subjects: Optional[List[str]] = None  # 重点科目
     target_score: Optional[float] = None  # 目标分数
     target_schools: Optional[List[int]] = None  # 目标学校IDs
     target_majors: Optional[List[int]] = None  # 目标专业IDs
+
+
+class BulkStudyPlanRequest(StudyPlanRequest):
+    """批量生成学习计划请求（指定学生ID列表或筛选条件）"""
+
+    student_ids: Optional[List[int]] = None  # 学生IDs
+    province: Optional[str] = None  # 按省份筛选
+    current_school: Optional[str] = None  # 按就读学校筛选
+    batch_size: int = 50  # 每批写入的计划数
+    concurrency: Optional[int] = None  # LLM并发上限，默认使用系统配置
+
+
+class DailyTask(BaseModel):
+    """单日任务（由周安排模板惰性展开，叠加覆盖记录）"""
+
+    date: date_type
+    day: int  # 计划第几天
+    week: int  # 计划第几周
+    weekday: str
+    tasks: Dict[str, Any]
+    milestones: List[Dict[str, Any]] = []
+    completed: bool = False
+    overridden: bool = False  # 任务是否被手动修改
+    note: Optional[str] = None
+
+
+class DailyTaskWindow(BaseModel):
+    """日期范围内的每日任务"""
+
+    plan_id: int
+    plan_start: date
+    plan_end: date
+    start_date: date
+    end_date: date
+    days: List[DailyTask]
+
+
+class DailyTaskUpdate(BaseModel):
+    """修改单日任务或标记完成"""
+
+    tasks: Optional[Dict[str, Any]] = None  # 覆盖当天任务
+    reset_tasks: bool = False  # 恢复为模板展开的任务
+    completed: Optional[bool] = None
+    note: Optional[str] = None
+
+
+class ProgressEventCreate(BaseModel):
+    """进度事件"""
+
+    event_id: Optional[str] = Field(None, max_length=64)  # 幂等键，离线重试时避免重复计入
+    event_type: str  # task_completed, task_uncompleted, hours_logged, milestone_reached, check_in
+    date: Optional[date_type] = None  # 对应的计划日期
+    subject: Optional[str] = None
+    hours: Optional[float] = None  # 学习时长（小时）
+    detail: Optional[Dict[str, Any]] = None
+
+
+class ProgressUpdate(BaseModel):
+    """批量上报进度事件（客户端可离线累积后一次上报）"""
+
+    events: List[ProgressEventCreate]
+
+
+class ProgressSummary(BaseModel):
+    """学习计划进度汇总"""
+
+    plan_id: int
+    tasks_completed: int = 0
+    hours_logged: float = 0.0
+    milestones_reached: int = 0
+    check_ins: int = 0
+    events_count: int = 0
+    last_event_type: Optional[str] = None
+    last_event_at: Optional[datetime] = None
+    recent_events: List[Dict[str, Any]] = []
@@ -0,0 +1,69 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+录取概率蒙特卡洛模拟
+同时对考生分数的不确定性和各院校分数线（预测值及标准误）的分布抽样，
+估计考生分数高于分数线的概率
+
+全部院校共用同一组标准正态样本：院校 j 被录取当且仅当
+    考生分数 + σ_s·z > 分数线_j + σ_j·w
+即 σ_s·z - σ_j·w > 分数线_j - 考生分数。
+对标准误相同（按std_step取整）的院校，左侧样本只需排序一次，
+每所院校的概率即为一次二分查找，万级样本 × 数千院校可在数十毫秒内完成
+"""
+
+from typing import Optional
+
+import numpy as np
+
+# 概率上下限：模拟之外仍有模型未覆盖的风险，不输出0或1
+PROBABILITY_FLOOR = 0.01
+PROBABILITY_CEIL = 0.99
+
+
+def simulate_admission_probabilities(
+    score: float,
+    score_std: float,
+    cutoffs,
+    cutoff_stds,
+    n_samples: int = 10000,
+    seed: Optional[int] = None,
+    std_step: float = 0.5,
+) -> np.ndarray:
+    """模拟考生被各院校录取的概率
+
+    Args:
+        score: 考生分数（估计值）
+        score_std: 考生分数的标准差
+        cutoffs: 各院校分数线预测值 (N,)
+        cutoff_stds: 各院校分数线标准误 (N,)
+        n_samples: 样本数
+        seed: 随机种子，指定后结果可复现
+        std_step: 分数线标准误的分组精度
+
+    Returns:
+        各院校的录取概率 (N,)
+    """
+    cutoffs = np.asarray(cutoffs, dtype=np.float64)
+    if cutoffs.size == 0:
+        return np.zeros(0)
+    cutoff_stds = np.broadcast_to(np.asarray(cutoff_stds, dtype=np.float64), cutoffs.shape)
+
+    rng = np.random.default_rng(seed)
+    student_noise = score_std * rng.standard_normal(n_samples)
+    cutoff_noise = rng.standard_normal(n_samples)
+
+    # 标准误按精度取整后分组，同组院校共用一组排序后的样本
+    groups, inverse = np.unique(
+        np.round(np.maximum(cutoff_stds, 0) / std_step) * std_step, return_inverse=True
+    )
+    margins = cutoffs - score
+    probabilities = np.empty_like(cutoffs)
+    for g, sigma in enumerate(groups):
+        diffs = np.sort(student_noise - sigma * cutoff_noise)
+        members = inverse.reshape(-1) == g
+        below = np.searchsorted(diffs, margins[members], side="right")
+        probabilities[members] = 1 - below / n_samples
+
+    return np.clip(probabilities, PROBABILITY_FLOOR, PROBABILITY_CEIL)
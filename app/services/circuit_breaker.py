@@ -0,0 +1,177 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+外部依赖的熔断与对冲请求
+熔断器在依赖持续失败时直接短路到降级逻辑；对冲请求在首个请求超过p95延迟仍未返回时
+再发出一个相同请求，取先成功的结果，以限制尾延迟
+"""
+
+import time
+import asyncio
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional
+
+
+class CircuitOpenError(Exception):
+    """熔断器处于打开状态，请求被短路"""
+
+
+class CircuitBreaker:
+    """三态熔断器（closed/open/half_open）
+
+    - closed：正常放行，连续失败达到阈值后打开
+    - open：直接拒绝请求，经过恢复时间后进入半开
+    - half_open：放行少量探测请求，成功则关闭，失败则重新打开
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = 5,
+        recovery_timeout: float = 30.0,
+        half_open_max_calls: int = 1,
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.half_open_max_calls = half_open_max_calls
+
+        self._state = self.CLOSED
+        self._consecutive_failures = 0
+        self._opened_at = 0.0
+        self._half_open_calls = 0
+        self._short_circuited = 0
+
+    @property
+    def state(self) -> str:
+        """当前状态（打开超过恢复时间后自动转为半开）"""
+        if (
+            self._state == self.OPEN
+            and time.monotonic() - self._opened_at >= self.recovery_timeout
+        ):
+            self._state = self.HALF_OPEN
+            self._half_open_calls = 0
+        return self._state
+
+    def allow_request(self) -> bool:
+        """判断是否放行本次请求"""
+        state = self.state
+        if state == self.CLOSED:
+            return True
+        if state == self.HALF_OPEN and self._half_open_calls < self.half_open_max_calls:
+            self._half_open_calls += 1
+            return True
+        self._short_circuited += 1
+        return False
+
+    def record_success(self) -> None:
+        """记录一次成功调用"""
+        self._consecutive_failures = 0
+        self._state = self.CLOSED
+
+    def release(self) -> None:
+        """调用被取消（如对冲请求落败），不计成功或失败，归还半开探测名额"""
+        if self._state == self.HALF_OPEN and self._half_open_calls > 0:
+            self._half_open_calls -= 1
+
+    def record_failure(self) -> None:
+        """记录一次失败调用"""
+        self._consecutive_failures += 1
+        if (
+            self._state == self.HALF_OPEN
+            or self._consecutive_failures >= self.failure_threshold
+        ):
+            self._state = self.OPEN
+            self._opened_at = time.monotonic()
+
+    async def call(self, func: Callable[[], Awaitable[Any]]) -> Any:
+        """经由熔断器执行异步调用
+
+        Raises:
+            CircuitOpenError: 熔断器打开时直接抛出，调用方应走降级逻辑
+        """
+        if not self.allow_request():
+            raise CircuitOpenError(f"{self.name}熔断中，请求已短路")
+        try:
+            result = await func()
+        except Exception:
+            self.record_failure()
+            raise
+        except BaseException:
+            # CancelledError等：探测未完成，不能一直占用半开名额
+            self.release()
+            raise
+        self.record_success()
+        return result
+
+    def snapshot(self) -> Dict[str, Any]:
+        """熔断器状态快照"""
+        return {
+            "name": self.name,
+            "state": self.state,
+            "consecutive_failures": self._consecutive_failures,
+            "short_circuited": self._short_circuited,
+        }
+
+
+class LatencyTracker:
+    """记录最近若干次成功调用的延迟，用于估计分位数"""
+
+    def __init__(self, window: int = 200):
+        self._samples: Deque[float] = deque(maxlen=window)
+
+    def record(self, seconds: float) -> None:
+        self._samples.append(seconds)
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def percentile(self, q: float) -> Optional[float]:
+        """返回第q百分位延迟（秒），无样本时返回None"""
+        if not self._samples:
+            return None
+        ordered = sorted(self._samples)
+        index = min(len(ordered) - 1, int(round(q / 100.0 * (len(ordered) - 1))))
+        return ordered[index]
+
+
+async def hedged_call(
+    func: Callable[[], Awaitable[Any]], hedge_delay: float
+) -> Any:
+    """对冲请求：首个请求在hedge_delay秒内未返回时发出第二个请求，取先成功的结果
+
+    首个请求在对冲延迟内失败时直接抛出，不再对冲；两个请求都失败时抛出最后一个异常。
+    返回或外层被取消时取消仍未完成的请求。
+    """
+    tasks = [asyncio.ensure_future(func())]
+    try:
+        try:
+            return await asyncio.wait_for(asyncio.shield(tasks[0]), hedge_delay)
+        except asyncio.TimeoutError:
+            pass
+
+        tasks.append(asyncio.ensure_future(func()))
+        pending = set(tasks)
+        error: Optional[BaseException] = None
+        while pending:
+            done, pending = await asyncio.wait(
+                pending, return_when=asyncio.FIRST_COMPLETED
+            )
+            for task in done:
+                if task.cancelled():
+                    error = asyncio.CancelledError()
+                elif task.exception() is None:
+                    return task.result()
+                else:
+                    error = task.exception()
+        raise error
+    finally:
+        # 返回、失败或外层被取消时，取消仍未完成的请求
+        for task in tasks:
+            if not task.done():
+                task.cancel()
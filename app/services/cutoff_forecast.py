@@ -0,0 +1,183 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+分数线趋势预测
+对每个(院校, 专业, 省份)序列的历年最低分拟合线性趋势，外推下一年分数线及其标准误；
+全部序列以分组求和（np.bincount）一次性完成最小二乘拟合，不逐个序列循环
+"""
+
+import time
+from typing import Any, Dict
+
+import numpy as np
+from sqlalchemy import delete, insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.core.config import settings
+from app.models.score_forecast import ScoreForecast
+from app.models.score_line import ScoreLine
+from app.services.score_tables import score_table_store
+
+# 残差方差向合并估计收缩时的先验自由度
+PRIOR_DOF = 4
+
+
+def fit_trends(
+    series: np.ndarray,
+    years: np.ndarray,
+    scores: np.ndarray,
+    n_series: int,
+    min_years: int,
+    max_slope: float,
+    default_std: float,
+) -> Dict[str, np.ndarray]:
+    """批量拟合分数线趋势
+
+    Args:
+        series: 每条观测所属序列编号 (M,)，取值0..n_series-1
+        years: 观测年份 (M,)
+        scores: 观测最低分 (M,)
+        n_series: 序列数
+        min_years: 拟合趋势所需的最少年数，不足时按历年均值预测
+        max_slope: 年均变化上限（绝对值）
+        default_std: 无法估计残差时的标准误
+
+    Returns:
+        各序列的n_years, last_year, last_score, slope, year, predicted_score, std_error
+    """
+    years = years.astype(np.float64)
+    scores = scores.astype(np.float64)
+
+    n = np.bincount(series, minlength=n_series).astype(np.float64)
+    mean_x = np.bincount(series, years, minlength=n_series) / n
+    mean_y = np.bincount(series, scores, minlength=n_series) / n
+
+    dx = years - mean_x[series]
+    dy = scores - mean_y[series]
+    sxx = np.bincount(series, dx * dx, minlength=n_series)
+    sxy = np.bincount(series, dx * dy, minlength=n_series)
+
+    # 历史足够长时按线性趋势外推，否则按均值预测
+    trended = (n >= min_years) & (sxx > 0)
+    slope = np.where(trended, sxy / np.where(sxx > 0, sxx, 1.0), 0.0)
+    slope = np.clip(slope, -max_slope, max_slope)
+
+    # 每个序列最近一年的数据
+    order = np.lexsort((years, series))
+    sorted_series = series[order]
+    last_index = order[np.r_[np.nonzero(np.diff(sorted_series))[0], len(order) - 1]]
+    last_year = years[last_index]
+    last_score = scores[last_index]
+    target_year = last_year + 1
+
+    predicted = mean_y + slope * (target_year - mean_x)
+
+    # 残差方差：各序列样本很少，向全部序列的合并估计收缩（相当于增加PRIOR_DOF个自由度的先验），
+    # 自由度不足的序列直接使用合并估计
+    residuals = dy - slope[series] * dx
+    sse = np.bincount(series, residuals * residuals, minlength=n_series)
+    dof = np.clip(n - np.where(trended, 2, 1), 0, None)
+    if dof.sum() > 0 and sse.sum() > 0:
+        pooled_var = float(sse.sum() / dof.sum())
+    else:
+        pooled_var = default_std**2
+    residual_std = np.sqrt((sse + PRIOR_DOF * pooled_var) / (dof + PRIOR_DOF))
+
+    # 预测标准误 = 残差标准差 × sqrt(1 + 1/n + (x0 - x̄)^2 / Sxx)
+    leverage = np.where(
+        trended, (target_year - mean_x) ** 2 / np.where(sxx > 0, sxx, 1.0), 0.0
+    )
+    std_error = residual_std * np.sqrt(1 + 1 / n + leverage)
+
+    return {
+        "n_years": n.astype(np.int64),
+        "last_year": last_year.astype(np.int64),
+        "last_score": last_score,
+        "slope": slope,
+        "year": target_year.astype(np.int64),
+        "predicted_score": predicted,
+        "std_error": std_error,
+    }
+
+
+async def run_cutoff_forecast(db: AsyncSession) -> Dict[str, Any]:
+    """根据全部历史分数线重新生成下一年分数线预测，并重新生成分类表
+
+    Returns:
+        统计信息：观测数、序列数、拟合与总耗时
+    """
+    started = time.perf_counter()
+    result = await db.execute(
+        select(
+            ScoreLine.school_id,
+            ScoreLine.major_id,
+            ScoreLine.province,
+            ScoreLine.year,
+            ScoreLine.min_score,
+        ).where(ScoreLine.min_score != None)
+    )
+    rows = result.all()
+
+    await db.execute(delete(ScoreForecast))
+    if not rows:
+        await db.commit()
+        return {"observations": 0, "series": 0, "fit_seconds": 0.0, "elapsed_seconds": 0.0}
+
+    school_ids, major_ids, provinces, years, scores = zip(*rows)
+    province_names = sorted(set(provinces))
+    province_codes = {name: i for i, name in enumerate(province_names)}
+
+    keys = np.stack(
+        [
+            np.array(school_ids, dtype=np.int64),
+            np.array([m if m is not None else -1 for m in major_ids], dtype=np.int64),
+            np.array([province_codes[p] for p in provinces], dtype=np.int64),
+        ],
+        axis=1,
+    )
+    series_keys, series = np.unique(keys, axis=0, return_inverse=True)
+    series = series.reshape(-1)
+
+    fit_started = time.perf_counter()
+    fitted = fit_trends(
+        series,
+        np.array(years),
+        np.array(scores),
+        len(series_keys),
+        settings.CUTOFF_FORECAST_MIN_YEARS,
+        settings.CUTOFF_FORECAST_MAX_SLOPE,
+        settings.CUTOFF_FORECAST_DEFAULT_STD,
+    )
+    fit_seconds = time.perf_counter() - fit_started
+
+    columns = {name: values.tolist() for name, values in fitted.items()}
+    forecasts = [
+        {
+            "school_id": int(school_id),
+            "major_id": int(major_id) if major_id >= 0 else None,
+            "province": province_names[province_code],
+            "year": columns["year"][i],
+            "predicted_score": round(columns["predicted_score"][i], 2),
+            "std_error": round(columns["std_error"][i], 2),
+            "slope": round(columns["slope"][i], 3),
+            "n_years": columns["n_years"][i],
+            "last_year": columns["last_year"][i],
+            "last_score": columns["last_score"][i],
+        }
+        for i, (school_id, major_id, province_code) in enumerate(series_keys.tolist())
+    ]
+    await db.execute(insert(ScoreForecast), forecasts)
+    await db.commit()
+
+    # 分类表优先使用预测分数线，需随预测结果一起更新（写入磁盘新版本，服务进程读取时自动重新映射）；
+    # 专业组合数组在服务进程中比对预测记录的版本后自行重新生成
+    await score_table_store.rebuild(db, province_names)
+
+    return {
+        "observations": len(rows),
+        "series": len(forecasts),
+        "fit_seconds": round(fit_seconds, 3),
+        "elapsed_seconds": round(time.perf_counter() - started, 3),
+    }
@@ -0,0 +1,169 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+学习计划每日任务惰性展开
+每日任务不预先生成，按请求的日期范围由周安排模板和里程碑即时展开，
+只有用户修改或标记完成的日期以覆盖记录的形式存储
+"""
+
+import re
+from datetime import date, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from app.models.study_plan import StudyPlan, StudyPlanTaskOverride
+from app.services.llm_json import WEEKDAYS
+
+# 计划时长未知时的默认天数
+DEFAULT_PLAN_DAYS = 90
+
+_CHINESE_DIGITS = {"零": 0, "一": 1, "二": 2, "两": 2, "三": 3, "四": 4, "五": 5, "六": 6, "七": 7, "八": 8, "九": 9}
+_DURATION_PATTERN = re.compile(r"(\d+|[零一二两三四五六七八九十]+)\s*(?:个)?\s*(天|日|周|星期|月|年)")
+_WEEK_LABEL_PATTERN = re.compile(
+    r"第?\s*(\d+|[零一二两三四五六七八九十]+)\s*(?:周)?\s*(?:(?:至|到|-|~|—)\s*第?\s*(\d+|[零一二两三四五六七八九十]+)\s*)?周"
+)
+_UNIT_DAYS = {"天": 1, "日": 1, "周": 7, "星期": 7, "月": 30, "年": 365}
+
+
+def _parse_number(text: str) -> Optional[int]:
+    """解析阿拉伯数字或九十九以内的中文数字"""
+    if text.isdigit():
+        return int(text)
+    if "十" in text:
+        tens, _, ones = text.partition("十")
+        tens_value = _CHINESE_DIGITS.get(tens, 0) if tens else 1
+        ones_value = _CHINESE_DIGITS.get(ones, 0) if ones else 0
+        return tens_value * 10 + ones_value
+    if len(text) == 1 and text in _CHINESE_DIGITS:
+        return _CHINESE_DIGITS[text]
+    return None
+
+
+def parse_duration_days(duration: Optional[str]) -> int:
+    """将计划时长（如“3个月”“2周”“一年”）换算为天数"""
+    if not duration:
+        return DEFAULT_PLAN_DAYS
+    match = _DURATION_PATTERN.search(duration)
+    if not match:
+        return DEFAULT_PLAN_DAYS
+    number = _parse_number(match.group(1))
+    if not number:
+        return DEFAULT_PLAN_DAYS
+    return number * _UNIT_DAYS[match.group(2)]
+
+
+def parse_week_label(label: str) -> Optional[Tuple[int, int]]:
+    """解析“第一周”“第五周至第八周”“第1-4周”等周次标签为(起始周, 结束周)"""
+    match = _WEEK_LABEL_PATTERN.search(label)
+    if not match:
+        return None
+    start = _parse_number(match.group(1))
+    end = _parse_number(match.group(2)) if match.group(2) else start
+    if not start or not end:
+        return None
+    return min(start, end), max(start, end)
+
+
+class DailyTaskExpander:
+    """按日期展开单个学习计划的每日任务"""
+
+    def __init__(self, plan: StudyPlan):
+        self.plan = plan
+        self.start_date = (plan.created_at.date() if plan.created_at else date.today())
+        self.total_days = parse_duration_days(plan.duration)
+        self.end_date = self.start_date + timedelta(days=self.total_days - 1)
+
+        schedule = plan.weekly_schedule if isinstance(plan.weekly_schedule, dict) else {}
+        # 周模板：按星期几安排
+        self._weekday_template = {day: schedule[day] for day in WEEKDAYS if day in schedule}
+        # 阶段模板：按周次范围安排
+        self._week_ranges: List[Tuple[int, int, Any]] = []
+        for label, content in schedule.items():
+            if label in self._weekday_template:
+                continue
+            week_range = parse_week_label(label)
+            if week_range:
+                self._week_ranges.append((week_range[0], week_range[1], content))
+        self._week_ranges.sort(key=lambda item: item[0])
+
+        self._routine = plan.daily_tasks if isinstance(plan.daily_tasks, dict) else {}
+
+        # 里程碑落在对应周的最后一天
+        self._milestones: Dict[int, List[Dict[str, Any]]] = {}
+        for milestone in plan.milestones or []:
+            if not isinstance(milestone, dict):
+                continue
+            week = milestone.get("week")
+            if isinstance(week, str):
+                week = _parse_number(week.strip("第周 ")) if week else None
+            if isinstance(week, (int, float)) and week > 0:
+                self._milestones.setdefault(int(week), []).append(milestone)
+
+    def clamp(self, start: date, end: date) -> Tuple[date, date]:
+        """将日期范围限制在计划周期内"""
+        return max(start, self.start_date), min(end, self.end_date)
+
+    def expand_day(self, day: date) -> Dict[str, Any]:
+        """展开某一天的任务（不含覆盖记录）"""
+        offset = (day - self.start_date).days
+        week = offset // 7 + 1
+        weekday = WEEKDAYS[day.weekday()]
+
+        tasks: Dict[str, Any] = {}
+        template = self._weekday_template.get(weekday)
+        if isinstance(template, dict):
+            tasks.update(template)
+        elif template:
+            tasks["plan"] = template
+
+        for start_week, end_week, content in self._week_ranges:
+            if start_week <= week <= end_week:
+                tasks["stage"] = content
+                break
+
+        if self._routine:
+            tasks["routine"] = self._routine
+
+        milestones = self._milestones.get(week, []) if offset % 7 == 6 or day == self.end_date else []
+
+        return {
+            "date": day.isoformat(),
+            "day": offset + 1,
+            "week": week,
+            "weekday": weekday,
+            "tasks": tasks,
+            "milestones": milestones,
+            "completed": False,
+            "overridden": False,
+            "note": None,
+        }
+
+    def apply_override(
+        self, item: Dict[str, Any], override: Optional[StudyPlanTaskOverride]
+    ) -> Dict[str, Any]:
+        """将覆盖记录合并到展开结果"""
+        if override is None:
+            return item
+        if override.tasks is not None:
+            item["tasks"] = override.tasks
+            item["overridden"] = True
+        item["completed"] = bool(override.completed)
+        item["note"] = override.note
+        return item
+
+    def expand(
+        self,
+        start: date,
+        end: date,
+        overrides: Iterable[StudyPlanTaskOverride] = (),
+    ) -> List[Dict[str, Any]]:
+        """展开日期范围内（闭区间）的每日任务"""
+        by_date = {override.date: override for override in overrides}
+        start, end = self.clamp(start, end)
+
+        days = []
+        current = start
+        while current <= end:
+            days.append(self.apply_override(self.expand_day(current), by_date.get(current)))
+            current += timedelta(days=1)
+        return days
@@ -0,0 +1,144 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+学生各维度匹配度向量的缓存
+基于内容推荐的兴趣、地域、职业三个维度各只依赖学生的少数字段，
+每个(学生, 维度)缓存一条按院校ID排列的匹配度向量及计算时依赖字段的取值；
+学生只修改了个别字段时只重新计算受影响的维度，其余维度直接复用，
+加权合成每次请求重新计算
+
+学生修改后无需主动失效：每次读取都比对依赖字段的当前取值，取值变化的维度重新计算，
+因此其他工作进程对学生的修改同样能被发现；候选院校不在向量中时只补算缺失的院校
+
+缓存在每个进程内各有一份，院校变更（提交后）只清空本进程的缓存
+"""
+
+import json
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import event
+
+from app.core.config import settings
+from app.db.events import invalidate_on_commit
+from app.models.school import School
+from app.models.student import Student
+
+# 维度 -> 该维度依赖的学生字段
+DIMENSION_FIELDS: Dict[str, Tuple[str, ...]] = {
+    "interest": ("interests",),
+    "location": ("province", "city"),
+    "career": ("career_goals",),
+}
+
+
+class DimensionVectorCache:
+    """(学生, 维度) -> 按院校ID排列的匹配度向量"""
+
+    def __init__(
+        self,
+        dimension_fields: Dict[str, Tuple[str, ...]] = DIMENSION_FIELDS,
+        max_students: Optional[int] = None,
+    ):
+        self.dimension_fields = dimension_fields
+        self.max_students = max_students or settings.DIMENSION_CACHE_MAX_STUDENTS
+        # 学生ID -> {维度: (依赖字段取值, 升序院校ID, 匹配度)}
+        self._entries: "OrderedDict[int, Dict[str, Tuple[str, np.ndarray, np.ndarray]]]" = (
+            OrderedDict()
+        )
+
+    def field_values(self, student: Student, dimension: str) -> str:
+        """学生在某维度依赖字段上的取值（序列化后便于比较JSON字段）"""
+        values = [getattr(student, field) for field in self.dimension_fields[dimension]]
+        return json.dumps(values, ensure_ascii=False, sort_keys=True, default=str)
+
+    def get(
+        self,
+        student: Student,
+        dimension: str,
+        school_ids: Sequence[int],
+        compute: Callable[[np.ndarray], np.ndarray],
+    ) -> np.ndarray:
+        """
+        获取学生某维度在一组院校上的匹配度
+
+        参数:
+            student: 学生
+            dimension: 维度
+            school_ids: 院校ID
+            compute: 输入school_ids中待计算院校的下标，返回这些院校的匹配度
+
+        返回:
+            与school_ids一一对应的匹配度
+        """
+        school_ids = np.asarray(school_ids, dtype=np.int64)
+        if student.id is None:
+            return np.asarray(compute(np.arange(len(school_ids))), dtype=np.float64)
+
+        key = self.field_values(student, dimension)
+        vectors = self._entries.setdefault(student.id, {})
+        self._entries.move_to_end(student.id)
+        cached = vectors.get(dimension)
+        if cached is None or cached[0] != key:
+            cached = (key, np.zeros(0, dtype=np.int64), np.zeros(0))
+
+        _, cached_ids, cached_values = cached
+        positions = np.searchsorted(cached_ids, school_ids)
+        positions = np.minimum(positions, max(len(cached_ids) - 1, 0))
+        hit = (
+            cached_ids[positions] == school_ids
+            if len(cached_ids)
+            else np.zeros(len(school_ids), dtype=bool)
+        )
+        result = np.empty(len(school_ids))
+        result[hit] = cached_values[positions[hit]]
+
+        missing = np.flatnonzero(~hit)
+        if len(missing):
+            computed = np.asarray(compute(missing), dtype=np.float64)
+            result[missing] = computed
+            # 补算的院校并入缓存向量（保持院校ID升序）
+            merged_ids = np.concatenate([cached_ids, school_ids[missing]])
+            merged_values = np.concatenate([cached_values, computed])
+            merged_ids, first = np.unique(merged_ids, return_index=True)
+            vectors[dimension] = (key, merged_ids, merged_values[first])
+            while len(self._entries) > self.max_students:
+                self._entries.popitem(last=False)
+        return result
+
+    def invalidate(self, student_id: Optional[int] = None) -> None:
+        """丢弃学生的全部维度向量，student_id为空时清空缓存"""
+        if student_id is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(student_id, None)
+
+    def stats(self) -> Dict[str, Any]:
+        """缓存的学生数与各维度向量数"""
+        return {
+            "students": len(self._entries),
+            "vectors": {
+                dimension: sum(dimension in vectors for vectors in self._entries.values())
+                for dimension in self.dimension_fields
+            },
+        }
+
+
+# 全局维度向量缓存
+dimension_vector_cache = DimensionVectorCache()
+
+
+@event.listens_for(School, "after_insert")
+@event.listens_for(School, "after_update")
+@event.listens_for(School, "after_delete")
+def _invalidate_school_dimensions(mapper, connection, target):
+    """院校变更时（提交后）全部维度向量失效"""
+    invalidate_on_commit(target, dimension_vector_cache.invalidate)
+
+
+@event.listens_for(Student, "after_delete")
+def _drop_student_dimensions(mapper, connection, target):
+    """学生删除时（提交后）丢弃其维度向量"""
+    invalidate_on_commit(target, dimension_vector_cache.invalidate, target.id)
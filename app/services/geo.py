@@ -0,0 +1,132 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+城市参考数据
+城市所属省份、区域、坐标、是否一线城市及消费指数取自城市数据文件（CITY_DATA_PATH），
+首次使用时加载为数组；地域匹配按数组对全部院校批量计算，
+不在同省/同区域的院校按到学生所在城市的球面距离（haversine）衰减
+"""
+
+import csv
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.core.config import settings
+
+# 消费指数分档：不低于HIGH为高消费城市，不低于MEDIUM为中等消费城市
+HIGH_COST_INDEX = 0.8
+MEDIUM_COST_INDEX = 0.6
+EARTH_RADIUS_KM = 6371.0
+
+
+def haversine_km(lat1, lon1, lat2, lon2) -> np.ndarray:
+    """两点（可广播的数组）之间的球面距离（公里）"""
+    lat1, lon1, lat2, lon2 = (
+        np.radians(np.asarray(x, dtype=np.float64)) for x in (lat1, lon1, lat2, lon2)
+    )
+    a = (
+        np.sin((lat2 - lat1) / 2) ** 2
+        + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+
+
+def nearest_distance_km(
+    lat: np.ndarray, lon: np.ndarray, place_lat: np.ndarray, place_lon: np.ndarray
+) -> np.ndarray:
+    """各点 (N,) 到一组地点 (P,) 中最近者的距离，坐标未知或没有地点时为NaN"""
+    lat = np.asarray(lat, dtype=np.float64)
+    if len(place_lat) == 0:
+        return np.full(lat.shape, np.nan)
+    distances = haversine_km(
+        lat[:, None],
+        np.asarray(lon, dtype=np.float64)[:, None],
+        np.asarray(place_lat)[None, :],
+        np.asarray(place_lon)[None, :],
+    )
+    return distances.min(axis=1)
+
+
+def distance_decay(
+    distances: np.ndarray, floor: float, ceiling: float, decay_km: Optional[float] = None
+) -> np.ndarray:
+    """按距离指数衰减的得分：距离为0时为ceiling，越远越接近floor，距离未知时为floor"""
+    decay_km = decay_km or settings.LOCATION_DECAY_KM
+    distances = np.asarray(distances, dtype=np.float64)
+    decayed = floor + (ceiling - floor) * np.exp(-distances / decay_km)
+    return np.where(np.isnan(distances), floor, decayed)
+
+
+class CityTable:
+    """城市参考数据的数组视图"""
+
+    def __init__(self, rows: List[Dict[str, str]]):
+        self.names = np.array([row["city"] for row in rows], dtype=object)
+        self.provinces = np.array([row["province"] for row in rows], dtype=object)
+        self.regions = np.array([row["region"] for row in rows], dtype=object)
+        self.capital = np.array([row["capital"] == "1" for row in rows], dtype=bool)
+        self.tier1 = np.array([row["tier1"] == "1" for row in rows], dtype=bool)
+        self.lat = np.array([float(row["lat"]) for row in rows])
+        self.lon = np.array([float(row["lon"]) for row in rows])
+        self.cost_index = np.array([float(row["cost_index"]) for row in rows])
+
+        self._index = {name: i for i, name in enumerate(self.names)}
+        # 省份 -> 省会城市（按省份指代地点时取省会坐标）
+        self._capitals: Dict[str, int] = {}
+        # 区域 -> 省份列表（按数据文件中的顺序）
+        self.region_provinces: Dict[str, List[str]] = {}
+        for i, (province, region) in enumerate(zip(self.provinces, self.regions)):
+            provinces = self.region_provinces.setdefault(region, [])
+            if province not in provinces:
+                provinces.append(province)
+            if self.capital[i]:
+                self._capitals.setdefault(province, i)
+
+    @classmethod
+    def load(cls, path: str) -> "CityTable":
+        with open(path, encoding="utf-8", newline="") as f:
+            return cls(list(csv.DictReader(f)))
+
+    def lookup(self, names: Iterable[Optional[str]]) -> np.ndarray:
+        """城市名称 -> 行号数组，未收录的城市为-1"""
+        return np.array([self._index.get(name, -1) for name in names], dtype=np.int64)
+
+    def place(self, name: Optional[str]) -> int:
+        """城市或省份名称对应的行号（省份取省会），未收录时为-1"""
+        if name in self._index:
+            return self._index[name]
+        return self._capitals.get(name, -1)
+
+    def coordinates(self, codes: Sequence[int]) -> Tuple[np.ndarray, np.ndarray]:
+        """行号数组 -> (纬度, 经度) 数组，行号为-1时为NaN"""
+        codes = np.asarray(codes, dtype=np.int64)
+        known = codes >= 0
+        lat = np.full(codes.shape, np.nan)
+        lon = np.full(codes.shape, np.nan)
+        lat[known] = self.lat[codes[known]]
+        lon[known] = self.lon[codes[known]]
+        return lat, lon
+
+    def cost_class(self, city: Optional[str]) -> str:
+        """城市消费水平，未收录的城市为低消费"""
+        i = self._index.get(city)
+        if i is None:
+            return "low"
+        if self.cost_index[i] >= HIGH_COST_INDEX:
+            return "high"
+        if self.cost_index[i] >= MEDIUM_COST_INDEX:
+            return "medium"
+        return "low"
+
+
+_city_table: Optional[CityTable] = None
+
+
+def get_city_table() -> CityTable:
+    """城市参考数据（进程内只加载一次）"""
+    global _city_table
+    if _city_table is None:
+        _city_table = CityTable.load(settings.CITY_DATA_PATH)
+    return _city_table
@@ -0,0 +1,237 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+LLM回复的容错JSON解析
+处理Markdown代码块、前后附加说明、被截断的数组/对象等常见格式问题，
+尽量从已付费的回复中恢复出可用的结构化结果
+"""
+
+import json
+import re
+from typing import Any, Callable, Dict, List, Optional
+
+# 截断修复时最多回退的次数
+_MAX_REPAIR_ATTEMPTS = 64
+
+_FENCE_PATTERN = re.compile(r"```[a-zA-Z]*\s*\n?(.*?)(?:```|$)", re.DOTALL)
+_TRAILING_COMMA_PATTERN = re.compile(r",(\s*[}\]])")
+
+_CLOSERS = {"{": "}", "[": "]"}
+
+WEEKDAYS = ["周一", "周二", "周三", "周四", "周五", "周六", "周日"]
+
+
+def _strip_code_fence(content: str) -> str:
+    """去除Markdown代码块包裹，代码块未闭合时取其后的全部内容"""
+    match = _FENCE_PATTERN.search(content)
+    if match and "{" in match.group(1):
+        return match.group(1)
+    return content
+
+
+def _scan(text: str):
+    """扫描JSON片段
+
+    Returns:
+        (对象结束位置或None, 未闭合的括号栈, 是否处于字符串中, 可回退的截断位置列表)
+    """
+    stack: List[str] = []
+    cuts: List[int] = []
+    in_string = False
+    escaped = False
+
+    for i, ch in enumerate(text):
+        if in_string:
+            if escaped:
+                escaped = False
+            elif ch == "\\":
+                escaped = True
+            elif ch == '"':
+                in_string = False
+            continue
+
+        if ch == '"':
+            in_string = True
+        elif ch in "{[":
+            stack.append(ch)
+            cuts.append(i + 1)  # 保留开括号，视为空容器
+        elif ch in "}]":
+            if stack:
+                stack.pop()
+            if not stack:
+                return i, stack, False, cuts
+            cuts.append(i + 1)
+        elif ch == ",":
+            cuts.append(i)  # 丢弃逗号及其后不完整的元素
+
+    return None, stack, in_string, cuts
+
+
+def _try_loads(text: str) -> Optional[Any]:
+    """尝试解析JSON，失败时去除尾随逗号后重试"""
+    for candidate in (text, _TRAILING_COMMA_PATTERN.sub(r"\1", text)):
+        try:
+            return json.loads(candidate)
+        except json.JSONDecodeError:
+            continue
+    return None
+
+
+def _close(fragment: str) -> str:
+    """补齐未闭合的字符串与括号"""
+    _, stack, in_string, _ = _scan(fragment)
+    text = fragment + '"' if in_string else fragment
+    text = text.rstrip().rstrip(",")
+    return text + "".join(_CLOSERS[ch] for ch in reversed(stack))
+
+
+def _repair_truncated(fragment: str) -> Optional[Any]:
+    """修复被截断的JSON：逐步回退到上一个完整元素并补齐括号
+
+    截断发生在字符串内部时不保留残缺的字符串（如被截断的学校名称）。
+    """
+    _, _, in_string, cuts = _scan(fragment)
+    if not in_string:
+        result = _try_loads(_close(fragment))
+        if result is not None:
+            return result
+
+    for cut in list(reversed(cuts))[:_MAX_REPAIR_ATTEMPTS]:
+        result = _try_loads(_close(fragment[:cut]))
+        if result is not None:
+            return result
+    return None
+
+
+def extract_json_object(content: str) -> Optional[Dict[str, Any]]:
+    """从LLM回复中提取最外层JSON对象
+
+    Args:
+        content: LLM回复文本
+
+    Returns:
+        解析得到的字典，无法恢复时返回None
+    """
+    if not content:
+        return None
+
+    # 快速路径：回复本身就是合法JSON
+    try:
+        data = json.loads(content)
+        return data if isinstance(data, dict) else None
+    except (json.JSONDecodeError, TypeError):
+        pass
+
+    text = _strip_code_fence(content)
+    start = text.find("{")
+    while start != -1:
+        fragment = text[start:]
+        end, _, _, _ = _scan(fragment)
+
+        if end is None:
+            # 对象未闭合，按截断处理
+            data = _repair_truncated(fragment)
+        else:
+            data = _try_loads(fragment[: end + 1])
+
+        if isinstance(data, dict):
+            return data
+        start = text.find("{", start + 1)
+
+    return None
+
+
+def _coerce_match(value: Any) -> Optional[float]:
+    """将匹配度统一为0-1之间的小数，支持“60%”等写法"""
+    if isinstance(value, (int, float)):
+        number = float(value)
+    elif isinstance(value, str):
+        found = re.search(r"\d+(?:\.\d+)?", value)
+        if not found:
+            return None
+        number = float(found.group())
+        if "%" in value:
+            number /= 100
+    else:
+        return None
+    if number > 1:
+        number /= 100
+    return max(0.0, min(1.0, number))
+
+
+def validate_recommendation(data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """校验并清洗院校推荐结果
+
+    每个类别须为学校列表，学校至少包含非空名称；不合规的条目被丢弃。
+    三个类别均为空时视为无效结果。
+    """
+    cleaned: Dict[str, Any] = {}
+    for category in ["challenge", "match", "safety"]:
+        schools = data.get(category)
+        if not isinstance(schools, list):
+            continue
+
+        items = []
+        for school in schools:
+            if not isinstance(school, dict):
+                continue
+            name = school.get("name")
+            if not isinstance(name, str) or not name.strip():
+                continue
+            item = dict(school)
+            match = _coerce_match(school.get("match"))
+            item["match"] = match if match is not None else 0.0
+            if not isinstance(item.get("recommended_majors"), list):
+                item["recommended_majors"] = []
+            items.append(item)
+        cleaned[category] = items
+
+    if not any(cleaned.values()):
+        return None
+    return cleaned
+
+
+def validate_study_plan(
+    data: Dict[str, Any], plan_type: str = "overall"
+) -> Optional[Dict[str, Any]]:
+    """校验并清洗学习计划结果
+
+    周计划须至少包含一天的安排；总体/学科计划须至少包含概述或目标。
+    列表类字段类型不符时置为空列表。
+    """
+    cleaned = dict(data)
+
+    if plan_type == "weekly":
+        if not any(isinstance(cleaned.get(day), (dict, str)) for day in WEEKDAYS):
+            return None
+    elif not cleaned.get("overview") and not cleaned.get("goals"):
+        return None
+
+    for key in ["goals", "learning_resources", "recommended_materials", "milestones"]:
+        if key in cleaned and not isinstance(cleaned[key], list):
+            cleaned[key] = []
+    for key in ["weekly_schedule", "daily_tasks"]:
+        if key in cleaned and not isinstance(cleaned[key], dict):
+            cleaned[key] = {}
+
+    return cleaned
+
+
+def parse_llm_json(
+    content: str,
+    validator: Optional[Callable[[Dict[str, Any]], Optional[Dict[str, Any]]]] = None,
+) -> Optional[Dict[str, Any]]:
+    """提取并校验LLM回复中的JSON对象
+
+    Args:
+        content: LLM回复文本
+        validator: 校验函数，返回清洗后的结果或None
+
+    Returns:
+        可用的结构化结果，无法恢复时返回None
+    """
+    data = extract_json_object(content)
+    if data is None:
+        return None
+    return validator(data) if validator else data
@@ -0,0 +1,281 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+LLM提示词构建与token统计
+系统提示词固定（含输出格式说明，便于服务端前缀缓存），用户消息只包含紧凑的学生信息；
+本地估算每次请求的token数，超出预算时截断长文本字段，并记录接口返回的实际用量
+"""
+
+import re
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from app.core.config import settings
+
+try:
+    import tiktoken
+
+    _ENCODING = tiktoken.get_encoding("cl100k_base")
+except Exception:  # 未安装tiktoken时使用近似估算
+    _ENCODING = None
+
+
+RECOMMENDATION_SYSTEM_PROMPT = (
+    "你是专业的升学顾问，根据学生信息推荐院校。"
+    "冲刺(challenge)、匹配(match)、保底(safety)各推荐3所；学校名称使用官方全称；"
+    "每所给出类型、推荐理由、匹配度(0-1)、录取可能性评估和2-3个适合专业。"
+    "推荐策略：balanced=平衡推荐，aggressive=激进冲刺，conservative=保守稳妥。"
+    "只输出JSON，格式："
+    '{"challenge":[{"name":"学校全称","type":"学校类型","reason":"推荐理由","match":0.6,'
+    '"admission_probability":"30%以下","recommended_majors":[{"name":"专业"}]}],'
+    '"match":[同上],"safety":[同上]}'
+)
+
+STUDY_PLAN_SYSTEM_PROMPT = (
+    "你是专业的学习规划师，负责制定个性化学习计划。只输出JSON，按任务类型使用对应格式。"
+    '总体计划：{"overview":"概述","weekly_schedule":{"第一周":"安排"},"goals":["目标"],'
+    '"learning_resources":[{"name":"","type":"","priority":"高"}],'
+    '"recommended_materials":[{"subject":"","materials":[""]}],'
+    '"milestones":[{"week":4,"target":""}]}。'
+    '周计划：{"周一":{"morning":"","afternoon":"","evening":""},…,"周日":{同上},'
+    '"daily_tasks":{"morning_routine":""},"learning_resources":[{"name":"","usage":""}]}。'
+    "学科计划：同总体计划，但不含weekly_schedule，重点给出提升目标、重难点与里程碑。"
+)
+
+# 请求模板化计划时追加在系统提示词之后（保持前缀不变）
+STUDY_PLAN_PLACEHOLDER_PROMPT = (
+    "学生姓名与分数以{{name}}、{{total_score}}、{{target_score}}、{{subject_score}}占位符给出，"
+    "括号内为所在分数段；计划中提到姓名或这些分数时原样写出占位符，不要改写为具体数值。"
+)
+
+# 超出预算时按此顺序截断的字段
+_TRUNCATABLE_FIELDS = ["职业目标", "兴趣", "重点科目", "优势学科", "弱势学科"]
+# 截断后字段至少保留的token数
+_MIN_FIELD_TOKENS = 8
+
+_CJK_PATTERN = re.compile(r"[　-〿㐀-鿿＀-￯]")
+_WORD_PATTERN = re.compile(r"[A-Za-z0-9_]+")
+
+
+def count_tokens(text: str) -> int:
+    """本地估算文本token数
+
+    安装了tiktoken时精确计数；否则按中文字符每字约1个token、
+    英文/数字每4个字符约1个token、其余符号各1个token近似估算。
+    """
+    if not text:
+        return 0
+    if _ENCODING is not None:
+        return len(_ENCODING.encode(text))
+
+    cjk = len(_CJK_PATTERN.findall(text))
+    words = _WORD_PATTERN.findall(text)
+    word_tokens = sum((len(w) + 3) // 4 for w in words)
+    others = len(text) - cjk - sum(len(w) for w in words) - text.count(" ")
+    return cjk + word_tokens + max(0, others)
+
+
+def count_message_tokens(messages: List[Dict[str, str]]) -> int:
+    """估算一组对话消息的token数（每条消息约有4个token的格式开销）"""
+    return sum(count_tokens(m.get("content", "")) + 4 for m in messages)
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """将文本截断到不超过max_tokens个token"""
+    if count_tokens(text) <= max_tokens:
+        return text
+    low, high = 0, len(text)
+    while low < high:
+        mid = (low + high + 1) // 2
+        if count_tokens(text[:mid]) + 1 <= max_tokens:
+            low = mid
+        else:
+            high = mid - 1
+    return text[:low] + "…"
+
+
+def _format_value(value: Any) -> str:
+    """将字段值格式化为紧凑文本，空值返回空字符串"""
+    if value is None:
+        return ""
+    if isinstance(value, (list, tuple)):
+        return "、".join(str(v) for v in value if v not in (None, ""))
+    if isinstance(value, dict):
+        return "；".join(f"{k}:{v}" for k, v in value.items() if v not in (None, ""))
+    return str(value).strip()
+
+
+def _render_fields(
+    fields: List[Tuple[str, Any]], budget: Optional[int] = None
+) -> str:
+    """渲染“字段:值”行，省略空值，超出预算时依次截断长文本字段"""
+    rendered = [(label, _format_value(value)) for label, value in fields]
+    rendered = [(label, text) for label, text in rendered if text]
+
+    budget = budget if budget is not None else settings.LLM_PROMPT_TOKEN_BUDGET
+
+    def join(items):
+        return "\n".join(f"{label}:{text}" for label, text in items)
+
+    total = count_tokens(join(rendered))
+    for field in _TRUNCATABLE_FIELDS:
+        if total <= budget:
+            break
+        for i, (label, text) in enumerate(rendered):
+            if label != field:
+                continue
+            field_tokens = count_tokens(text)
+            allowed = max(_MIN_FIELD_TOKENS, field_tokens - (total - budget))
+            rendered[i] = (label, truncate_to_tokens(text, allowed))
+            total = count_tokens(join(rendered))
+
+    return join(rendered)
+
+
+def build_recommendation_messages(
+    student_data: Dict[str, Any], strategy: str = "balanced"
+) -> List[Dict[str, str]]:
+    """构建院校推荐请求的对话消息"""
+    user_prompt = _render_fields(
+        [
+            ("推荐策略", strategy),
+            ("姓名", student_data.get("name") or "学生"),
+            ("总分", student_data.get("total_score")),
+            ("省份", student_data.get("province")),
+            ("兴趣", student_data.get("interests")),
+            ("优势学科", student_data.get("strengths")),
+            ("弱势学科", student_data.get("weaknesses")),
+            ("职业目标", student_data.get("career_goals")),
+        ]
+    )
+    return [
+        {"role": "system", "content": RECOMMENDATION_SYSTEM_PROMPT},
+        {"role": "user", "content": user_prompt},
+    ]
+
+
+def build_study_plan_messages(
+    plan_data: Dict[str, Any], templated: bool = False
+) -> List[Dict[str, str]]:
+    """构建学习计划请求的对话消息
+
+    Args:
+        plan_data: 计划参数
+        templated: 学生姓名、分数是否为占位符（见plan_template_cache.templated_request）
+    """
+    student = plan_data.get("student", {})
+    plan_type = plan_data.get("type", "overall")
+
+    if plan_type == "overall":
+        target_score = plan_data.get("target_score") or student.get("target_score")
+        if not target_score and student.get("total_score"):
+            target_score = student["total_score"] + 30
+        fields = [
+            ("任务", f"制定{plan_data.get('duration') or '3个月'}的总体学习计划"),
+            ("姓名", student.get("name") or "学生"),
+            ("当前分数", student.get("total_score")),
+            ("目标分数", target_score),
+            ("优势学科", student.get("strengths")),
+            ("弱势学科", student.get("weaknesses")),
+            ("重点科目", plan_data.get("focus_subjects")),
+        ]
+    elif plan_type == "weekly":
+        fields = [
+            ("任务", "制定一周详细学习计划，包含每天上午/下午/晚上的内容与目标"),
+            ("姓名", student.get("name") or "学生"),
+            ("当前分数", student.get("total_score")),
+            ("优势学科", student.get("strengths")),
+            ("弱势学科", student.get("weaknesses")),
+            ("重点科目", plan_data.get("focus_subjects")),
+        ]
+    else:
+        subject = plan_data.get("subject", "")
+        fields = [
+            ("任务", f"制定{plan_data.get('duration') or '1个月'}的{subject}学科提升计划"),
+            ("姓名", student.get("name") or "学生"),
+            (f"{subject}当前分数", student.get("subject_score")),
+            ("是否弱项", "是" if subject in (student.get("weaknesses") or []) else "否"),
+            ("是否优势", "是" if subject in (student.get("strengths") or []) else "否"),
+        ]
+
+    return [
+        {
+            "role": "system",
+            "content": STUDY_PLAN_SYSTEM_PROMPT
+            + (STUDY_PLAN_PLACEHOLDER_PROMPT if templated else ""),
+        },
+        {"role": "user", "content": _render_fields(fields)},
+    ]
+
+
+class TokenUsageTracker:
+    """LLM请求token用量统计
+
+    按请求类型累计本地估算的提示词token数与接口usage字段返回的实际用量，
+    并保留最近若干条请求明细。
+    """
+
+    def __init__(self, max_records: int = 1000):
+        self._records: Deque[Dict[str, Any]] = deque(maxlen=max_records)
+        self._totals: Dict[str, Dict[str, int]] = {}
+
+    def record(
+        self,
+        kind: str,
+        estimated_prompt_tokens: int,
+        usage: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        """记录一次请求的token用量"""
+        usage = usage or {}
+        entry = {
+            "kind": kind,
+            "timestamp": time.time(),
+            "estimated_prompt_tokens": estimated_prompt_tokens,
+            "prompt_tokens": int(usage.get("prompt_tokens") or 0),
+            "completion_tokens": int(usage.get("completion_tokens") or 0),
+            "total_tokens": int(usage.get("total_tokens") or 0),
+        }
+        self._records.append(entry)
+
+        totals = self._totals.setdefault(
+            kind,
+            {
+                "requests": 0,
+                "estimated_prompt_tokens": 0,
+                "prompt_tokens": 0,
+                "completion_tokens": 0,
+                "total_tokens": 0,
+            },
+        )
+        totals["requests"] += 1
+        for key in [
+            "estimated_prompt_tokens",
+            "prompt_tokens",
+            "completion_tokens",
+            "total_tokens",
+        ]:
+            totals[key] += entry[key]
+
+    def snapshot(self, recent: int = 20) -> Dict[str, Any]:
+        """返回累计统计与最近的请求明细"""
+        summary = {}
+        for kind, totals in self._totals.items():
+            requests = totals["requests"] or 1
+            summary[kind] = {
+                **totals,
+                "avg_prompt_tokens": round(totals["prompt_tokens"] / requests, 1),
+                "avg_completion_tokens": round(totals["completion_tokens"] / requests, 1),
+            }
+        records = list(self._records)[-recent:] if recent > 0 else []
+        return {"by_kind": summary, "recent": records}
+
+    def reset(self) -> None:
+        """清空统计"""
+        self._records.clear()
+        self._totals.clear()
+
+
+# 全局token用量统计
+token_usage = TokenUsageTracker()
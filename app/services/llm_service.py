@@ -6,10 +6,104 @@
 """
 
 import json
+import logging
+import time
 import asyncio
 import aiohttp
 from typing import Dict, Any, List, Optional
 from app.core.config import settings
+from app.services.circuit_breaker import CircuitBreaker, LatencyTracker, hedged_call
+from app.services.plan_template_cache import (
+    plan_template_cache,
+    render,
+    templated_request,
+)
+from app.services.llm_prompts import (
+    build_recommendation_messages,
+    build_study_plan_messages,
+    count_message_tokens,
+    token_usage,
+)
+from app.services.llm_json import (
+    parse_llm_json,
+    validate_recommendation,
+    validate_study_plan,
+)
+
+
+logger = logging.getLogger(__name__)
+
+# LLM依赖的熔断器与延迟统计
+llm_breaker = CircuitBreaker(
+    "LLM",
+    failure_threshold=settings.LLM_BREAKER_FAILURE_THRESHOLD,
+    recovery_timeout=settings.LLM_BREAKER_RECOVERY_SECONDS,
+)
+llm_latency = LatencyTracker()
+
+
+async def _request_chat_completion(
+    messages: List[Dict[str, str]], kind: str
+) -> str:
+    """发送一次chat/completions请求，返回回复文本"""
+    estimated_tokens = count_message_tokens(messages)
+    started = time.monotonic()
+
+    async with aiohttp.ClientSession(
+        timeout=aiohttp.ClientTimeout(total=settings.LLM_TIMEOUT_SECONDS)
+    ) as session:
+        async with session.post(
+            f"{settings.OPENAI_API_BASE.rstrip('/')}/chat/completions",
+            headers={
+                "Authorization": f"Bearer {settings.OPENAI_API_KEY}",
+                "Content-Type": "application/json",
+            },
+            json={
+                "model": settings.DEFAULT_MODEL,
+                "messages": messages,
+                "temperature": 0.7,
+                "max_tokens": settings.LLM_MAX_TOKENS,
+            },
+        ) as response:
+            response.raise_for_status()
+            result = await response.json()
+            token_usage.record(kind, estimated_tokens, result.get("usage"))
+            content = result["choices"][0]["message"]["content"]
+
+    llm_latency.record(time.monotonic() - started)
+    return content
+
+
+def _hedge_delay() -> float:
+    """对冲延迟：样本充足时取最近成功请求的p95延迟，否则使用默认值"""
+    if len(llm_latency) >= settings.LLM_HEDGE_MIN_SAMPLES:
+        return llm_latency.percentile(95)
+    return settings.LLM_HEDGE_DEFAULT_DELAY_SECONDS
+
+
+async def _chat_completion(messages: List[Dict[str, str]], kind: str) -> str:
+    """调用OpenAI兼容的chat/completions接口，返回回复文本
+
+    请求经由熔断器执行：熔断打开时立即抛出CircuitOpenError，调用方直接走降级逻辑；
+    开启对冲时，首个请求超过p95延迟仍未返回则再发一个请求，取先成功者。
+
+    Args:
+        messages: 对话消息
+        kind: 请求类型（用于token用量统计）
+
+    Returns:
+        模型回复内容
+    """
+
+    async def request():
+        # 半开探测期间不对冲，避免放大对故障依赖的压力
+        if settings.LLM_HEDGE_ENABLED and llm_breaker.state == CircuitBreaker.CLOSED:
+            return await hedged_call(
+                lambda: _request_chat_completion(messages, kind), _hedge_delay()
+            )
+        return await _request_chat_completion(messages, kind)
+
+    return await llm_breaker.call(request)
 
 
 async def get_llm_recommendation(
@@ -24,50 +118,8 @@ async def get_llm_recommendation(
     Returns:
         推荐结果
     """
-    # 构建提示词
-    prompt = f"""
-    作为一个专业的升学顾问，请根据学生信息为其推荐适合的院校。
-    
-    学生信息:
-    - 姓名: {student_data.get('name', '学生')}
-    - 总分: {student_data.get('total_score', 'N/A')}
-    - 省份: {student_data.get('province', 'N/A')}
-    - 兴趣爱好: {', '.join(student_data.get('interests', []))}
-    - 学科优势: {', '.join(student_data.get('strengths', []))}
-    - 学科弱点: {', '.join(student_data.get('weaknesses', []))}
-    - 职业目标: {student_data.get('career_goals', 'N/A')}
-    
-    推荐策略: {strategy}（balanced=平衡推荐，aggressive=激进冲刺，conservative=保守稳妥）
-    
-    请推荐:
-    1. 3所冲刺院校（挑战性强，需要努力）
-    2. 3所匹配院校（与学生水平相当）
-    3. 3所保底院校（把握较大的选择）
-    
-    对于每所院校，请提供以下信息:
-    - 学校名称
-    - 学校类型
-    - 推荐理由
-    - 录取可能性评估
-    - 2-3个适合的专业推荐
-    
-    以JSON格式返回结果。格式如下:
-    {
-        "challenge": [
-            {
-                "school_id": 1,
-                "name": "学校名称",
-                "type": "学校类型",
-                "reason": "推荐理由",
-                "match": 0.6,
-                "admission_probability": "30%以下",
-                "recommended_majors": [{"name": "专业1"}, {"name": "专业2"}]
-            }
-        ],
-        "match": [...同上...],
-        "safety": [...同上...]
-    }
-    """
+    # 构建提示词（固定系统前缀 + 紧凑的学生信息）
+    messages = build_recommendation_messages(student_data, strategy)
 
     # 检查是否配置了API密钥
     if not settings.OPENAI_API_KEY:
@@ -75,34 +127,15 @@ async def get_llm_recommendation(
         return _mock_llm_recommendation(student_data, strategy)
 
     try:
-        # 调用OpenAI API
-        async with aiohttp.ClientSession() as session:
-            async with session.post(
-                "https://api.openai.com/v1/chat/completions",
-                headers={
-                    "Authorization": f"Bearer {settings.OPENAI_API_KEY}",
-                    "Content-Type": "application/json",
-                },
-                json={
-                    "model": settings.DEFAULT_MODEL,
-                    "messages": [
-                        {"role": "system", "content": "你是一个专业的升学顾问助手，负责根据学生信息推荐合适的院校。"},
-                        {"role": "user", "content": prompt},
-                    ],
-                    "temperature": 0.7,
-                    "max_tokens": 2000,
-                },
-            ) as response:
-                result = await response.json()
-                content = result["choices"][0]["message"]["content"]
-
-                # 解析JSON格式的回复
-                try:
-                    recommendation = json.loads(content)
-                    return recommendation
-                except json.JSONDecodeError:
-                    # 如果解析失败，使用模拟数据
-                    return _mock_llm_recommendation(student_data, strategy)
+        # 调用OpenAI兼容接口
+        content = await _chat_completion(messages, "recommendation")
+
+        # 解析JSON格式的回复（容忍代码块、附加说明和截断）
+        recommendation = parse_llm_json(content, validate_recommendation)
+        if recommendation is None:
+            # 如果解析失败，使用模拟数据
+            return _mock_llm_recommendation(student_data, strategy)
+        return recommendation
 
     except Exception as e:
         print(f"调用LLM API出错: {str(e)}")
@@ -276,110 +309,80 @@ async def get_llm_study_plan(plan_data: Dict[str, Any]) -> Dict[str, Any]:
     Returns:
         学习计划数据
     """
-    # 构建不同类型计划的提示词
-    student = plan_data.get("student", {})
     plan_type = plan_data.get("type", "overall")
 
-    if plan_type == "overall":
-        prompt = f"""
-        作为专业的学习规划师，请根据以下学生信息制定一个{plan_data.get('duration', '3个月')}的总体学习计划。
-        
-        学生信息:
-        - 姓名: {student.get('name', '学生')}
-        - 当前分数: {student.get('total_score', 'N/A')}
-        - 目标分数: {plan_data.get('target_score', student.get('total_score', 0) + 30)}
-        - 优势学科: {', '.join(student.get('strengths', []))}
-        - 弱势学科: {', '.join(student.get('weaknesses', []))}
-        - 重点提升科目: {', '.join(plan_data.get('focus_subjects', []))}
-        
-        请提供:
-        1. 总体学习规划概述
-        2. 每周学习安排建议
-        3. 明确的学习目标清单
-        4. 推荐的学习资源和材料
-        5. 学习进度里程碑
-        
-        以JSON格式返回结果。
-        """
-    elif plan_type == "weekly":
-        prompt = f"""
-        作为专业的学习规划师，请根据以下学生信息制定一周详细的学习计划安排。
-        
-        学生信息:
-        - 姓名: {student.get('name', '学生')}
-        - 当前分数: {student.get('total_score', 'N/A')}
-        - 优势学科: {', '.join(student.get('strengths', []))}
-        - 弱势学科: {', '.join(student.get('weaknesses', []))}
-        - 重点提升科目: {', '.join(plan_data.get('focus_subjects', []))}
-        
-        请提供一周七天的详细学习计划，包括:
-        1. 每天上午、下午、晚上的学习内容
-        2. 每天的具体任务和目标
-        3. 学习资源推荐
-        
-        以JSON格式返回结果，按周一到周日组织。
-        """
-    else:  # subject
-        subject = plan_data.get("subject", "")
-        prompt = f"""
-        作为专业的学习规划师，请根据以下学生信息制定一个{plan_data.get('duration', '1个月')}的{subject}学科提升计划。
-        
-        学生信息:
-        - 姓名: {student.get('name', '学生')}
-        - {subject}当前分数: {student.get('subject_score', 'N/A')}
-        - 该学科是否为弱项: {"是" if subject in student.get('weaknesses', []) else "否"}
-        - 该学科是否为优势: {"是" if subject in student.get('strengths', []) else "否"}
-        
-        请提供:
-        1. {subject}学科学习计划概述
-        2. 具体的提升目标
-        3. 学习重点和难点分析
-        4. 推荐的学习资源和材料
-        5. 学习进度里程碑
-        
-        以JSON格式返回结果。
-        """
-
     # 检查是否配置了API密钥
     if not settings.OPENAI_API_KEY:
         # 模拟学习计划
         return _mock_llm_study_plan(plan_data)
 
+    # 开启模板缓存时按模板生成，本地填充学生信息
+    if settings.STUDY_PLAN_CACHE_ENABLED:
+        template = await get_llm_study_plan_template(plan_data)
+        if template is None:
+            return _mock_llm_study_plan(plan_data)
+        return render(template, plan_data)
+
     try:
-        # 调用OpenAI API
-        async with aiohttp.ClientSession() as session:
-            async with session.post(
-                "https://api.openai.com/v1/chat/completions",
-                headers={
-                    "Authorization": f"Bearer {settings.OPENAI_API_KEY}",
-                    "Content-Type": "application/json",
-                },
-                json={
-                    "model": settings.DEFAULT_MODEL,
-                    "messages": [
-                        {"role": "system", "content": "你是一个专业的学习规划师，负责制定个性化学习计划。"},
-                        {"role": "user", "content": prompt},
-                    ],
-                    "temperature": 0.7,
-                    "max_tokens": 2000,
-                },
-            ) as response:
-                result = await response.json()
-                content = result["choices"][0]["message"]["content"]
-
-                # 解析JSON格式的回复
-                try:
-                    study_plan = json.loads(content)
-                    return study_plan
-                except json.JSONDecodeError:
-                    # 如果解析失败，使用模拟数据
-                    return _mock_llm_study_plan(plan_data)
+        # 调用OpenAI兼容接口
+        content = await _chat_completion(
+            build_study_plan_messages(plan_data), f"study_plan:{plan_type}"
+        )
+
+        # 解析JSON格式的回复（容忍代码块、附加说明和截断）
+        study_plan = parse_llm_json(
+            content, lambda data: validate_study_plan(data, plan_type)
+        )
+        if study_plan is None:
+            # 如果解析失败，使用模拟数据
+            return _mock_llm_study_plan(plan_data)
+        return study_plan
 
     except Exception as e:
         print(f"调用LLM API出错: {str(e)}")
         return _mock_llm_study_plan(plan_data)
 
 
+async def get_llm_study_plan_template(
+    plan_data: Dict[str, Any]
+) -> Optional[Dict[str, Any]]:
+    """使用LLM生成学习计划模板
+
+    请求中学生姓名、分数以占位符代替，生成的模板不含个人信息，
+    可用plan_template_cache.render填充为任一同参数（分段后）学生的计划。
+    参数相同的模板直接复用缓存。
+
+    Args:
+        plan_data: 计划参数数据
+
+    Returns:
+        学习计划模板，未配置API密钥或生成失败时返回None
+    """
+    plan_type = plan_data.get("type", "overall")
+    if not settings.OPENAI_API_KEY:
+        return None
+
+    cache_enabled = settings.STUDY_PLAN_CACHE_ENABLED
+    if cache_enabled:
+        cached = plan_template_cache.get_template(plan_data)
+        if cached is not None:
+            return cached
+
+    messages = build_study_plan_messages(templated_request(plan_data), templated=True)
+    try:
+        content = await _chat_completion(messages, f"study_plan:{plan_type}")
+        template = parse_llm_json(
+            content, lambda data: validate_study_plan(data, plan_type)
+        )
+    except Exception as e:
+        logger.warning("生成学习计划模板时调用LLM API出错: %s", e)
+        return None
+
+    if template is not None and cache_enabled:
+        plan_template_cache.put(plan_data, template)
+    return template
+
+
 def _mock_llm_study_plan(plan_data: Dict[str, Any]) -> Dict[str, Any]:
     """模拟LLM学习计划（当API调用失败或未配置时使用）"""
 
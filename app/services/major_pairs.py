@@ -0,0 +1,335 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+院校×专业组合评分
+学校级推荐只为每所院校附带前几个专业，大部分专业从未被评估。
+这里把每个省份内实际开设的(院校, 专业)组合展开为一组等长数组（稀疏的院校×专业矩阵，
+只存储实际存在的组合），用专业分数线批量计算录取概率，
+专业背景匹配度按不同的(专业名称, 学科门类)只计算一次再按编号展开，
+内存与实际开设的组合数成正比
+
+专业分数线优先取专业级预测分数线，其次取该专业最近一年的分数线，
+都没有时取所在院校的分数线（与分类表一致）
+"""
+
+import asyncio
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+import numpy as np
+from sqlalchemy import event, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.core.config import settings
+from app.db.base import async_session
+from app.db.events import changed_values, invalidate_on_commit
+from app.models.major import Major
+from app.models.score_forecast import ScoreForecast
+from app.models.score_line import ScoreLine
+from app.models.student import Student
+from app.services.admission_simulator import simulate_admission_probabilities
+from app.services.score_tables import (
+    FORECAST,
+    LATEST,
+    MATCH_MIN_DIFF,
+    SAFETY_MIN_DIFF,
+    admission_probability,
+    score_table_store,
+)
+
+# 组合分数线来源
+SOURCE_MAJOR_FORECAST = 0
+SOURCE_MAJOR_LINE = 1
+SOURCE_SCHOOL = 2
+
+
+class MajorPairTable:
+    """单个省份的院校×专业组合数组"""
+
+    def __init__(
+        self,
+        province: str,
+        arrays: Dict[str, np.ndarray],
+        profiles: List[Tuple[str, Optional[str]]],
+    ):
+        self.province = province
+        self.major_ids = arrays["major_ids"]
+        self.school_ids = arrays["school_ids"]
+        self.cutoffs = arrays["cutoffs"]
+        self.stds = arrays["stds"]
+        self.sources = arrays["sources"]
+        # 每个组合的专业画像编号，profiles[编号] = (专业名称, 学科门类)
+        self.profile_codes = arrays["profile_codes"]
+        self.profiles = profiles
+
+    def __len__(self) -> int:
+        return len(self.major_ids)
+
+
+def _latest_by_key(keys: List[int], years: List[int], values: List[float]) -> Dict[int, float]:
+    """每个键取最近一年的取值"""
+    latest: Dict[int, Tuple[int, float]] = {}
+    for key, year, value in zip(keys, years, values):
+        if key not in latest or year > latest[key][0]:
+            latest[key] = (year, value)
+    return {key: value for key, (_, value) in latest.items()}
+
+
+class MajorPairStore:
+    """各省份院校×专业组合数组的内存视图，专业或分数线变更时按省份重新生成"""
+
+    def __init__(self):
+        self._tables: Dict[str, MajorPairTable] = {}
+        self._versions: Dict[str, Tuple[Any, ...]] = {}
+        self._dirty_provinces: Set[str] = set()
+        self._lock = asyncio.Lock()
+
+    def invalidate(self, province: Optional[str] = None) -> None:
+        """标记省份的组合数组失效，province为空时全部失效"""
+        if province is None:
+            self._tables = {}
+            self._versions = {}
+        else:
+            self._dirty_provinces.add(province)
+
+    async def _version(self, db: AsyncSession, province: str) -> Tuple[Any, ...]:
+        """省份组合数组所依赖数据的版本
+
+        预测分数线由离线脚本在其他进程中重新生成，本进程的失效标记覆盖不到，
+        因此以预测记录数与最近更新时间、分类表的磁盘版本共同判断是否需要重新生成
+        """
+        result = await db.execute(
+            select(func.count(ScoreForecast.id), func.max(ScoreForecast.updated_at)).where(
+                ScoreForecast.province == province
+            )
+        )
+        return (
+            *result.one(),
+            score_table_store.current_version(province, LATEST),
+            score_table_store.current_version(province, FORECAST),
+        )
+
+    def _is_fresh(self, province: str, version: Tuple[Any, ...]) -> bool:
+        return (
+            province not in self._dirty_provinces and self._versions.get(province) == version
+        )
+
+    async def _build(self, db: AsyncSession, province: str) -> Optional[MajorPairTable]:
+        """生成省份的组合数组，该省没有任何分数线时返回None"""
+        school_table = score_table_store.get(province, FORECAST) or score_table_store.get(province)
+
+        result = await db.execute(
+            select(ScoreLine.major_id, ScoreLine.year, ScoreLine.min_score).where(
+                ScoreLine.province == province,
+                ScoreLine.major_id != None,
+                ScoreLine.min_score != None,
+            )
+        )
+        rows = result.all()
+        major_lines = _latest_by_key(*zip(*rows)) if rows else {}
+
+        result = await db.execute(
+            select(
+                ScoreForecast.major_id, ScoreForecast.predicted_score, ScoreForecast.std_error
+            ).where(ScoreForecast.province == province, ScoreForecast.major_id != None)
+        )
+        major_forecasts = {
+            major_id: (score, std) for major_id, score, std in result.all()
+        }
+
+        result = await db.execute(
+            select(Major.id, Major.school_id, Major.name, Major.category)
+        )
+        majors = result.all()
+        if not majors or (school_table is None and not major_lines and not major_forecasts):
+            return None
+
+        major_ids = np.array([m.id for m in majors], dtype=np.int64)
+        school_ids = np.array([m.school_id for m in majors], dtype=np.int64)
+        default_std = settings.CUTOFF_FORECAST_DEFAULT_STD
+
+        # 院校级分数线：按院校ID在分类表中二分查找
+        cutoffs = np.full(len(majors), np.nan)
+        stds = np.full(len(majors), default_std)
+        sources = np.full(len(majors), SOURCE_SCHOOL, dtype=np.uint8)
+        if school_table is not None and len(school_table):
+            order = np.argsort(school_table.school_ids)
+            sorted_ids = np.asarray(school_table.school_ids)[order]
+            position = np.clip(np.searchsorted(sorted_ids, school_ids), 0, len(sorted_ids) - 1)
+            found = sorted_ids[position] == school_ids
+            cutoffs[found] = np.asarray(school_table.cutoffs)[order][position[found]]
+            stds[found] = np.asarray(school_table.stds)[order][position[found]]
+
+        # 专业级分数线覆盖院校级分数线
+        for i, major_id in enumerate(major_ids.tolist()):
+            if major_id in major_forecasts:
+                cutoffs[i], stds[i] = major_forecasts[major_id]
+                sources[i] = SOURCE_MAJOR_FORECAST
+            elif major_id in major_lines:
+                cutoffs[i] = major_lines[major_id]
+                stds[i] = default_std
+                sources[i] = SOURCE_MAJOR_LINE
+
+        # 只保留有分数线的组合
+        offered = ~np.isnan(cutoffs)
+        profile_index: Dict[Tuple[str, Optional[str]], int] = {}
+        profile_codes = np.array(
+            [
+                profile_index.setdefault((m.name, m.category), len(profile_index))
+                for m, keep in zip(majors, offered.tolist())
+                if keep
+            ],
+            dtype=np.int32,
+        )
+        arrays = {
+            "major_ids": major_ids[offered].astype(np.int32),
+            "school_ids": school_ids[offered].astype(np.int32),
+            "cutoffs": cutoffs[offered].astype(np.float32),
+            "stds": stds[offered].astype(np.float32),
+            "sources": sources[offered],
+            "profile_codes": profile_codes,
+        }
+        return MajorPairTable(province, arrays, list(profile_index))
+
+    async def ensure_fresh(self, province: str) -> None:
+        """生成缺失、失效或依赖数据已变化的省份组合数组"""
+        await score_table_store.ensure_fresh()
+        async with async_session() as session:
+            version = await self._version(session, province)
+        if self._is_fresh(province, version):
+            return
+        async with self._lock:
+            if self._is_fresh(province, version):
+                return
+            async with async_session() as session:
+                self._dirty_provinces.discard(province)
+                table = await self._build(session, province)
+            if table is None:
+                self._tables.pop(province, None)
+            else:
+                self._tables[province] = table
+            self._versions[province] = version
+
+    def get(self, province: str) -> Optional[MajorPairTable]:
+        """获取省份的组合数组"""
+        return self._tables.get(province)
+
+
+def _student_major_targets(student: Student) -> Tuple[List[str], List[str]]:
+    """学生的目标专业与兴趣（小写）"""
+    targets = student.target_majors if isinstance(student.target_majors, list) else []
+    interests = student.interests if isinstance(student.interests, list) else []
+    return (
+        [t.lower() for t in targets if isinstance(t, str) and t],
+        [i.lower() for i in interests if isinstance(i, str) and i],
+    )
+
+
+def background_match(
+    student: Student, profiles: List[Tuple[str, Optional[str]]]
+) -> np.ndarray:
+    """计算学生与各专业画像的背景匹配度（按画像计算，调用方按编号展开到组合）"""
+    targets, interests = _student_major_targets(student)
+    if not targets and not interests:
+        return np.full(len(profiles), 0.5)  # 默认中等匹配度
+
+    scores = np.empty(len(profiles))
+    for i, (name, category) in enumerate(profiles):
+        name = (name or "").lower()
+        category = (category or "").lower()
+        if name in targets:
+            scores[i] = 1.0  # 目标专业
+        elif any(t in name or name in t for t in targets):
+            scores[i] = 0.85  # 目标专业的方向/相近名称
+        elif category and category in targets:
+            scores[i] = 0.7  # 目标学科门类
+        elif any(interest in name for interest in interests):
+            scores[i] = 0.6  # 与兴趣相关
+        else:
+            scores[i] = 0.4
+    return scores
+
+
+def score_pairs(
+    table: MajorPairTable,
+    student: Student,
+    candidate_ids: Optional[Set[int]] = None,
+    seed: Optional[int] = None,
+) -> Dict[str, np.ndarray]:
+    """对省份内全部组合批量评分
+
+    Returns:
+        index: 参与评分的组合下标
+        probability: 录取概率
+        background: 专业背景匹配度
+        match: 综合匹配度
+        category: 类别编号（0=保底, 1=稳妥, 2=冲刺）
+    """
+    index = np.arange(len(table))
+    if candidate_ids is not None:
+        index = index[np.isin(table.school_ids, list(candidate_ids))]
+
+    cutoffs = table.cutoffs[index].astype(np.float64)
+    diffs = student.total_score - cutoffs
+    if settings.ADMISSION_SIMULATION_ENABLED:
+        probability = simulate_admission_probabilities(
+            student.total_score,
+            settings.ADMISSION_SCORE_STD,
+            cutoffs,
+            table.stds[index],
+            n_samples=settings.ADMISSION_SIMULATION_SAMPLES,
+            seed=seed,
+        )
+        category = np.where(
+            probability >= settings.ADMISSION_SAFETY_PROBABILITY,
+            0,
+            np.where(probability >= settings.ADMISSION_MATCH_PROBABILITY, 1, 2),
+        )
+    else:
+        probability = admission_probability(diffs)
+        category = np.where(
+            diffs >= SAFETY_MIN_DIFF, 0, np.where(diffs >= MATCH_MIN_DIFF, 1, 2)
+        )
+
+    background = background_match(student, table.profiles)[table.profile_codes[index]]
+    weights = settings.MAJOR_PAIR_WEIGHTS
+    match = probability * weights["probability"] + background * weights["background"]
+    return {
+        "index": index,
+        "probability": probability,
+        "background": background,
+        "match": match,
+        "category": category,
+    }
+
+
+def top_pairs(scored: Dict[str, np.ndarray], category: int, k: int) -> np.ndarray:
+    """取某一类别综合匹配度最高的k个组合（返回scored数组中的位置，按匹配度降序）"""
+    members = np.nonzero(scored["category"] == category)[0]
+    if k <= 0 or not len(members):
+        return members[:0]
+    if len(members) > k:
+        members = members[np.argpartition(-scored["match"][members], k - 1)[:k]]
+    return members[np.argsort(-scored["match"][members], kind="stable")]
+
+
+# 全局组合数组存储
+major_pair_store = MajorPairStore()
+
+
+@event.listens_for(Major, "after_insert")
+@event.listens_for(Major, "after_update")
+@event.listens_for(Major, "after_delete")
+def _invalidate_major_pairs(mapper, connection, target):
+    """专业变更时（提交后）全部组合数组失效"""
+    invalidate_on_commit(target, major_pair_store.invalidate)
+
+
+@event.listens_for(ScoreLine, "after_insert")
+@event.listens_for(ScoreLine, "after_update")
+@event.listens_for(ScoreLine, "after_delete")
+def _invalidate_province_pairs(mapper, connection, target):
+    """分数线变更时（提交后）重新生成对应省份（含修改前的省份）的组合数组"""
+    for province in changed_values(target, "province"):
+        invalidate_on_commit(target, major_pair_store.invalidate, province)
@@ -0,0 +1,245 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+学习计划模板缓存
+大多数学习计划只在计划类型、时长、重点科目和目标分数段上有差别。
+按这些（分段后的）参数缓存LLM生成的计划结构。开启缓存时，发给LLM的请求中
+学生姓名、分数以占位符给出（分数只附带所在分数段），LLM输出中直接使用占位符，
+缓存的即为不含个人信息的模板；返回或命中时再在本地填入当前学生的信息
+"""
+
+import copy
+import re
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from app.core.config import settings
+
+# 模板中的占位符
+_PLACEHOLDER_PATTERN = re.compile(r"\{\{(name|total_score|target_score|subject_score)\}\}")
+
+
+def _missing(value: Any) -> bool:
+    """字段未填写（0分是有效分数，不视为缺失）"""
+    return value is None or value == ""
+
+
+def _score_band(score: Any, band: int) -> Optional[int]:
+    """将分数归入分数段（取分数段下界）"""
+    if _missing(score):
+        return None
+    try:
+        return int(float(score) // band * band)
+    except (TypeError, ValueError):
+        return None
+
+
+def _format_score(score: Any) -> str:
+    """格式化分数，整数分不带小数点"""
+    try:
+        number = float(score)
+    except (TypeError, ValueError):
+        return str(score)
+    return str(int(number)) if number.is_integer() else str(number)
+
+
+def _student_fields(plan_data: Dict[str, Any]) -> Dict[str, Any]:
+    """提取需要个性化填充的学生字段"""
+    student = plan_data.get("student", {}) or {}
+    target_score = plan_data.get("target_score")
+    if _missing(target_score):
+        target_score = student.get("target_score")
+    if _missing(target_score) and not _missing(student.get("total_score")):
+        target_score = student["total_score"] + 30
+    return {
+        "name": student.get("name"),
+        "total_score": student.get("total_score"),
+        "target_score": target_score,
+        "subject_score": student.get("subject_score"),
+    }
+
+
+def _subjects(value: Any) -> Tuple[str, ...]:
+    """优势/弱势学科归一化为排序后的元组"""
+    if _missing(value):
+        return ()
+    if isinstance(value, str):
+        return (value,)
+    return tuple(sorted(str(item) for item in value))
+
+
+def _profile_key(plan_data: Dict[str, Any]) -> Tuple:
+    """请求中会写入提示词的优势/弱势学科
+
+    学科计划的提示词只包含该学科是否为优势、弱项，其余计划包含完整的优势、弱势学科。
+    """
+    student = plan_data.get("student", {}) or {}
+    strengths = _subjects(student.get("strengths"))
+    weaknesses = _subjects(student.get("weaknesses"))
+    if plan_data.get("type", "overall") == "subject":
+        subject = plan_data.get("subject") or ""
+        return (subject in strengths, subject in weaknesses)
+    return (strengths, weaknesses)
+
+
+def make_template_key(plan_data: Dict[str, Any], band: Optional[int] = None) -> Tuple:
+    """根据计划参数生成模板缓存键
+
+    键由计划类型、时长、重点科目（排序后）、学科、优势/弱势学科和分数段组成：
+    总体计划按目标分数分段，周计划按当前总分分段，学科计划按该学科分数分段。
+    提示词中除姓名、分数（以占位符给出）外的学生信息都包含在键中，
+    同一模板不会用于画像不同的学生。
+    """
+    band = band or settings.STUDY_PLAN_CACHE_SCORE_BAND
+    plan_type = plan_data.get("type", "overall")
+    fields = _student_fields(plan_data)
+
+    if plan_type == "overall":
+        score = fields["target_score"]
+    elif plan_type == "weekly":
+        score = fields["total_score"]
+    else:
+        score = fields["subject_score"]
+
+    return (
+        plan_type,
+        plan_data.get("duration") or "",
+        tuple(sorted(plan_data.get("focus_subjects") or [])),
+        plan_data.get("subject") or "",
+        _profile_key(plan_data),
+        _score_band(score, band),
+    )
+
+
+def _band_hint(score: Any, band: int) -> str:
+    """分数所在分数段的说明（如“约520-539分”），分数未知时为空"""
+    lower = _score_band(score, band)
+    if lower is None:
+        return ""
+    return f"（约{lower}-{lower + band - 1}分）"
+
+
+def templated_request(
+    plan_data: Dict[str, Any], band: Optional[int] = None
+) -> Dict[str, Any]:
+    """生成发给LLM的计划参数：学生姓名、分数替换为占位符
+
+    分数后附带所在分数段，LLM据此把握难度，但拿不到具体数值，
+    生成的计划中只能以占位符引用姓名与分数，可直接作为模板缓存。
+    """
+    band = band or settings.STUDY_PLAN_CACHE_SCORE_BAND
+    fields = _student_fields(plan_data)
+    request = copy.deepcopy(plan_data)
+    student = request.setdefault("student", {})
+    student["name"] = "{{name}}"
+    for key in ["total_score", "target_score", "subject_score"]:
+        if _missing(fields[key]):
+            continue
+        student[key] = "{{" + key + "}}" + _band_hint(fields[key], band)
+    if "target_score" in student:
+        request["target_score"] = student["target_score"]
+    return request
+
+
+def _substitute(obj: Any, replace) -> Any:
+    """递归替换结构中所有字符串"""
+    if isinstance(obj, str):
+        return replace(obj)
+    if isinstance(obj, list):
+        return [_substitute(item, replace) for item in obj]
+    if isinstance(obj, dict):
+        return {key: _substitute(value, replace) for key, value in obj.items()}
+    return obj
+
+
+def render(template: Dict[str, Any], plan_data: Dict[str, Any]) -> Dict[str, Any]:
+    """用当前学生信息填充模板中的占位符"""
+    fields = _student_fields(plan_data)
+    defaults = {
+        "total_score": "当前分数",
+        "target_score": "目标分数",
+        "subject_score": "当前分数",
+    }
+    values = {"name": str(fields["name"] or "学生")}
+    for key, default in defaults.items():
+        values[key] = default if _missing(fields[key]) else _format_score(fields[key])
+
+    def replace(text: str) -> str:
+        if "{{" not in text:
+            return text
+        return _PLACEHOLDER_PATTERN.sub(lambda m: values[m.group(1)], text)
+
+    return _substitute(template, replace)
+
+
+class PlanTemplateCache:
+    """学习计划模板缓存（LRU + TTL）"""
+
+    def __init__(self, max_size: int = 512, ttl_seconds: float = 86400.0):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Tuple, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, plan_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """查找模板并填充为当前学生的计划，未命中返回None"""
+        template = self.get_template(plan_data)
+        return render(template, plan_data) if template is not None else None
+
+    def get_template(self, plan_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """查找模板（不填充学生信息），未命中返回None"""
+        key = make_template_key(plan_data)
+        entry = self._entries.get(key)
+        if entry is not None and time.monotonic() - entry[0] > self.ttl_seconds:
+            del self._entries[key]
+            self.expirations += 1
+            entry = None
+
+        if entry is None:
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def put(self, plan_data: Dict[str, Any], template: Dict[str, Any]) -> None:
+        """缓存按templated_request请求LLM生成的计划模板"""
+        key = make_template_key(plan_data)
+        self._entries[key] = (time.monotonic(), template)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self) -> None:
+        """清空缓存（统计一并重置）"""
+        self._entries.clear()
+        self.hits = self.misses = self.evictions = self.expirations = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """缓存统计"""
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+# 全局模板缓存
+plan_template_cache = PlanTemplateCache(
+    max_size=settings.STUDY_PLAN_CACHE_MAX_SIZE,
+    ttl_seconds=settings.STUDY_PLAN_CACHE_TTL_SECONDS,
+)
@@ -0,0 +1,251 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+学习计划进度跟踪
+进度以事件形式追加写入，计划的进度汇总按事件增量原子更新，
+无需读取并重写整个学习计划记录
+"""
+
+from datetime import date, datetime
+from typing import Any, Dict, List
+
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.db.dialect import dialect_insert
+from app.models.study_plan import (
+    StudyPlanProgressEvent,
+    StudyPlanProgressSummary,
+    StudyPlanTaskOverride,
+)
+
+# 支持的进度事件类型
+EVENT_TYPES = [
+    "task_completed",  # 完成一天的任务
+    "task_uncompleted",  # 取消完成标记
+    "hours_logged",  # 记录学习时长
+    "milestone_reached",  # 达成里程碑
+    "check_in",  # 打卡/备注
+]
+
+
+class ProgressEventError(ValueError):
+    """进度事件无效"""
+
+
+def _validate_event(event: Dict[str, Any]) -> None:
+    """校验单个进度事件"""
+    event_type = event.get("event_type")
+    if event_type not in EVENT_TYPES:
+        raise ProgressEventError(f"不支持的进度事件类型: {event_type}")
+    if event_type == "hours_logged" and not (event.get("hours") or 0) > 0:
+        raise ProgressEventError("记录学习时长时须提供大于0的hours")
+
+
+def _summary_deltas(events: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """汇总一批事件对进度汇总的增量"""
+    deltas = {
+        "tasks_completed": 0,
+        "hours_logged": 0.0,
+        "milestones_reached": 0,
+        "check_ins": 0,
+        "events_count": len(events),
+    }
+    for event in events:
+        event_type = event["event_type"]
+        if event_type == "task_completed":
+            deltas["tasks_completed"] += 1
+        elif event_type == "task_uncompleted":
+            deltas["tasks_completed"] -= 1
+        elif event_type == "milestone_reached":
+            deltas["milestones_reached"] += 1
+        elif event_type == "check_in":
+            deltas["check_ins"] += 1
+        # 任何事件都可附带学习时长
+        deltas["hours_logged"] += float(event.get("hours") or 0)
+    return deltas
+
+
+async def record_progress(
+    db: AsyncSession, plan_id: int, events: List[Dict[str, Any]], commit: bool = True
+) -> int:
+    """追加进度事件并增量更新进度汇总
+
+    带event_id的事件按(plan_id, event_id)去重：客户端重试时重复上报的事件只记录一次，
+    也不会重复计入汇总
+
+    Args:
+        db: 数据库会话
+        plan_id: 学习计划ID
+        events: 进度事件列表（event_id, event_type, date, subject, hours, detail）
+        commit: 是否立即提交
+
+    Returns:
+        实际记录的事件数
+
+    Raises:
+        ProgressEventError: 事件无效
+    """
+    for event in events:
+        _validate_event(event)
+    events = await _insert_new_events(db, plan_id, events)
+    if not events:
+        return 0
+
+    # 以单条INSERT ... ON CONFLICT原子地累加汇总，汇总不存在时直接插入
+    deltas = _summary_deltas(events)
+    statement = dialect_insert(db, StudyPlanProgressSummary).values(
+        plan_id=plan_id,
+        last_event_type=events[-1]["event_type"],
+        last_event_at=datetime.now(),
+        **deltas,
+    )
+    excluded = statement.excluded
+    values = {
+        column: getattr(StudyPlanProgressSummary, column) + getattr(excluded, column)
+        for column in deltas
+    }
+    values["last_event_type"] = excluded.last_event_type
+    values["last_event_at"] = excluded.last_event_at
+    await db.execute(
+        statement.on_conflict_do_update(index_elements=["plan_id"], set_=values)
+    )
+
+    if commit:
+        await db.commit()
+    return len(events)
+
+
+async def _insert_new_events(
+    db: AsyncSession, plan_id: int, events: List[Dict[str, Any]]
+) -> List[Dict[str, Any]]:
+    """写入事件，返回实际写入（未因event_id重复而跳过）的事件"""
+    unique_events = []
+    seen_ids = set()
+    for event in events:
+        event_id = event.get("event_id")
+        if event_id is not None:
+            if event_id in seen_ids:
+                continue
+            seen_ids.add(event_id)
+        unique_events.append(event)
+    if not unique_events:
+        return []
+
+    statement = (
+        dialect_insert(db, StudyPlanProgressEvent)
+        .values(
+            [
+                {
+                    "plan_id": plan_id,
+                    "event_id": event.get("event_id"),
+                    "event_type": event["event_type"],
+                    "date": event.get("date"),
+                    "subject": event.get("subject"),
+                    "hours": event.get("hours"),
+                    "detail": event.get("detail"),
+                }
+                for event in unique_events
+            ]
+        )
+        .on_conflict_do_nothing(index_elements=["plan_id", "event_id"])
+    )
+    if not seen_ids:
+        await db.execute(statement)
+        return unique_events
+
+    # 只有真正插入的行会被RETURNING返回
+    result = await db.execute(statement.returning(StudyPlanProgressEvent.event_id))
+    inserted_ids = {row.event_id for row in result}
+    return [
+        event
+        for event in unique_events
+        if event.get("event_id") is None or event["event_id"] in inserted_ids
+    ]
+
+
+async def ensure_task_override(db: AsyncSession, plan_id: int, task_date: date) -> None:
+    """某天的任务覆盖记录不存在时插入（并发请求不会因唯一约束冲突而失败）"""
+    await db.execute(
+        dialect_insert(db, StudyPlanTaskOverride)
+        .values(plan_id=plan_id, date=task_date, completed=False)
+        .on_conflict_do_nothing(index_elements=["plan_id", "date"])
+    )
+
+
+async def set_task_completed(
+    db: AsyncSession, plan_id: int, task_date: date, completed: bool
+) -> bool:
+    """修改某天任务的完成状态，状态确有变化时追加一条进度事件（不提交）
+
+    以条件UPDATE判断状态是否变化，同一天的并发请求只有一个会计入进度汇总
+
+    Returns:
+        完成状态是否发生变化
+    """
+    await ensure_task_override(db, plan_id, task_date)
+    result = await db.execute(
+        update(StudyPlanTaskOverride)
+        .where(
+            StudyPlanTaskOverride.plan_id == plan_id,
+            StudyPlanTaskOverride.date == task_date,
+            StudyPlanTaskOverride.completed.is_not(completed),
+        )
+        .values(completed=completed)
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount == 0:
+        return False
+    event_type = "task_completed" if completed else "task_uncompleted"
+    await record_progress(
+        db, plan_id, [{"event_type": event_type, "date": task_date}], commit=False
+    )
+    return True
+
+
+async def get_progress(
+    db: AsyncSession, plan_id: int, recent: int = 20
+) -> Dict[str, Any]:
+    """获取进度汇总与最近的进度事件"""
+    result = await db.execute(
+        select(StudyPlanProgressSummary).where(
+            StudyPlanProgressSummary.plan_id == plan_id
+        )
+    )
+    summary = result.scalars().first()
+
+    events = []
+    if recent > 0:
+        result = await db.execute(
+            select(StudyPlanProgressEvent)
+            .where(StudyPlanProgressEvent.plan_id == plan_id)
+            .order_by(StudyPlanProgressEvent.id.desc())
+            .limit(recent)
+        )
+        events = [
+            {
+                "id": e.id,
+                "event_id": e.event_id,
+                "event_type": e.event_type,
+                "date": e.date,
+                "subject": e.subject,
+                "hours": e.hours,
+                "detail": e.detail,
+                "created_at": e.created_at,
+            }
+            for e in result.scalars().all()
+        ]
+
+    return {
+        "plan_id": plan_id,
+        "tasks_completed": summary.tasks_completed if summary else 0,
+        "hours_logged": round(summary.hours_logged, 2) if summary else 0.0,
+        "milestones_reached": summary.milestones_reached if summary else 0,
+        "check_ins": summary.check_ins if summary else 0,
+        "events_count": summary.events_count if summary else 0,
+        "last_event_type": summary.last_event_type if summary else None,
+        "last_event_at": summary.last_event_at if summary else None,
+        "recent_events": events,
+    }
@@ -0,0 +1,260 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+一分一段表与位次匹配
+各年份的原始分数受试卷难度影响不可直接比较，位次则可以：
+将院校历年的最低位次（缺失时由当年一分一段表把最低分换算为位次）取平均，
+再用考生所在年份的一分一段表换算为等效分数，与考生分数比较
+
+分数与位次的相互换算基于有序数组上的二分查找，可对全部院校批量计算
+"""
+
+import asyncio
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.core.config import settings
+from app.db.base import async_session
+from app.db.events import changed_values, invalidate_on_commit
+from app.models.score_line import ScoreLine
+from app.models.score_segment import ScoreSegment
+from app.services.score_tables import (
+    MATCH_MIN_DIFF,
+    SAFETY_MIN_DIFF,
+    admission_probability,
+)
+
+
+class ScoreSegmentError(ValueError):
+    """一分一段数据无效"""
+
+
+def normalize_segment_rows(
+    rows: Iterable[Sequence[Any]],
+) -> Tuple[List[int], List[int]]:
+    """将一分一段原始数据整理为(分数降序, 累计人数升序)两个数组
+
+    Args:
+        rows: (分数, 本段人数) 或 (分数, 本段人数, 累计人数)；
+              未提供累计人数时按分数从高到低累加本段人数
+
+    Raises:
+        ScoreSegmentError: 数据为空、分数重复或累计人数不递增
+    """
+    items = []
+    for row in rows:
+        cum = row[2] if len(row) > 2 and row[2] not in (None, "") else None
+        items.append((int(row[0]), int(row[1]), int(cum) if cum is not None else None))
+    items.sort(key=lambda item: item[0], reverse=True)
+    if not items:
+        raise ScoreSegmentError("一分一段数据为空")
+
+    scores: List[int] = []
+    cumulative: List[int] = []
+    total = 0
+    for score, count, cum in items:
+        if scores and score == scores[-1]:
+            raise ScoreSegmentError(f"分数{score}重复")
+        total = cum if cum is not None else total + count
+        if cumulative and total < cumulative[-1]:
+            raise ScoreSegmentError(f"分数{score}的累计人数小于更高分数的累计人数")
+        scores.append(score)
+        cumulative.append(total)
+    return scores, cumulative
+
+
+class ScoreRankTable:
+    """单个省份、年份的分数-位次换算表"""
+
+    def __init__(self, province: str, year: int, scores: Sequence[int], cumulative: Sequence[int]):
+        self.province = province
+        self.year = year
+        # 降序分数与升序累计人数（按位次查分数）
+        self._scores_desc = np.asarray(scores, dtype=np.float64)
+        self._cumulative = np.asarray(cumulative, dtype=np.int64)
+        # 升序分数与对应累计人数（按分数查位次）
+        self._scores_asc = self._scores_desc[::-1]
+        self._cumulative_by_asc = self._cumulative[::-1]
+
+    @property
+    def total(self) -> int:
+        """参考人数"""
+        return int(self._cumulative[-1])
+
+    def score_to_rank(self, score):
+        """分数换算为位次（该分数及以上的累计人数，支持数组）
+
+        不在表中的分数取表中不高于它的最近分数，低于表中最低分时取总人数
+        """
+        index = np.searchsorted(self._scores_asc, score, side="right") - 1
+        ranks = np.where(
+            index >= 0, self._cumulative_by_asc[np.clip(index, 0, None)], self.total
+        )
+        return ranks if np.ndim(ranks) else int(ranks)
+
+    def rank_to_score(self, rank):
+        """位次换算为分数（累计人数首次达到该位次的分数，支持数组）"""
+        index = np.searchsorted(self._cumulative, rank, side="left")
+        scores = self._scores_desc[np.clip(index, 0, len(self._scores_desc) - 1)]
+        return scores if np.ndim(scores) else float(scores)
+
+
+class RankTableStore:
+    """一分一段表及院校等效位次的内存视图
+
+    一分一段表变更时全部重新加载；分数线变更时只重新计算对应省份的院校等效位次
+    """
+
+    def __init__(self):
+        self._tables: Dict[Tuple[str, int], ScoreRankTable] = {}
+        self._latest_years: Dict[str, int] = {}
+        # 省份 -> (院校ID数组, 等效位次数组)
+        self._school_ranks: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        self._dirty_provinces: Set[str] = set()
+        self._loaded = False
+        self._lock = asyncio.Lock()
+
+    def invalidate(self, province: Optional[str] = None) -> None:
+        """标记省份的院校等效位次失效，province为空时重新加载一分一段表"""
+        if province is None:
+            self._loaded = False
+        else:
+            self._dirty_provinces.add(province)
+
+    async def _load(self, db: AsyncSession) -> None:
+        """加载全部一分一段表"""
+        result = await db.execute(select(ScoreSegment))
+        self._tables = {
+            (segment.province, segment.year): ScoreRankTable(
+                segment.province, segment.year, segment.scores, segment.cumulative
+            )
+            for segment in result.scalars().all()
+        }
+        latest: Dict[str, int] = {}
+        for province, year in self._tables:
+            latest[province] = max(year, latest.get(province, year))
+        self._latest_years = latest
+        self._school_ranks = {}
+        self._loaded = True
+
+    async def _compute_school_ranks(self, db: AsyncSession, province: str) -> None:
+        """计算省份内各院校近几年的平均位次"""
+        result = await db.execute(
+            select(ScoreLine.school_id, ScoreLine.year, ScoreLine.min_score, ScoreLine.min_rank)
+            .where(ScoreLine.province == province, ScoreLine.major_id == None)
+        )
+        rows = result.all()
+        years = sorted({row.year for row in rows}, reverse=True)[: settings.RANK_MATCH_YEARS]
+
+        ranks_by_school: Dict[int, List[float]] = defaultdict(list)
+        for row in rows:
+            if row.year not in years:
+                continue
+            if row.min_rank:
+                ranks_by_school[row.school_id].append(row.min_rank)
+                continue
+            table = self._tables.get((province, row.year))
+            if table is not None and row.min_score is not None:
+                ranks_by_school[row.school_id].append(table.score_to_rank(row.min_score))
+
+        school_ids = np.array(list(ranks_by_school), dtype=np.int64)
+        ranks = np.array([np.mean(values) for values in ranks_by_school.values()], dtype=np.float64)
+        self._school_ranks[province] = (school_ids, ranks)
+
+    async def ensure_fresh(self, province: str) -> None:
+        """加载一分一段表并（重新）计算省份的院校等效位次"""
+        if self._loaded and province in self._school_ranks and province not in self._dirty_provinces:
+            return
+        async with self._lock:
+            async with async_session() as session:
+                if not self._loaded:
+                    await self._load(session)
+                if province not in self._school_ranks or province in self._dirty_provinces:
+                    self._dirty_provinces.discard(province)
+                    await self._compute_school_ranks(session, province)
+
+    def get(self, province: str, year: Optional[int] = None) -> Optional[ScoreRankTable]:
+        """获取一分一段表，未指定年份时取该省最近一年"""
+        if year is None:
+            year = self._latest_years.get(province)
+        return self._tables.get((province, year))
+
+    def match(
+        self,
+        province: str,
+        score: float,
+        rank: Optional[int] = None,
+        candidate_ids: Optional[Set[int]] = None,
+    ) -> Optional[Dict[str, List[Dict[str, Any]]]]:
+        """按等效位次对省份内全部院校分类
+
+        Args:
+            province: 考生所在省份
+            score: 考生分数
+            rank: 考生位次，为空时由最近一年的一分一段表换算
+            candidate_ids: 候选院校集合，为空时不限
+
+        Returns:
+            {类别: [{school_id, score(等效分数), equivalent_rank, probability}]}，
+            各类内按录取概率降序；该省没有一分一段表时返回None
+        """
+        table = self.get(province)
+        if table is None or province not in self._school_ranks:
+            return None
+        school_ids, school_ranks = self._school_ranks[province]
+        if candidate_ids is not None and len(school_ids):
+            mask = np.isin(school_ids, list(candidate_ids))
+            school_ids, school_ranks = school_ids[mask], school_ranks[mask]
+
+        student_rank = rank if rank else table.score_to_rank(score)
+        student_score = table.rank_to_score(student_rank)
+        equivalent_scores = table.rank_to_score(school_ranks)
+        diffs = student_score - equivalent_scores
+        probabilities = admission_probability(diffs)
+
+        # 按等效分数升序即录取概率降序
+        order = np.argsort(equivalent_scores, kind="stable")
+        result: Dict[str, List[Dict[str, Any]]] = {"safety": [], "match": [], "challenge": []}
+        for i in order.tolist():
+            if diffs[i] >= SAFETY_MIN_DIFF:
+                category = "safety"
+            elif diffs[i] >= MATCH_MIN_DIFF:
+                category = "match"
+            else:
+                category = "challenge"
+            result[category].append(
+                {
+                    "school_id": int(school_ids[i]),
+                    "score": float(equivalent_scores[i]),
+                    "equivalent_rank": int(round(school_ranks[i])),
+                    "probability": float(probabilities[i]),
+                }
+            )
+        return result
+
+
+# 全局位次换算存储
+rank_table_store = RankTableStore()
+
+
+@event.listens_for(ScoreSegment, "after_insert")
+@event.listens_for(ScoreSegment, "after_update")
+@event.listens_for(ScoreSegment, "after_delete")
+def _invalidate_rank_tables(mapper, connection, target):
+    """一分一段表变更时（提交后）重新加载"""
+    invalidate_on_commit(target, rank_table_store.invalidate)
+
+
+@event.listens_for(ScoreLine, "after_insert")
+@event.listens_for(ScoreLine, "after_update")
+@event.listens_for(ScoreLine, "after_delete")
+def _invalidate_school_ranks(mapper, connection, target):
+    """分数线变更时（提交后）重新计算对应省份（含修改前的省份）的院校等效位次"""
+    for province in changed_values(target, "province"):
+        invalidate_on_commit(target, rank_table_store.invalidate, province)
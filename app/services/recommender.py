@@ -6,9 +6,10 @@
 集成多种推荐算法：LLM推荐、协同过滤、基于内容推荐、分数预测
 """
 
+import logging
 import random
 import numpy as np
-from typing import List, Dict, Any, Optional, Tuple
+from typing import List, Dict, Any, Optional, Set, Tuple
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from sqlalchemy import func
@@ -16,11 +17,32 @@ from sqlalchemy import func
 from app.models.student import Student
 from app.models.school import School
 from app.models.major import Major
-from app.models.score_line import ScoreLine
 from app.models.recommendation import Recommendation
 from app.services.llm_service import get_llm_recommendation
+from app.services.school_name_index import school_name_index
+from app.services.school_bitmap_index import BitmapFilterError, school_bitmap_index
+from app.services.score_tables import FORECAST, score_table_store
+from app.services.rank_tables import rank_table_store
+from app.services.student_clusters import student_cluster_store, target_school_ids
+from app.services.student_index import student_index
+from app.services.admission_simulator import simulate_admission_probabilities
+from app.services.major_pairs import (
+    SOURCE_SCHOOL,
+    major_pair_store,
+    score_pairs,
+    top_pairs,
+)
+from app.services.school_features import (
+    school_feature_store,
+    compute_school_features,
+    get_region,
+)
+from app.services.geo import distance_decay, get_city_table, nearest_distance_km
+from app.services.dimension_cache import dimension_vector_cache
 from app.core.config import settings
 
+logger = logging.getLogger(__name__)
+
 
 class SchoolRecommender:
     """学校推荐系统"""
@@ -36,6 +58,10 @@ class SchoolRecommender:
         include_majors: bool = True,
         prefer_provinces: Optional[List[str]] = None,
         prefer_school_types: Optional[List[str]] = None,
+        school_filter: Optional[Dict[str, Any]] = None,
+        matching: str = "score",
+        student_rank: Optional[int] = None,
+        simulation_seed: Optional[int] = None,
     ) -> Dict[str, Any]:
         """为学生推荐学校
 
@@ -46,6 +72,10 @@ class SchoolRecommender:
             include_majors: 是否包含专业推荐
             prefer_provinces: 优先推荐省份列表
             prefer_school_types: 优先推荐学校类型
+            school_filter: 院校筛选表达式（AND/OR/NOT组合），只在符合条件的院校中推荐
+            matching: 分数预测的比较方式（score=按最新分数线, rank=按历年等效位次）
+            student_rank: 学生位次，位次匹配时为空则由一分一段表换算
+            simulation_seed: 录取概率模拟的随机种子，指定后结果可复现
 
         Returns:
             包含推荐学校的字典
@@ -58,29 +88,7 @@ class SchoolRecommender:
             return {"status": "error", "message": "未找到学生信息"}
 
         # 确定推荐数量分配（冲刺/稳妥/保底）
-        if strategy == "aggressive":
-            # 激进策略：更多冲刺院校
-            category_counts = {"challenge": 5, "match": 3, "safety": 1}
-        elif strategy == "conservative":
-            # 保守策略：更多保底院校
-            category_counts = {"challenge": 1, "match": 3, "safety": 5}
-        else:
-            # 平衡策略：均衡分配
-            category_counts = {"challenge": 3, "match": 3, "safety": 3}
-
-        # 确保总数正确
-        total = sum(category_counts.values())
-        if total != num_recommendations:
-            # 按比例调整
-            for key in category_counts:
-                category_counts[key] = max(
-                    1, int(round(category_counts[key] * num_recommendations / total))
-                )
-            # 调整可能的误差
-            adjust_key = "match"  # 默认调整匹配院校数量
-            category_counts[adjust_key] += num_recommendations - sum(
-                category_counts.values()
-            )
+        category_counts = self._allocate_category_counts(strategy, num_recommendations)
 
         # 获取学生成绩和省份
         student_score = student.total_score
@@ -89,22 +97,46 @@ class SchoolRecommender:
         if not student_score:
             return {"status": "error", "message": "无法获取有效的学生分数"}
 
+        # 院校筛选条件通过位图索引解析为候选院校集合
+        await school_bitmap_index.ensure_fresh(self.db)
+        candidate_ids = None
+        if school_filter:
+            try:
+                candidate_ids = school_bitmap_index.query(school_filter)
+            except BitmapFilterError as e:
+                return {"status": "error", "message": f"院校筛选条件无效: {str(e)}"}
+
+        # 与个人无关的部分取自学生画像簇的缓存（未聚类或画像与簇中心差别较大时即时计算）
+        cluster = await student_cluster_store.lookup(self.db, student)
+
         # 使用多种推荐方法
 
         # 1. 使用LLM进行推荐
-        llm_results = await self._get_llm_recommendations(student, strategy)
+        llm_results = cluster.llm_recommendations.get(strategy) if cluster else None
+        if llm_results is None:
+            llm_results = await self._get_llm_recommendations(student, strategy)
 
-        # 2. 使用协同过滤进行推荐
-        cf_results = await self._get_collaborative_filtering(student, strategy)
+        # 2. 使用协同过滤进行推荐（簇内学生的目标院校按本人分数重新分类）
+        cf_results = await self._get_collaborative_filtering(
+            student, strategy, cluster.cf_school_ids if cluster else None
+        )
 
-        # 3. 基于内容的推荐
+        # 3. 基于内容的推荐（候选院校限定在簇的分数范围附近）
+        content_candidate_ids = candidate_ids
+        cluster_candidates = cluster.candidates_for(student) if cluster else None
+        if cluster_candidates is not None:
+            content_candidate_ids = (
+                cluster_candidates
+                if candidate_ids is None
+                else cluster_candidates & candidate_ids
+            )
         content_results = await self._get_content_based_recommendations(
-            student, strategy
+            student, strategy, content_candidate_ids
         )
 
         # 4. 使用分数预测模型
         prediction_results = await self._get_score_prediction_recommendations(
-            student, strategy
+            student, strategy, candidate_ids, matching, student_rank, simulation_seed
         )
 
         # 整合多种推荐结果
@@ -117,6 +149,7 @@ class SchoolRecommender:
             category_counts,
             prefer_provinces,
             prefer_school_types,
+            candidate_ids,
         )
 
         # 如果需要，为每所学校添加推荐专业
@@ -153,6 +186,148 @@ class SchoolRecommender:
             "safety_schools": integrated_results.get("safety", []),
         }
 
+    @staticmethod
+    def _allocate_category_counts(strategy: str, num_recommendations: int) -> Dict[str, int]:
+        """按策略分配冲刺/稳妥/保底的推荐数量"""
+        if strategy == "aggressive":
+            # 激进策略：更多冲刺院校
+            category_counts = {"challenge": 5, "match": 3, "safety": 1}
+        elif strategy == "conservative":
+            # 保守策略：更多保底院校
+            category_counts = {"challenge": 1, "match": 3, "safety": 5}
+        else:
+            # 平衡策略：均衡分配
+            category_counts = {"challenge": 3, "match": 3, "safety": 3}
+
+        # 确保总数正确
+        total = sum(category_counts.values())
+        if total != num_recommendations:
+            # 按比例调整
+            for key in category_counts:
+                category_counts[key] = max(
+                    1, int(round(category_counts[key] * num_recommendations / total))
+                )
+            # 调整可能的误差
+            adjust_key = "match"  # 默认调整匹配院校数量
+            category_counts[adjust_key] += num_recommendations - sum(
+                category_counts.values()
+            )
+
+        return category_counts
+
+    async def recommend_pairs(
+        self,
+        student_id: int,
+        strategy: str = "balanced",
+        num_recommendations: int = 9,
+        school_filter: Optional[Dict[str, Any]] = None,
+        simulation_seed: Optional[int] = None,
+    ) -> Dict[str, Any]:
+        """院校×专业组合推荐：对院校开设的全部专业逐一评分，按类别返回最优组合
+
+        Args:
+            student_id: 学生ID
+            strategy: 推荐策略（aggressive=冲刺, balanced=平衡, conservative=保守）
+            num_recommendations: 推荐组合总数
+            school_filter: 院校筛选表达式（AND/OR/NOT组合）
+            simulation_seed: 录取概率模拟的随机种子，指定后结果可复现
+
+        Returns:
+            包含各类别推荐组合的字典
+        """
+        result = await self.db.execute(select(Student).where(Student.id == student_id))
+        student = result.scalars().first()
+
+        if not student:
+            return {"status": "error", "message": "未找到学生信息"}
+        if not student.total_score:
+            return {"status": "error", "message": "无法获取有效的学生分数"}
+
+        category_counts = self._allocate_category_counts(strategy, num_recommendations)
+        province = student.province or "重庆"  # 默认省份（同分数预测推荐）
+
+        await school_bitmap_index.ensure_fresh(self.db)
+        candidate_ids = None
+        if school_filter:
+            try:
+                candidate_ids = school_bitmap_index.query(school_filter)
+            except BitmapFilterError as e:
+                return {"status": "error", "message": f"院校筛选条件无效: {str(e)}"}
+
+        await major_pair_store.ensure_fresh(province)
+        table = major_pair_store.get(province)
+        if table is None:
+            return {"status": "error", "message": f"{province}缺少分数线数据，无法推荐专业"}
+
+        scored = score_pairs(table, student, candidate_ids, simulation_seed)
+
+        # 只为入选组合查询院校与专业信息
+        selected = {
+            category: top_pairs(scored, code, category_counts[category])
+            for code, category in enumerate(["safety", "match", "challenge"])
+        }
+        pair_index = np.concatenate([positions for positions in selected.values()])
+        major_ids = table.major_ids[scored["index"][pair_index]].tolist()
+        result = await self.db.execute(select(Major).where(Major.id.in_(major_ids)))
+        majors = {major.id: major for major in result.scalars().all()}
+        result = await self.db.execute(
+            select(School).where(School.id.in_({major.school_id for major in majors.values()}))
+        )
+        schools = {school.id: school for school in result.scalars().all()}
+
+        pairs: Dict[str, List[Dict[str, Any]]] = {}
+        for category, positions in selected.items():
+            pairs[category] = []
+            for position in positions.tolist():
+                i = int(scored["index"][position])
+                major = majors.get(int(table.major_ids[i]))
+                school = schools.get(major.school_id) if major else None
+                if school is None:
+                    continue
+                probability = round(float(scored["probability"][position]), 3)
+                pairs[category].append(
+                    {
+                        "school_id": school.id,
+                        "name": school.name,
+                        "province": school.province,
+                        "major_id": major.id,
+                        "major_name": major.name,
+                        "major_category": major.category,
+                        "score": round(float(table.cutoffs[i]), 2),
+                        "score_source": "major" if table.sources[i] != SOURCE_SCHOOL else "school",
+                        "probability": probability,
+                        "admission_probability": f"{int(probability*100)}%",
+                        "background_match": round(float(scored["background"][position]), 3),
+                        "match": round(float(scored["match"][position]), 3),
+                        "category": category,
+                    }
+                )
+
+        recommendation = Recommendation(
+            student_id=student_id,
+            recommendation_type="major",
+            strategy=strategy,
+            challenge_schools=pairs["challenge"],
+            match_schools=pairs["match"],
+            safety_schools=pairs["safety"],
+            recommended_majors=[pair for category in pairs.values() for pair in category],
+            analysis=f"基于{student.name}的分数{student.total_score}，在{len(scored['index'])}个院校专业组合中使用{strategy}策略生成推荐。",
+        )
+        self.db.add(recommendation)
+        await self.db.commit()
+        await self.db.refresh(recommendation)
+
+        return {
+            "status": "success",
+            "recommendation_id": recommendation.id,
+            "strategy": strategy,
+            "student_score": student.total_score,
+            "pair_count": len(scored["index"]),
+            "challenge_pairs": pairs["challenge"],
+            "match_pairs": pairs["match"],
+            "safety_pairs": pairs["safety"],
+        }
+
     async def _get_llm_recommendations(
         self, student: Student, strategy: str
     ) -> Dict[str, Any]:
@@ -170,113 +345,134 @@ class SchoolRecommender:
             }
 
             recommendations = await get_llm_recommendation(student_data, strategy)
-            return recommendations
+            return await self._resolve_llm_school_ids(recommendations)
         except Exception as e:
             print(f"LLM推荐出错: {str(e)}")
             return {}
 
+    async def _resolve_llm_school_ids(
+        self, recommendations: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """将LLM返回的院校名称解析为真实学校ID
+
+        LLM只知道院校名称，其返回的ID不可信；无法解析到院校库的学校将被丢弃，
+        同一学校在结果中只保留首次出现的位置。
+        """
+        await school_name_index.ensure_fresh(self.db)
+
+        resolved = {}
+        seen_ids = set()
+        for category in ["challenge", "match", "safety"]:
+            schools = recommendations.get(category)
+            if not isinstance(schools, list):
+                continue
+
+            resolved[category] = []
+            for school in schools:
+                if not isinstance(school, dict):
+                    continue
+                school_id = school_name_index.resolve(school.get("name", ""))
+                if school_id is None or school_id in seen_ids:
+                    continue
+                seen_ids.add(school_id)
+                resolved[category].append(
+                    {
+                        **school,
+                        "school_id": school_id,
+                        "name": school_name_index.name_of(school_id),
+                    }
+                )
+
+        return resolved
+
     async def _get_collaborative_filtering(
-        self, student: Student, strategy: str
+        self, student: Student, strategy: str, school_ids: Optional[List[int]] = None
     ) -> Dict[str, Any]:
-        """使用协同过滤进行推荐"""
+        """使用协同过滤进行推荐
+
+        Args:
+            school_ids: 相似学生的目标院校（取自学生画像簇的缓存），为空时即时查找相似学生
+        """
         # 简化实现：根据相似学生的选择进行推荐
         try:
-            # 获取分数相近的其他学生(±30分)
-            result = await self.db.execute(
-                select(Student)
-                .where(
-                    Student.id != student.id,
-                    Student.total_score.between(
-                        student.total_score - 30, student.total_score + 30
-                    ),
+            if school_ids is None:
+                # 在学生画像索引中查找最相似的学生（成绩、省份、兴趣与职业目标）
+                await student_index.ensure_fresh(self.db)
+                neighbours = student_index.nearest(student, k=settings.CF_NEIGHBOURS)
+                if not neighbours:
+                    return {}
+                result = await self.db.execute(
+                    select(Student).where(Student.id.in_([i for i, _ in neighbours]))
                 )
-                .limit(10)
-            )
-            similar_students = result.scalars().all()
-
-            # 收集这些学生的目标学校
-            target_schools = []
-            for similar_student in similar_students:
-                if similar_student.target_schools:
-                    if isinstance(similar_student.target_schools, list):
-                        target_schools.extend(similar_student.target_schools)
-                    elif isinstance(similar_student.target_schools, dict):
-                        for category, schools in similar_student.target_schools.items():
-                            if isinstance(schools, list):
-                                target_schools.extend(schools)
+                similar_students = result.scalars().all()
 
-            # 获取这些学校的实际数据
-            if target_schools:
-                # 转换为整数ID列表
-                school_ids = []
-                for item in target_schools:
-                    if isinstance(item, int):
-                        school_ids.append(item)
-                    elif isinstance(item, dict) and "id" in item:
-                        school_ids.append(item["id"])
-                    elif isinstance(item, dict) and "school_id" in item:
-                        school_ids.append(item["school_id"])
-
-                if school_ids:
-                    result = await self.db.execute(
-                        select(School).where(School.id.in_(school_ids))
-                    )
-                    cf_schools = result.scalars().all()
+                # 收集这些学生的目标学校
+                school_ids = [
+                    school_id
+                    for similar_student in similar_students
+                    for school_id in target_school_ids(similar_student)
+                ]
 
-                    # 转换为简单结构
-                    school_list = [
-                        {
-                            "school_id": school.id,
-                            "name": school.name,
-                            "type": school.type,
-                            "province": school.province,
-                            "is_985": school.is_985,
-                            "is_211": school.is_211,
-                            "rank": school.rank,
-                        }
-                        for school in cf_schools
-                    ]
+            # 获取这些学校的实际数据
+            if school_ids:
+                result = await self.db.execute(
+                    select(School).where(School.id.in_(school_ids))
+                )
+                cf_schools = result.scalars().all()
 
-                    # 根据学生分数，将学校分为不同类别
-                    challenge = []
-                    match = []
-                    safety = []
-
-                    for school_data in school_list:
-                        # 获取该校分数线
-                        result = await self.db.execute(
-                            select(ScoreLine)
-                            .where(
-                                ScoreLine.school_id == school_data["school_id"],
-                                ScoreLine.major_id == None,
-                                ScoreLine.province == student.province
-                                if student.province
-                                else True,
-                            )
-                            .order_by(ScoreLine.year.desc())
+                # 转换为简单结构
+                school_list = [
+                    {
+                        "school_id": school.id,
+                        "name": school.name,
+                        "type": school.type,
+                        "province": school.province,
+                        "is_985": school.is_985,
+                        "is_211": school.is_211,
+                        "rank": school.rank,
+                    }
+                    for school in cf_schools
+                ]
+
+                # 根据学生分数，将学校分为不同类别
+                challenge = []
+                match = []
+                safety = []
+
+                # 各校最新分数线取自预计算特征
+                await school_feature_store.ensure_fresh()
+
+                for school_data in school_list:
+                    # 获取该校分数线（未指定省份时取最近一年任一省份的分数线）
+                    features = school_feature_store.get(school_data["school_id"]) or {}
+                    cutoffs = features.get("latest_cutoffs") or {}
+                    if student.province:
+                        cutoff = cutoffs.get(student.province)
+                    else:
+                        cutoff = max(
+                            cutoffs.values(), key=lambda c: c["year"], default=None
                         )
-                        score_line = result.scalars().first()
 
-                        if score_line:
-                            school_data["score"] = score_line.min_score
+                    if cutoff:
+                        school_data["score"] = cutoff["min_score"]
 
-                            # 根据分数差异分类
-                            score_diff = student.total_score - score_line.min_score
+                        # 根据分数差异分类
+                        score_diff = student.total_score - cutoff["min_score"]
 
-                            if score_diff >= 20:
-                                school_data["match"] = 0.9
-                                school_data["admission_probability"] = "90%以上"
-                                safety.append(school_data)
-                            elif score_diff >= -20:
-                                school_data["match"] = 0.7
-                                school_data["admission_probability"] = "50%-80%"
-                                match.append(school_data)
-                            else:
-                                school_data["match"] = 0.5
-                                school_data["admission_probability"] = "30%以下"
-                                challenge.append(school_data)
+                        if score_diff >= 20:
+                            school_data["match"] = 0.9
+                            school_data["admission_probability"] = "90%以上"
+                            safety.append(school_data)
+                        elif score_diff >= -20:
+                            school_data["match"] = 0.7
+                            school_data["admission_probability"] = "50%-80%"
+                            match.append(school_data)
+                        else:
+                            school_data["match"] = 0.5
+                            school_data["admission_probability"] = "30%以下"
+                            challenge.append(school_data)
 
-                    return {"challenge": challenge, "match": match, "safety": safety}
+                return {"challenge": challenge, "match": match, "safety": safety}
 
             # 没有找到有效推荐
             return {}
@@ -286,32 +482,73 @@ class SchoolRecommender:
             return {}
 
     async def _get_content_based_recommendations(
-        self, student: Student, strategy: str
+        self, student: Student, strategy: str, candidate_ids: Optional[Set[int]] = None
     ) -> Dict[str, Any]:
         """基于内容的推荐"""
         try:
-            # 获取所有学校
-            result = await self.db.execute(select(School))
+            # 获取候选学校（未指定筛选条件时为全部学校）及其预计算特征
+            query = select(School)
+            if candidate_ids is not None:
+                query = query.where(School.id.in_(candidate_ids))
+            result = await self.db.execute(query)
             all_schools = result.scalars().all()
+            await school_feature_store.ensure_fresh()
+
+            # 学生侧特征只计算一次
+            student_interests = [
+                interest.lower()
+                for interest in (student.interests if isinstance(student.interests, list) else [])
+                if isinstance(interest, str)
+            ]
+            school_features = [
+                school_feature_store.get(school.id) or compute_school_features(school)
+                for school in all_schools
+            ]
+
+            # 各维度匹配度按(学生, 维度)缓存，只计算缓存中缺失或依赖字段已修改的部分
+            school_ids = [school.id for school in all_schools]
+            interest_matches = dimension_vector_cache.get(
+                student,
+                "interest",
+                school_ids,
+                lambda positions: [
+                    self._calculate_interest_match(student_interests, school_features[i])
+                    for i in positions
+                ],
+            )
+            # 区域匹配度对缺失的学校批量计算
+            location_matches = dimension_vector_cache.get(
+                student,
+                "location",
+                school_ids,
+                lambda positions: self._calculate_location_match(
+                    student,
+                    [all_schools[i] for i in positions],
+                    [school_features[i] for i in positions],
+                ),
+            )
+            career_matches = dimension_vector_cache.get(
+                student,
+                "career",
+                school_ids,
+                lambda positions: [
+                    self._calculate_career_match(student, all_schools[i]) for i in positions
+                ],
+            )
 
-            # 计算每所学校与学生兴趣的匹配度
-            scored_schools = []
-
-            for school in all_schools:
-                # 计算兴趣匹配度
-                interest_match = await self._calculate_interest_match(student, school)
-
-                # 计算区域匹配度
-                location_match = await self._calculate_location_match(student, school)
-
-                # 计算职业目标匹配度
-                career_match = await self._calculate_career_match(student, school)
-
-                # 综合评分
-                total_match = (
-                    interest_match * 0.5 + location_match * 0.3 + career_match * 0.2
-                )
+            # 综合评分
+            total_matches = (
+                interest_matches * 0.5 + location_matches * 0.3 + career_matches * 0.2
+            )
 
+            scored_schools = []
+            for school, interest_match, location_match, career_match, total_match in zip(
+                all_schools,
+                interest_matches.tolist(),
+                location_matches.tolist(),
+                career_matches.tolist(),
+                total_matches.tolist(),
+            ):
                 scored_schools.append(
                     {
                         "school_id": school.id,
@@ -349,70 +586,72 @@ class SchoolRecommender:
             print(f"基于内容推荐出错: {str(e)}")
             return {}
 
-    async def _calculate_interest_match(
-        self, student: Student, school: School
+    def _calculate_interest_match(
+        self, student_interests: List[str], features: Dict[str, Any]
     ) -> float:
-        """计算兴趣匹配度"""
-        if not student.interests or not school.features:
-            return 0.5  # 默认中等匹配度
+        """计算兴趣匹配度
 
-        # 提取学校特征关键词
-        school_keywords = []
-        if isinstance(school.features, dict) and "strengths" in school.features:
-            school_keywords = school.features["strengths"]
-
-        # 兴趣关键词
-        student_interests = (
-            student.interests if isinstance(student.interests, list) else []
-        )
+        Args:
+            student_interests: 小写化的学生兴趣
+            features: 院校预计算特征
+        """
+        school_keywords = features.get("keywords") or []
+        if not student_interests or not school_keywords:
+            return 0.5  # 默认中等匹配度
 
-        # 计算匹配项
+        # 计算匹配项（简单字符串包含匹配）
         matches = 0
         for interest in student_interests:
             for keyword in school_keywords:
-                # 简单字符串匹配
-                if (interest.lower() in keyword.lower()) or (
-                    keyword.lower() in interest.lower()
-                ):
+                if interest in keyword or keyword in interest:
                     matches += 1
                     break
 
-        # 计算匹配度
-        if not student_interests:
-            return 0.5
-
         match_ratio = min(1.0, matches / len(student_interests))
         return 0.5 + match_ratio * 0.5  # 范围：0.5-1.0
 
-    async def _calculate_location_match(
-        self, student: Student, school: School
-    ) -> float:
-        """计算地理位置匹配度"""
-        if not student.province or not school.province:
-            return 0.5  # 默认中等匹配度
-
-        if student.province == school.province:
-            return 1.0  # 同省最高匹配
-
-        # 简化的区域划分
-        regions = {
-            "北方": ["北京", "天津", "河北", "山西", "内蒙古"],
-            "东部": ["上海", "江苏", "浙江", "安徽", "福建", "江西", "山东"],
-            "南方": ["广东", "广西", "海南"],
-            "中部": ["河南", "湖北", "湖南"],
-            "西南": ["重庆", "四川", "贵州", "云南", "西藏"],
-            "西北": ["陕西", "甘肃", "青海", "宁夏", "新疆"],
-            "东北": ["辽宁", "吉林", "黑龙江"],
-        }
+    def _calculate_location_match(
+        self,
+        student: Student,
+        schools: List[School],
+        school_features: List[Dict[str, Any]],
+    ) -> np.ndarray:
+        """批量计算地理位置匹配度
 
-        # 检查是否在同一区域
-        for region, provinces in regions.items():
-            if student.province in provinces and school.province in provinces:
-                return 0.8  # 同区域较高匹配
+        Args:
+            student: 学生
+            schools: 院校列表
+            school_features: 与schools一一对应的院校预计算特征
+        """
+        if not student.province:
+            return np.full(len(schools), 0.5)  # 默认中等匹配度
 
-        return 0.5  # 不同区域一般匹配
+        provinces = np.array([school.province or "" for school in schools], dtype=object)
+        regions = np.array(
+            [features.get("region") or "" for features in school_features], dtype=object
+        )
+        student_region = get_region(student.province)
+
+        # 不同区域：按到学生所在城市（未收录时取所在省份省会）的距离从0.8衰减到0.5
+        table = get_city_table()
+        lat, lon = table.coordinates(table.lookup(school.city for school in schools))
+        home = table.place(student.city)
+        if home < 0:
+            home = table.place(student.province)
+        home_lat, home_lon = table.coordinates([home] if home >= 0 else [])
+        distances = nearest_distance_km(lat, lon, home_lat, home_lon)
+
+        return np.select(
+            [
+                provinces == "",  # 院校省份未知，默认中等匹配度
+                provinces == student.province,  # 同省最高匹配
+                (regions == student_region) & bool(student_region),  # 同区域较高匹配
+            ],
+            [0.5, 1.0, 0.8],
+            distance_decay(distances, 0.5, 0.8),
+        )
 
-    async def _calculate_career_match(self, student: Student, school: School) -> float:
+    def _calculate_career_match(self, student: Student, school: School) -> float:
         """计算职业目标匹配度"""
         if not student.career_goals:
             return 0.5  # 默认中等匹配度
@@ -451,98 +690,129 @@ class SchoolRecommender:
         return 0.5  # 默认中等匹配度
 
     async def _get_score_prediction_recommendations(
-        self, student: Student, strategy: str
+        self,
+        student: Student,
+        strategy: str,
+        candidate_ids: Optional[Set[int]] = None,
+        matching: str = "score",
+        student_rank: Optional[int] = None,
+        simulation_seed: Optional[int] = None,
     ) -> Dict[str, Any]:
         """基于分数预测的推荐"""
         try:
-            # 获取学生所在省份的分数线
             student_province = student.province or "重庆"  # 默认省份
-            result = await self.db.execute(
-                select(ScoreLine)
-                .where(
-                    ScoreLine.province == student_province, ScoreLine.major_id == None
-                )
-                .order_by(ScoreLine.year.desc())
-            )
-            score_lines = result.scalars().all()
-
-            if not score_lines:
-                return {}
+            categories = None
 
-            # 计算每所学校的录取可能性
-            school_chances = []
-            for score_line in score_lines:
-                # 获取学校信息
-                result = await self.db.execute(
-                    select(School).where(School.id == score_line.school_id)
+            # 按历年等效位次比较（该省没有一分一段表时退回按分数比较）
+            if matching == "rank":
+                await rank_table_store.ensure_fresh(student_province)
+                categories = rank_table_store.match(
+                    student_province, student.total_score, student_rank, candidate_ids
                 )
-                school = result.scalars().first()
-
-                if school:
-                    # 计算分数差异
-                    score_diff = student.total_score - score_line.min_score
-
-                    # 基于分数差异计算录取概率
-                    if score_diff >= 30:
-                        probability = 0.95  # 95%概率录取
-                    elif score_diff >= 20:
-                        probability = 0.9  # 90%概率录取
-                    elif score_diff >= 10:
-                        probability = 0.8  # 80%概率录取
-                    elif score_diff >= 0:
-                        probability = 0.7  # 70%概率录取
-                    elif score_diff >= -10:
-                        probability = 0.5  # 50%概率录取
-                    elif score_diff >= -20:
-                        probability = 0.3  # 30%概率录取
-                    elif score_diff >= -30:
-                        probability = 0.2  # 20%概率录取
-                    else:
-                        probability = 0.1  # 10%概率录取
-
-                    # 分类
-                    category = (
-                        "safety"
-                        if probability >= 0.8
-                        else "match"
-                        if probability >= 0.4
-                        else "challenge"
-                    )
-
-                    school_chances.append(
-                        {
-                            "school_id": school.id,
-                            "name": school.name,
-                            "type": school.type,
-                            "province": school.province,
-                            "is_985": school.is_985,
-                            "is_211": school.is_211,
-                            "rank": school.rank,
-                            "score": score_line.min_score,
-                            "score_diff": score_diff,
-                            "probability": probability,
-                            "admission_probability": f"{int(probability*100)}%",
-                            "match": probability,
-                            "category": category,
-                        }
-                    )
+                if categories is None:
+                    logger.warning("%s缺少一分一段表，改为按分数匹配", student_province)
+
+            if categories is None:
+                # 按分数取学生所在省份分类表的对应行（优先使用下一年预测分数线）
+                await score_table_store.ensure_fresh()
+                table = score_table_store.get(
+                    student_province, FORECAST
+                ) or score_table_store.get(student_province)
+                if table is None or not len(table):
+                    return {}
+
+                categories = table.lookup(student.total_score)
+                if candidate_ids is not None:
+                    categories = {
+                        category: [s for s in items if s["school_id"] in candidate_ids]
+                        for category, items in categories.items()
+                    }
 
-            # 按分类组织结果
-            challenge = [s for s in school_chances if s["category"] == "challenge"]
-            match = [s for s in school_chances if s["category"] == "match"]
-            safety = [s for s in school_chances if s["category"] == "safety"]
+            # 以蒙特卡洛模拟的录取概率替代按分数差分段的估计，并据此重新分类
+            if settings.ADMISSION_SIMULATION_ENABLED:
+                categories = self._simulate_categories(
+                    student.total_score, categories, simulation_seed
+                )
 
-            # 按匹配度排序
-            challenge.sort(key=lambda x: x["match"], reverse=True)
-            match.sort(key=lambda x: x["match"], reverse=True)
-            safety.sort(key=lambda x: x["match"], reverse=True)
+            school_ids = [s["school_id"] for items in categories.values() for s in items]
+            if not school_ids:
+                return {}
+            result = await self.db.execute(
+                select(School).where(School.id.in_(school_ids))
+            )
+            schools = {school.id: school for school in result.scalars().all()}
+
+            # 合并院校信息（各类内已按录取概率降序排列）
+            results: Dict[str, List[Dict[str, Any]]] = {}
+            for category in ["challenge", "match", "safety"]:
+                results[category] = []
+                for item in categories[category]:
+                    school = schools.get(item["school_id"])
+                    if school is None:
+                        continue
+                    probability = item["probability"]
+                    school_data = {
+                        "school_id": school.id,
+                        "name": school.name,
+                        "type": school.type,
+                        "province": school.province,
+                        "is_985": school.is_985,
+                        "is_211": school.is_211,
+                        "rank": school.rank,
+                        "score": item["score"],
+                        "score_diff": student.total_score - item["score"],
+                        "probability": probability,
+                        "admission_probability": f"{int(probability*100)}%",
+                        "match": probability,
+                        "category": category,
+                    }
+                    if "equivalent_rank" in item:
+                        school_data["equivalent_rank"] = item["equivalent_rank"]
+                    results[category].append(school_data)
 
-            return {"challenge": challenge, "match": match, "safety": safety}
+            return results
 
         except Exception as e:
             print(f"分数预测推荐出错: {str(e)}")
             return {}
 
+    def _simulate_categories(
+        self,
+        student_score: float,
+        categories: Dict[str, List[Dict[str, Any]]],
+        seed: Optional[int] = None,
+    ) -> Dict[str, List[Dict[str, Any]]]:
+        """模拟各院校的录取概率，按概率重新划分保底/稳妥/冲刺（各类内按概率降序）"""
+        items = [item for group in categories.values() for item in group]
+        if not items:
+            return categories
+
+        probabilities = simulate_admission_probabilities(
+            student_score,
+            settings.ADMISSION_SCORE_STD,
+            [item["score"] for item in items],
+            [item.get("std", settings.CUTOFF_FORECAST_DEFAULT_STD) for item in items],
+            n_samples=settings.ADMISSION_SIMULATION_SAMPLES,
+            seed=seed,
+        )
+
+        simulated: Dict[str, List[Dict[str, Any]]] = {
+            "safety": [],
+            "match": [],
+            "challenge": [],
+        }
+        for item, probability in zip(items, probabilities.tolist()):
+            item["probability"] = round(probability, 3)
+            if probability >= settings.ADMISSION_SAFETY_PROBABILITY:
+                simulated["safety"].append(item)
+            elif probability >= settings.ADMISSION_MATCH_PROBABILITY:
+                simulated["match"].append(item)
+            else:
+                simulated["challenge"].append(item)
+        for group in simulated.values():
+            group.sort(key=lambda item: item["probability"], reverse=True)
+        return simulated
+
     async def _integrate_recommendations(
         self,
         student: Student,
@@ -553,6 +823,7 @@ class SchoolRecommender:
         category_counts: Dict[str, int],
         prefer_provinces: Optional[List[str]] = None,
         prefer_school_types: Optional[List[str]] = None,
+        candidate_ids: Optional[Set[int]] = None,
     ) -> Dict[str, List[Dict[str, Any]]]:
         """整合多种推荐结果"""
         integrated_results = {"challenge": [], "match": [], "safety": []}
@@ -673,6 +944,14 @@ class SchoolRecommender:
                             )
                             all_schools[school_id]["data"]["prediction"] = school
 
+        # LLM与协同过滤的结果同样只保留符合筛选条件的院校
+        if candidate_ids is not None:
+            all_schools = {
+                school_id: school_data
+                for school_id, school_data in all_schools.items()
+                if school_id in candidate_ids
+            }
+
         # 计算每所学校的总分
         school_list = []
         for school_id, school_data in all_schools.items():
@@ -720,9 +999,18 @@ class SchoolRecommender:
 
             school_list.append(merged_data)
 
-        # 根据学生分数重新分类
+        # 根据模拟的录取概率（没有时按学生分数）重新分类
         for school in school_list:
-            if "score" in school:
+            prediction = all_schools[school["school_id"]]["data"].get("prediction")
+            if prediction and "probability" in prediction:
+                probability = prediction["probability"]
+                if probability >= settings.ADMISSION_SAFETY_PROBABILITY:
+                    school["category"] = "safety"
+                elif probability >= settings.ADMISSION_MATCH_PROBABILITY:
+                    school["category"] = "match"
+                else:
+                    school["category"] = "challenge"
+            elif "score" in school:
                 score_diff = student.total_score - school["score"]
                 if score_diff >= 20:
                     school["category"] = "safety"
@@ -733,17 +1021,27 @@ class SchoolRecommender:
 
         # 应用偏好过滤
         if prefer_provinces or prefer_school_types:
+            # 偏好条件由位图索引判断，不依赖各来源结果是否带有省份/类型字段
+            province_bitmap = (
+                school_bitmap_index.evaluate({"province": prefer_provinces})
+                if prefer_provinces
+                else 0
+            )
+            type_bitmap = (
+                school_bitmap_index.evaluate({"type": prefer_school_types})
+                if prefer_school_types
+                else 0
+            )
+
             # 增加符合偏好的学校匹配度
             for school in school_list:
                 boost = 0
 
-                if prefer_provinces and "province" in school:
-                    if school["province"] in prefer_provinces:
-                        boost += 0.1
+                if school_bitmap_index.contains(province_bitmap, school["school_id"]):
+                    boost += 0.1
 
-                if prefer_school_types and "type" in school:
-                    if school["type"] in prefer_school_types:
-                        boost += 0.1
+                if school_bitmap_index.contains(type_bitmap, school["school_id"]):
+                    boost += 0.1
 
                 if boost > 0:
                     school["match"] += boost
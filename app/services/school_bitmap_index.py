@@ -0,0 +1,197 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+院校属性位图索引
+为院校的分类属性（省份、城市、类型、层次、985/211/双一流等）按取值建立位图，
+任意AND/OR/NOT组合的筛选条件通过位运算直接得到院校ID集合
+
+位图用Python整数表示，第i位对应按排名排序后的第i所院校，
+因此按位展开得到的院校ID天然按排名有序，可直接在内存中分页
+"""
+
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.db.events import invalidate_on_commit
+from app.models.school import School
+
+# 建立位图的分类属性
+CATEGORICAL_ATTRIBUTES = ("province", "city", "type", "level", "nature")
+BOOLEAN_ATTRIBUTES = ("is_985", "is_211", "is_double_first_class")
+INDEXED_ATTRIBUTES = CATEGORICAL_ATTRIBUTES + BOOLEAN_ATTRIBUTES
+
+
+class BitmapFilterError(ValueError):
+    """筛选表达式无效"""
+
+
+class SchoolBitmapIndex:
+    """院校属性位图索引
+
+    筛选表达式为嵌套字典：
+    - 叶子条件：{"province": "北京"} 或 {"province": ["北京", "上海"]}（列表内取并集）
+    - 同一字典中的多个条件取交集：{"province": "北京", "is_985": true}
+    - 逻辑组合：{"and": [...]}、{"or": [...]}、{"not": {...}}
+    """
+
+    def __init__(self):
+        self._bitmaps: Dict[Tuple[str, Any], int] = {}
+        self._ids: List[int] = []
+        self._positions: Dict[int, int] = {}
+        self._universe = 0
+
+        self._built = False
+        self._dirty = True
+
+    @property
+    def is_stale(self) -> bool:
+        """索引是否需要重建"""
+        return self._dirty or not self._built
+
+    @property
+    def size(self) -> int:
+        """索引中的院校数量"""
+        return len(self._ids)
+
+    def invalidate(self) -> None:
+        """标记索引失效（院校库变更时调用）"""
+        self._dirty = True
+
+    def build(self, schools: Iterable[Any]) -> None:
+        """根据院校记录（或具有相同属性的对象）构建索引"""
+        # 按排名排序（无排名的排在最后），位序即展示顺序
+        ordered = sorted(
+            schools,
+            key=lambda s: (s.rank is None, s.rank if s.rank is not None else 0, s.id),
+        )
+
+        bitmaps: Dict[Tuple[str, Any], int] = {}
+        for position, school in enumerate(ordered):
+            bit = 1 << position
+            for attr in CATEGORICAL_ATTRIBUTES:
+                value = getattr(school, attr)
+                if value:
+                    key = (attr, value)
+                    bitmaps[key] = bitmaps.get(key, 0) | bit
+            for attr in BOOLEAN_ATTRIBUTES:
+                key = (attr, bool(getattr(school, attr)))
+                bitmaps[key] = bitmaps.get(key, 0) | bit
+
+        self._bitmaps = bitmaps
+        self._ids = [school.id for school in ordered]
+        self._positions = {school_id: i for i, school_id in enumerate(self._ids)}
+        self._universe = (1 << len(self._ids)) - 1
+        self._built = True
+        self._dirty = False
+
+    async def refresh(self, db: AsyncSession) -> None:
+        """从数据库重新加载院校属性并重建索引"""
+        result = await db.execute(
+            select(School.id, School.rank, *[getattr(School, a) for a in INDEXED_ATTRIBUTES])
+        )
+        self.build(result.all())
+
+    async def ensure_fresh(self, db: AsyncSession) -> None:
+        """索引失效时重建"""
+        if self.is_stale:
+            await self.refresh(db)
+
+    def _leaf(self, attr: str, value: Any) -> int:
+        """单个属性条件的位图，列表取值时取并集"""
+        if attr not in INDEXED_ATTRIBUTES:
+            raise BitmapFilterError(f"不支持按{attr}筛选")
+        values = value if isinstance(value, (list, tuple, set)) else [value]
+        bitmap = 0
+        for item in values:
+            if attr in BOOLEAN_ATTRIBUTES:
+                if not isinstance(item, bool):
+                    raise BitmapFilterError(f"{attr}的取值必须为true或false")
+            bitmap |= self._bitmaps.get((attr, item), 0)
+        return bitmap
+
+    def evaluate(self, expression: Optional[Dict[str, Any]]) -> int:
+        """计算筛选表达式对应的位图，空表达式表示全部院校"""
+        if not expression:
+            return self._universe
+        if not isinstance(expression, dict):
+            raise BitmapFilterError("筛选条件必须为对象")
+
+        bitmap = self._universe
+        for key, operand in expression.items():
+            if key == "and":
+                for sub in self._operands(key, operand):
+                    bitmap &= self.evaluate(sub)
+            elif key == "or":
+                union = 0
+                for sub in self._operands(key, operand):
+                    union |= self.evaluate(sub)
+                bitmap &= union
+            elif key == "not":
+                bitmap &= self._universe & ~self.evaluate(operand)
+            else:
+                bitmap &= self._leaf(key, operand)
+        return bitmap
+
+    @staticmethod
+    def _operands(operator: str, operand: Any) -> List[Dict[str, Any]]:
+        """校验and/or的子条件列表"""
+        if not isinstance(operand, list) or not operand:
+            raise BitmapFilterError(f"{operator}的条件必须为非空列表")
+        return operand
+
+    def bitmap_of(self, school_ids: Iterable[int]) -> int:
+        """将院校ID集合转换为位图（不在索引中的ID被忽略）"""
+        bitmap = 0
+        for school_id in school_ids:
+            position = self._positions.get(school_id)
+            if position is not None:
+                bitmap |= 1 << position
+        return bitmap
+
+    def iter_ids(self, bitmap: int) -> Iterator[int]:
+        """按排名顺序展开位图中的院校ID"""
+        while bitmap:
+            low = bitmap & -bitmap
+            yield self._ids[low.bit_length() - 1]
+            bitmap ^= low
+
+    def ids(self, bitmap: int, skip: int = 0, limit: Optional[int] = None) -> List[int]:
+        """按排名顺序取位图中的院校ID（支持分页）"""
+        result = []
+        for i, school_id in enumerate(self.iter_ids(bitmap)):
+            if i < skip:
+                continue
+            if limit is not None and len(result) >= limit:
+                break
+            result.append(school_id)
+        return result
+
+    def query(self, expression: Optional[Dict[str, Any]]) -> Set[int]:
+        """计算筛选表达式对应的院校ID集合"""
+        return set(self.iter_ids(self.evaluate(expression)))
+
+    def contains(self, bitmap: int, school_id: int) -> bool:
+        """院校是否在位图中"""
+        position = self._positions.get(school_id)
+        return position is not None and bool(bitmap >> position & 1)
+
+    @staticmethod
+    def count(bitmap: int) -> int:
+        """位图中的院校数量"""
+        return bitmap.bit_count()
+
+
+# 全局索引实例（应用启动时构建）
+school_bitmap_index = SchoolBitmapIndex()
+
+
+@event.listens_for(School, "after_insert")
+@event.listens_for(School, "after_update")
+@event.listens_for(School, "after_delete")
+def _invalidate_school_bitmap_index(mapper, connection, target):
+    """院校库变更时（提交后）使索引失效，下次使用时自动重建"""
+    invalidate_on_commit(target, school_bitmap_index.invalidate)
@@ -0,0 +1,225 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+院校特征存储
+推荐时用到的院校属性（层次、城市消费水平、区域、特色关键词、各省最新分数线）
+预先计算并写入school_features表，运行时从内存中读取；
+院校或分数线变更时标记对应院校，下次读取前重新计算
+"""
+
+import asyncio
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+from sqlalchemy import delete, event
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.db.base import async_session
+from app.db.events import changed_values, invalidate_on_commit
+from app.models.school import School
+from app.models.school_feature import SchoolFeature
+from app.models.score_line import ScoreLine
+from app.services.geo import get_city_table
+
+# 区域划分（取自城市参考数据）
+REGIONS: Dict[str, List[str]] = get_city_table().region_provinces
+_PROVINCE_REGION = {
+    province: region for region, provinces in REGIONS.items() for province in provinces
+}
+
+
+def get_region(province: Optional[str]) -> Optional[str]:
+    """获取省份所属区域代码"""
+    if not province:
+        return None
+    return _PROVINCE_REGION.get(province)
+
+
+def get_cost_class(city: Optional[str]) -> str:
+    """获取城市消费水平（按城市参考数据中的消费指数分档）"""
+    return get_city_table().cost_class(city)
+
+
+def get_tier(school: School) -> int:
+    """获取院校层次，1为最高层次"""
+    if school.is_985:
+        return 1
+    if school.is_211:
+        return 2
+    if school.is_double_first_class:
+        return 3
+    return 4
+
+
+def normalize_keywords(school: School) -> List[str]:
+    """提取并规范化院校特色关键词（小写、去重）"""
+    keywords: List[str] = []
+    features = school.features if isinstance(school.features, dict) else {}
+    for value in features.get("strengths") or []:
+        if isinstance(value, str) and value.strip():
+            keywords.append(value.strip().lower())
+    if school.type:
+        keywords.append(school.type.strip().lower())
+    return list(dict.fromkeys(keywords))
+
+
+def latest_cutoffs(score_lines: Iterable[ScoreLine]) -> Dict[str, Dict[str, Any]]:
+    """取各省最新一年的院校（不分专业）分数线"""
+    cutoffs: Dict[str, Dict[str, Any]] = {}
+    for line in score_lines:
+        if line.major_id is not None or line.min_score is None:
+            continue
+        current = cutoffs.get(line.province)
+        if current is None or line.year > current["year"]:
+            cutoffs[line.province] = {
+                "year": line.year,
+                "min_score": line.min_score,
+                "avg_score": line.avg_score,
+                "min_rank": line.min_rank,
+            }
+    return cutoffs
+
+
+def compute_school_features(
+    school: School, score_lines: Iterable[ScoreLine] = ()
+) -> Dict[str, Any]:
+    """计算单个院校的派生特征"""
+    return {
+        "school_id": school.id,
+        "tier": get_tier(school),
+        "cost_class": get_cost_class(school.city),
+        "region": get_region(school.province),
+        "keywords": normalize_keywords(school),
+        "latest_cutoffs": latest_cutoffs(score_lines),
+    }
+
+
+class SchoolFeatureStore:
+    """院校特征的内存视图
+
+    首次使用时从school_features表加载，表中缺失的院校即时计算并补写；
+    院校或分数线变更后只重新计算受影响的院校。
+    """
+
+    def __init__(self):
+        self._features: Dict[int, Dict[str, Any]] = {}
+        self._dirty_ids: Set[int] = set()
+        self._loaded = False
+        self._lock = asyncio.Lock()
+
+    def invalidate(self, school_id: Optional[int] = None) -> None:
+        """标记院校特征失效，school_id为空时全部重新加载"""
+        if school_id is None:
+            self._loaded = False
+        else:
+            self._dirty_ids.add(school_id)
+
+    async def rebuild(
+        self, db: AsyncSession, school_ids: Optional[Iterable[int]] = None
+    ) -> int:
+        """重新计算院校特征并写入school_features表
+
+        Args:
+            db: 数据库会话
+            school_ids: 需要重新计算的院校ID，为空时重新计算全部院校
+
+        Returns:
+            写入的特征记录数
+        """
+        query = select(School)
+        line_query = select(ScoreLine).where(ScoreLine.major_id == None)
+        ids = set(school_ids) if school_ids is not None else None
+        if ids is not None:
+            query = query.where(School.id.in_(ids))
+            line_query = line_query.where(ScoreLine.school_id.in_(ids))
+
+        schools = (await db.execute(query)).scalars().all()
+        lines_by_school: Dict[int, List[ScoreLine]] = defaultdict(list)
+        for line in (await db.execute(line_query)).scalars().all():
+            lines_by_school[line.school_id].append(line)
+
+        rows = [
+            compute_school_features(school, lines_by_school.get(school.id, ()))
+            for school in schools
+        ]
+
+        # 先删除旧记录再批量写入（包括已删除院校的残留特征）
+        stale = delete(SchoolFeature)
+        if ids is not None:
+            stale = stale.where(SchoolFeature.school_id.in_(ids))
+        await db.execute(stale)
+        db.add_all([SchoolFeature(**row) for row in rows])
+        await db.commit()
+
+        if ids is None:
+            self._features = {row["school_id"]: row for row in rows}
+            self._loaded = True
+        else:
+            for school_id in ids:
+                self._features.pop(school_id, None)
+            self._features.update({row["school_id"]: row for row in rows})
+        return len(rows)
+
+    async def _load(self, db: AsyncSession) -> None:
+        """从school_features表加载特征，缺失的院校即时补算"""
+        result = await db.execute(select(SchoolFeature))
+        self._features = {
+            f.school_id: {
+                "school_id": f.school_id,
+                "tier": f.tier,
+                "cost_class": f.cost_class,
+                "region": f.region,
+                "keywords": f.keywords or [],
+                "latest_cutoffs": f.latest_cutoffs or {},
+            }
+            for f in result.scalars().all()
+        }
+        self._loaded = True
+
+        result = await db.execute(select(School.id))
+        missing = set(result.scalars().all()) - set(self._features)
+        if missing:
+            self._dirty_ids |= missing
+
+    async def ensure_fresh(self) -> None:
+        """加载特征并重新计算失效的院校"""
+        if self._loaded and not self._dirty_ids:
+            return
+        async with self._lock:
+            async with async_session() as session:
+                if not self._loaded:
+                    await self._load(session)
+                if self._dirty_ids:
+                    dirty, self._dirty_ids = self._dirty_ids, set()
+                    await self.rebuild(session, dirty)
+
+    def get(self, school_id: int) -> Optional[Dict[str, Any]]:
+        """获取院校特征"""
+        return self._features.get(school_id)
+
+    def all(self) -> Dict[int, Dict[str, Any]]:
+        """获取全部院校特征"""
+        return self._features
+
+
+# 全局特征存储（应用启动时加载）
+school_feature_store = SchoolFeatureStore()
+
+
+@event.listens_for(School, "after_insert")
+@event.listens_for(School, "after_update")
+@event.listens_for(School, "after_delete")
+def _invalidate_school_features(mapper, connection, target):
+    """院校变更时（提交后）重新计算其特征"""
+    invalidate_on_commit(target, school_feature_store.invalidate, target.id)
+
+
+@event.listens_for(ScoreLine, "after_insert")
+@event.listens_for(ScoreLine, "after_update")
+@event.listens_for(ScoreLine, "after_delete")
+def _invalidate_school_cutoffs(mapper, connection, target):
+    """分数线变更时（提交后）重新计算对应院校（含修改前的院校）的最新分数线"""
+    for school_id in changed_values(target, "school_id"):
+        invalidate_on_commit(target, school_feature_store.invalidate, school_id)
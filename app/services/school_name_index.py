@@ -0,0 +1,232 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+院校名称解析索引
+将LLM返回的院校名称（全称、简称、代码或近似写法）映射为数据库中的真实学校ID
+"""
+
+import unicodedata
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.db.events import invalidate_on_commit
+from app.models.school import School
+
+
+# 常见院校简称（仅当对应全称存在于院校库中时生效）
+COMMON_ALIASES: Dict[str, List[str]] = {
+    "北京大学": ["北大"],
+    "清华大学": ["清华"],
+    "复旦大学": ["复旦"],
+    "上海交通大学": ["上交", "上海交大"],
+    "浙江大学": ["浙大"],
+    "南京大学": ["南大"],
+    "中国科学技术大学": ["中科大", "科大"],
+    "哈尔滨工业大学": ["哈工大"],
+    "西安交通大学": ["西交", "西安交大"],
+    "中山大学": ["中大"],
+    "武汉大学": ["武大"],
+    "华中科技大学": ["华科", "华中大"],
+    "四川大学": ["川大"],
+    "重庆大学": ["重大"],
+    "电子科技大学": ["电子科大", "成电"],
+    "西南大学": ["西大"],
+    "北京师范大学": ["北师大"],
+    "华东师范大学": ["华东师大"],
+    "重庆师范大学": ["重师", "重庆师大"],
+    "中国人民大学": ["人大"],
+    "北京航空航天大学": ["北航"],
+    "北京理工大学": ["北理工"],
+    "同济大学": ["同济"],
+    "南开大学": ["南开"],
+    "天津大学": ["天大"],
+    "厦门大学": ["厦大"],
+    "山东大学": ["山大"],
+    "吉林大学": ["吉大"],
+    "华南理工大学": ["华工", "华南理工"],
+    "上海外国语大学": ["上外"],
+    "北京外国语大学": ["北外"],
+    "中央美术学院": ["央美"],
+    "中央音乐学院": ["央音"],
+    "上海财经大学": ["上财"],
+    "中央财经大学": ["央财"],
+    "西南财经大学": ["西财"],
+    "中国传媒大学": ["中传"],
+}
+
+# 查询时可忽略的校区/附加后缀
+_IGNORABLE_SUFFIXES = ("本部", "主校区", "校本部")
+
+
+def normalize_school_name(name: str) -> str:
+    """规范化院校名称：全角转半角、去空白、统一大小写"""
+    if not name:
+        return ""
+    text = unicodedata.normalize("NFKC", str(name))
+    text = "".join(text.split()).lower()
+    for suffix in _IGNORABLE_SUFFIXES:
+        if text.endswith(suffix) and len(text) > len(suffix) + 1:
+            text = text[: -len(suffix)]
+    return text
+
+
+class SchoolNameIndex:
+    """院校名称解析索引
+
+    支持三级匹配：
+    1. 精确匹配：规范化后的全称或院校代码
+    2. 别名匹配：常见简称及去除括号注释后的名称（有歧义的别名不参与匹配）
+    3. 模糊匹配：基于字符n-gram倒排索引的Dice相似度
+    """
+
+    def __init__(self, ngram_size: int = 2, min_similarity: float = 0.6):
+        self.ngram_size = ngram_size
+        self.min_similarity = min_similarity
+
+        self._exact: Dict[str, int] = {}
+        self._aliases: Dict[str, int] = {}
+        self._postings: Dict[str, List[int]] = {}
+        self._gram_counts: Dict[int, int] = {}
+        self._names: Dict[int, str] = {}
+
+        self._built = False
+        self._dirty = True
+
+    @property
+    def is_stale(self) -> bool:
+        """索引是否需要重建"""
+        return self._dirty or not self._built
+
+    def invalidate(self) -> None:
+        """标记索引失效（院校库变更时调用）"""
+        self._dirty = True
+
+    def _ngrams(self, text: str) -> Set[str]:
+        """切分字符n-gram"""
+        if len(text) <= self.ngram_size:
+            return {text} if text else set()
+        return {
+            text[i : i + self.ngram_size]
+            for i in range(len(text) - self.ngram_size + 1)
+        }
+
+    def build(self, rows: Iterable[Tuple[int, str, Optional[str]]]) -> None:
+        """根据(学校ID, 名称, 代码)列表构建索引"""
+        exact: Dict[str, int] = {}
+        alias_candidates: Dict[str, Set[int]] = defaultdict(set)
+        postings: Dict[str, List[int]] = defaultdict(list)
+        gram_counts: Dict[int, int] = {}
+        names: Dict[int, str] = {}
+
+        for school_id, name, code in rows:
+            key = normalize_school_name(name)
+            if not key:
+                continue
+            names[school_id] = name
+            exact[key] = school_id
+            if code:
+                exact[normalize_school_name(code)] = school_id
+
+            # 去除括号注释的名称，如“中国石油大学(北京)” -> “中国石油大学”
+            if "(" in key:
+                alias_candidates[key.split("(", 1)[0]].add(school_id)
+
+            for alias in COMMON_ALIASES.get(name, []):
+                alias_candidates[normalize_school_name(alias)].add(school_id)
+
+            grams = self._ngrams(key)
+            gram_counts[school_id] = len(grams)
+            for gram in grams:
+                postings[gram].append(school_id)
+
+        # 仅保留无歧义、且不与全称冲突的别名
+        aliases = {
+            alias: next(iter(ids))
+            for alias, ids in alias_candidates.items()
+            if len(ids) == 1 and alias not in exact
+        }
+
+        self._exact = exact
+        self._aliases = aliases
+        self._postings = dict(postings)
+        self._gram_counts = gram_counts
+        self._names = names
+        self._built = True
+        self._dirty = False
+
+    async def refresh(self, db: AsyncSession) -> None:
+        """从数据库重新加载院校目录并重建索引"""
+        result = await db.execute(select(School.id, School.name, School.code))
+        self.build(result.all())
+
+    async def ensure_fresh(self, db: AsyncSession) -> None:
+        """索引失效时重建"""
+        if self.is_stale:
+            await self.refresh(db)
+
+    def match(self, name: str) -> Optional[Tuple[int, float]]:
+        """解析院校名称
+
+        Returns:
+            (学校ID, 置信度)，无法解析时返回None
+        """
+        key = normalize_school_name(name)
+        if not key:
+            return None
+
+        if key in self._exact:
+            return self._exact[key], 1.0
+        if key in self._aliases:
+            return self._aliases[key], 0.95
+        if "(" in key:
+            stripped = key.split("(", 1)[0]
+            if stripped in self._exact:
+                return self._exact[stripped], 0.9
+
+        # 模糊匹配：统计共享n-gram数量
+        grams = self._ngrams(key)
+        if not grams:
+            return None
+        overlaps: Dict[int, int] = defaultdict(int)
+        for gram in grams:
+            for school_id in self._postings.get(gram, ()):
+                overlaps[school_id] += 1
+
+        best_id, best_score, runner_up = None, 0.0, 0.0
+        for school_id, overlap in overlaps.items():
+            score = 2.0 * overlap / (len(grams) + self._gram_counts[school_id])
+            if score > best_score:
+                best_id, best_score, runner_up = school_id, score, best_score
+            elif score > runner_up:
+                runner_up = score
+
+        # 相似度并列时无法确定具体院校，视为无法解析
+        if best_score < self.min_similarity or best_score - runner_up < 1e-9:
+            return None
+        return best_id, best_score
+
+    def resolve(self, name: str) -> Optional[int]:
+        """解析院校名称为学校ID"""
+        matched = self.match(name)
+        return matched[0] if matched else None
+
+    def name_of(self, school_id: int) -> Optional[str]:
+        """获取学校ID对应的标准名称"""
+        return self._names.get(school_id)
+
+
+# 全局索引实例（应用启动时构建）
+school_name_index = SchoolNameIndex()
+
+
+@event.listens_for(School, "after_insert")
+@event.listens_for(School, "after_update")
+@event.listens_for(School, "after_delete")
+def _invalidate_school_name_index(mapper, connection, target):
+    """院校库变更时（提交后）使索引失效，下次使用时自动重建"""
+    invalidate_on_commit(target, school_name_index.invalidate)
@@ -0,0 +1,356 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+按分数索引的院校分类预计算表
+院校分类只取决于(考生分数, 省份, 分数线)，而考生分数是有限范围内的整数，
+因此按省份和年份预先计算“每个整数分数 -> 保底/稳妥/冲刺院校及录取概率”的表，
+推荐时只需按分数取行，再与其他推荐结果合并
+
+表以.npy文件保存在磁盘上并以内存映射方式加载，多个工作进程共享同一份页缓存；
+分数线变更时标记对应省份，下次读取前重新生成
+"""
+
+import asyncio
+import json
+import os
+import shutil
+import time
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.core.config import settings
+from app.db.base import async_session
+from app.db.events import changed_values, invalidate_on_commit
+from app.models.score_forecast import ScoreForecast
+from app.models.score_line import ScoreLine
+from app.services.school_features import latest_cutoffs
+
+# 分数差（考生分数 - 分数线）分段及对应录取概率
+SCORE_DIFF_THRESHOLDS = np.array([-30, -20, -10, 0, 10, 20, 30])
+ADMISSION_PROBABILITIES = np.array([0.1, 0.2, 0.3, 0.5, 0.7, 0.8, 0.9, 0.95])
+
+# 分类下限：录取概率≥0.8为保底，≥0.4为稳妥，其余为冲刺
+SAFETY_MIN_DIFF = 10
+MATCH_MIN_DIFF = -10
+
+# 各省最新分数线汇总表、预测分数线表的年份标记
+LATEST = "latest"
+FORECAST = "forecast"
+
+_ARRAYS = ("school_ids", "cutoffs", "stds", "bounds", "probs")
+
+
+def admission_probability(score_diff):
+    """按分数差估算录取概率（支持数组）"""
+    return ADMISSION_PROBABILITIES[
+        np.searchsorted(SCORE_DIFF_THRESHOLDS, score_diff, side="right")
+    ]
+
+
+def build_table_arrays(
+    cutoffs: Dict[int, float],
+    max_score: int,
+    stds: Optional[Dict[int, float]] = None,
+    default_std: float = 0.0,
+) -> Dict[str, np.ndarray]:
+    """生成分类表数组
+
+    院校按分数线升序排列，对任一考生分数，分数差随之降序、录取概率随之不增，
+    因此保底/稳妥/冲刺院校在每一行都是连续的三段，只需记录两个分界位置
+
+    Returns:
+        school_ids: 按分数线升序排列的院校ID (N,)
+        cutoffs: 对应的分数线 (N,)
+        stds: 对应分数线的标准误 (N,)，未提供时为default_std
+        bounds: 每个分数的分类分界 (S, 2)，[0, b0)为保底，[b0, b1)为稳妥，[b1, N)为冲刺
+        probs: 每个分数下各院校的录取概率百分比 (S, N)
+    """
+    items = sorted(cutoffs.items(), key=lambda item: (item[1], item[0]))
+    school_ids = np.array([school_id for school_id, _ in items], dtype=np.int32)
+    cutoff_values = np.array([cutoff for _, cutoff in items], dtype=np.float32)
+    std_values = np.array(
+        [(stds or {}).get(school_id, default_std) for school_id, _ in items],
+        dtype=np.float32,
+    )
+
+    scores = np.arange(max_score + 1, dtype=np.float32)
+    bounds = np.stack(
+        [
+            np.searchsorted(cutoff_values, scores - SAFETY_MIN_DIFF, side="right"),
+            np.searchsorted(cutoff_values, scores - MATCH_MIN_DIFF, side="right"),
+        ],
+        axis=1,
+    ).astype(np.int32)
+    diffs = scores[:, None] - cutoff_values[None, :]
+    probs = np.rint(admission_probability(diffs) * 100).astype(np.uint8)
+
+    return {
+        "school_ids": school_ids,
+        "cutoffs": cutoff_values,
+        "stds": std_values,
+        "bounds": bounds,
+        "probs": probs,
+    }
+
+
+class ScoreTable:
+    """单个省份/年份的分类表（数组为内存映射）"""
+
+    def __init__(self, province: str, year: Any, arrays: Dict[str, np.ndarray]):
+        self.province = province
+        self.year = year
+        self.school_ids = arrays["school_ids"]
+        self.cutoffs = arrays["cutoffs"]
+        self.stds = arrays["stds"]
+        self.bounds = arrays["bounds"]
+        self.probs = arrays["probs"]
+
+    @property
+    def max_score(self) -> int:
+        return len(self.bounds) - 1
+
+    def __len__(self) -> int:
+        return len(self.school_ids)
+
+    def lookup(self, score: float) -> Dict[str, List[Dict[str, Any]]]:
+        """取某一分数对应的三类院校（各类内按录取概率降序）"""
+        row = int(min(max(round(score), 0), self.max_score))
+        safety_end, match_end = (int(b) for b in self.bounds[row])
+        probs = self.probs[row]
+
+        result = {}
+        for category, start, end in (
+            ("safety", 0, safety_end),
+            ("match", safety_end, match_end),
+            ("challenge", match_end, len(self.school_ids)),
+        ):
+            result[category] = [
+                {
+                    "school_id": int(school_id),
+                    "score": float(cutoff),
+                    "std": float(std),
+                    "probability": int(prob) / 100,
+                }
+                for school_id, cutoff, std, prob in zip(
+                    self.school_ids[start:end].tolist(),
+                    self.cutoffs[start:end].tolist(),
+                    self.stds[start:end].tolist(),
+                    probs[start:end].tolist(),
+                )
+            ]
+        return result
+
+
+class ScoreTableStore:
+    """分类表的磁盘存储与内存映射加载
+
+    目录结构：{root}/{省份}_{年份}/v{版本}/*.npy，CURRENT文件记录当前版本；
+    重新生成时写入新版本目录后原子替换CURRENT，其他进程下次读取时发现版本变化即重新映射
+    """
+
+    def __init__(self, root: Optional[str] = None):
+        self.root = root or settings.SCORE_TABLE_DIR
+        self.max_score = settings.SCORE_TABLE_MAX_SCORE
+        self._tables: Dict[Tuple[str, Any], Tuple[str, ScoreTable]] = {}
+        self._dirty_provinces: Set[str] = set()
+        self._initialized = False
+        self._rebuild_all = False
+        self._lock = asyncio.Lock()
+
+    def invalidate(self, province: Optional[str] = None) -> None:
+        """标记省份的分类表失效，province为空时全部重新生成"""
+        if province is None:
+            self._initialized = False
+            self._rebuild_all = True
+        else:
+            self._dirty_provinces.add(province)
+
+    def _table_dir(self, province: str, year: Any) -> str:
+        return os.path.join(self.root, f"{province}_{year}")
+
+    def _write(self, province: str, year: Any, arrays: Dict[str, np.ndarray]) -> None:
+        """写入新版本并切换CURRENT"""
+        table_dir = self._table_dir(province, year)
+        version = f"v{time.time_ns()}"
+        version_dir = os.path.join(table_dir, version)
+        os.makedirs(version_dir, exist_ok=True)
+        for name in _ARRAYS:
+            np.save(os.path.join(version_dir, f"{name}.npy"), arrays[name])
+        with open(os.path.join(version_dir, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump(
+                {"province": province, "year": year, "schools": len(arrays["school_ids"])},
+                f,
+                ensure_ascii=False,
+            )
+
+        tmp_path = os.path.join(table_dir, "CURRENT.tmp")
+        with open(tmp_path, "w") as f:
+            f.write(version)
+        os.replace(tmp_path, os.path.join(table_dir, "CURRENT"))
+
+        # 清理旧版本（已映射的进程仍持有原文件，不受影响）
+        for name in os.listdir(table_dir):
+            if name.startswith("v") and name != version:
+                shutil.rmtree(os.path.join(table_dir, name), ignore_errors=True)
+
+    def _remove_stale_years(self, province: str, years: Iterable[Any]) -> None:
+        """删除已不存在分数线的年份的分类表"""
+        if not os.path.isdir(self.root):
+            return
+        keep = {f"{province}_{year}" for year in years}
+        for name in os.listdir(self.root):
+            if name.startswith(f"{province}_") and name not in keep:
+                shutil.rmtree(os.path.join(self.root, name), ignore_errors=True)
+        for key in [k for k in self._tables if k[0] == province]:
+            if f"{key[0]}_{key[1]}" not in keep:
+                del self._tables[key]
+
+    def current_version(self, province: str, year: Any) -> Optional[str]:
+        """分类表在磁盘上的当前版本，尚未生成时返回None"""
+        try:
+            with open(os.path.join(self._table_dir(province, year), "CURRENT")) as f:
+                return f.read().strip()
+        except FileNotFoundError:
+            return None
+
+    def get(self, province: str, year: Any = LATEST) -> Optional[ScoreTable]:
+        """获取分类表（以内存映射方式加载，版本变化时重新加载）"""
+        version = self.current_version(province, year)
+        if version is None:
+            return None
+        cached = self._tables.get((province, year))
+        if cached and cached[0] == version:
+            return cached[1]
+
+        version_dir = os.path.join(self._table_dir(province, year), version)
+        try:
+            arrays = {
+                name: np.load(os.path.join(version_dir, f"{name}.npy"), mmap_mode="r")
+                for name in _ARRAYS
+                if name != "stds"
+            }
+            std_path = os.path.join(version_dir, "stds.npy")
+            # 早期生成的表没有标准误数组
+            arrays["stds"] = (
+                np.load(std_path, mmap_mode="r")
+                if os.path.exists(std_path)
+                else np.full(
+                    len(arrays["school_ids"]),
+                    settings.CUTOFF_FORECAST_DEFAULT_STD,
+                    dtype=np.float32,
+                )
+            )
+        except FileNotFoundError:
+            # 其他进程正在切换版本
+            return cached[1] if cached else None
+        table = ScoreTable(province, year, arrays)
+        self._tables[(province, year)] = (version, table)
+        return table
+
+    async def rebuild(
+        self, db: AsyncSession, provinces: Optional[Iterable[str]] = None
+    ) -> int:
+        """重新生成分类表（每个省份的各年份表、最新分数线汇总表及预测分数线表）
+
+        Args:
+            db: 数据库会话
+            provinces: 需要重新生成的省份，为空时重新生成全部省份
+
+        Returns:
+            生成的分类表数量
+        """
+        query = select(ScoreLine).where(
+            ScoreLine.major_id == None, ScoreLine.min_score != None
+        )
+        forecast_query = select(ScoreForecast).where(ScoreForecast.major_id == None)
+        if provinces is not None:
+            provinces = list(provinces)
+            query = query.where(ScoreLine.province.in_(provinces))
+            forecast_query = forecast_query.where(ScoreForecast.province.in_(provinces))
+        lines = (await db.execute(query)).scalars().all()
+
+        by_province: Dict[str, List[ScoreLine]] = defaultdict(list)
+        for line in lines:
+            by_province[line.province].append(line)
+
+        forecasts_by_province: Dict[str, Dict[int, float]] = defaultdict(dict)
+        forecast_stds: Dict[str, Dict[int, float]] = defaultdict(dict)
+        for forecast in (await db.execute(forecast_query)).scalars().all():
+            forecasts_by_province[forecast.province][forecast.school_id] = forecast.predicted_score
+            forecast_stds[forecast.province][forecast.school_id] = forecast.std_error
+
+        count = 0
+        for province in set(provinces or ()) | set(by_province):
+            province_lines = by_province.get(province, [])
+
+            by_year: Dict[Any, Dict[int, float]] = defaultdict(dict)
+            for line in province_lines:
+                by_year[line.year][line.school_id] = line.min_score
+            # 每所院校取最近一年的分数线
+            lines_by_school: Dict[int, List[ScoreLine]] = defaultdict(list)
+            for line in province_lines:
+                lines_by_school[line.school_id].append(line)
+            by_year[LATEST] = {
+                school_id: latest_cutoffs(school_lines)[province]["min_score"]
+                for school_id, school_lines in lines_by_school.items()
+            }
+            # 下一年预测分数线（由分数线趋势预测任务生成）
+            if forecasts_by_province.get(province):
+                by_year[FORECAST] = forecasts_by_province[province]
+
+            for year, cutoffs in by_year.items():
+                # 历史分数线作为下一年分数线的估计时，标准误取默认值
+                arrays = build_table_arrays(
+                    cutoffs,
+                    self.max_score,
+                    forecast_stds.get(province) if year == FORECAST else None,
+                    settings.CUTOFF_FORECAST_DEFAULT_STD,
+                )
+                self._write(province, year, arrays)
+                count += 1
+            self._remove_stale_years(province, by_year)
+        return count
+
+    async def ensure_fresh(self) -> None:
+        """首次使用时生成缺失的分类表，并重新生成失效省份（全部失效时为全部省份）的分类表"""
+        if self._initialized and not self._dirty_provinces:
+            return
+        async with self._lock:
+            async with async_session() as session:
+                if not self._initialized:
+                    result = await session.execute(
+                        select(ScoreLine.province)
+                        .where(ScoreLine.major_id == None)
+                        .distinct()
+                    )
+                    missing = {
+                        province
+                        for province in result.scalars().all()
+                        if self._rebuild_all
+                        or self.current_version(province, LATEST) is None
+                    }
+                    self._dirty_provinces |= missing
+                    self._initialized = True
+                    self._rebuild_all = False
+                if self._dirty_provinces:
+                    dirty, self._dirty_provinces = self._dirty_provinces, set()
+                    await self.rebuild(session, dirty)
+
+
+# 全局分类表存储（应用启动时补齐缺失的表）
+score_table_store = ScoreTableStore()
+
+
+@event.listens_for(ScoreLine, "after_insert")
+@event.listens_for(ScoreLine, "after_update")
+@event.listens_for(ScoreLine, "after_delete")
+def _invalidate_score_tables(mapper, connection, target):
+    """分数线变更时（提交后）重新生成对应省份（含修改前的省份）的分类表"""
+    for province in changed_values(target, "province"):
+        invalidate_on_commit(target, score_table_store.invalidate, province)
@@ -0,0 +1,321 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+学生画像聚类与簇级推荐缓存
+大量学生的画像几乎相同（同省份、同分数段、相近的兴趣与目标），
+推荐中与个人无关的部分（LLM推荐、协同过滤候选院校、内容推荐的候选院校集合）
+对同一簇的学生只需计算一次
+
+离线任务对全部学生的画像向量（与近似最近邻索引相同的编码）做小批量k-means，
+为每个簇预先计算并保存共享结果；在线推荐时按学生画像找到最近的簇中心，
+取出缓存结果后只按学生本人的分数重新分类
+"""
+
+import asyncio
+import time
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import delete, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.core.config import settings
+from app.db.base import async_session
+from app.models.student import Student
+from app.models.student_cluster import StudentCluster
+from app.services.score_tables import score_table_store
+from app.services.student_index import embed_student
+
+# 预先计算LLM推荐的策略
+CLUSTER_STRATEGIES = ("balanced", "aggressive", "conservative")
+
+
+def target_school_ids(student: Any) -> List[int]:
+    """学生目标院校中的院校ID（兼容列表与按类别分组的字典）"""
+    targets = []
+    if isinstance(student.target_schools, list):
+        targets.extend(student.target_schools)
+    elif isinstance(student.target_schools, dict):
+        for schools in student.target_schools.values():
+            if isinstance(schools, list):
+                targets.extend(schools)
+
+    school_ids = []
+    for item in targets:
+        if isinstance(item, int):
+            school_ids.append(item)
+        elif isinstance(item, dict) and "id" in item:
+            school_ids.append(item["id"])
+        elif isinstance(item, dict) and "school_id" in item:
+            school_ids.append(item["school_id"])
+    return school_ids
+
+
+def _squared_distances(points: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    """点到各中心的平方距离 (M, k)"""
+    return (
+        (points * points).sum(axis=1)[:, None]
+        - 2 * points @ centroids.T
+        + (centroids * centroids).sum(axis=1)[None, :]
+    )
+
+
+def assign_clusters(
+    points: np.ndarray, centroids: np.ndarray, chunk_size: int = 65536
+) -> Tuple[np.ndarray, np.ndarray]:
+    """分块计算每个点最近的中心及平方距离"""
+    labels = np.empty(len(points), dtype=np.int64)
+    distances = np.empty(len(points))
+    for start in range(0, len(points), chunk_size):
+        d = _squared_distances(points[start : start + chunk_size], centroids)
+        labels[start : start + chunk_size] = d.argmin(axis=1)
+        distances[start : start + chunk_size] = d.min(axis=1)
+    return labels, np.maximum(distances, 0)
+
+
+def _kmeans_plus_plus(points: np.ndarray, k: int, rng: np.random.Generator) -> np.ndarray:
+    """k-means++初始化"""
+    centroids = [points[rng.integers(len(points))]]
+    distances = ((points - centroids[0]) ** 2).sum(axis=1)
+    for _ in range(1, k):
+        total = distances.sum()
+        if total <= 0:
+            break
+        centroid = points[rng.choice(len(points), p=distances / total)]
+        centroids.append(centroid)
+        distances = np.minimum(distances, ((points - centroid) ** 2).sum(axis=1))
+    return np.array(centroids)
+
+
+def minibatch_kmeans(
+    points: np.ndarray,
+    k: int,
+    batch_size: int = 1024,
+    n_iter: int = 200,
+    seed: Optional[int] = 0,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """小批量k-means
+
+    每轮随机抽取一批点分配到最近的中心，各中心向本批分到它的点的均值移动，
+    步长为本批点数/累计点数（即各中心为历次分到它的点的滑动平均）
+
+    Returns:
+        中心 (k', D)（去掉了没有分到任何点的中心）、每个点的簇编号 (N,)
+    """
+    rng = np.random.default_rng(seed)
+    n = len(points)
+    k = min(k, n)
+    sample = points[rng.choice(n, min(n, max(10 * k, 10000)), replace=False)]
+    centroids = _kmeans_plus_plus(sample, k, rng).astype(np.float64)
+    k = len(centroids)
+    counts = np.zeros(k)
+
+    for _ in range(n_iter):
+        batch = points[rng.integers(0, n, min(batch_size, n))]
+        labels, _ = assign_clusters(batch, centroids)
+        batch_counts = np.bincount(labels, minlength=k).astype(np.float64)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, labels, batch)
+        counts += batch_counts
+        moved = batch_counts > 0
+        rate = (batch_counts[moved] / counts[moved])[:, None]
+        centroids[moved] += rate * (sums[moved] / batch_counts[moved][:, None] - centroids[moved])
+
+    labels, _ = assign_clusters(points, centroids)
+    used = np.unique(labels)
+    remap = np.full(k, -1, dtype=np.int64)
+    remap[used] = np.arange(len(used))
+    return centroids[used], remap[labels]
+
+
+def _candidate_school_ids(province: str, score_min: float, score_max: float) -> List[int]:
+    """省份分类表中分数线在分数范围附近的院校"""
+    table = score_table_store.get(province)
+    if table is None or not len(table):
+        return []
+    margin = settings.STUDENT_CLUSTER_CANDIDATE_MARGIN
+    cutoffs = np.asarray(table.cutoffs)
+    # 分类表按分数线升序排列
+    start = np.searchsorted(cutoffs, score_min - margin, side="left")
+    end = np.searchsorted(cutoffs, score_max + margin, side="right")
+    return [int(i) for i in table.school_ids[start:end]]
+
+
+async def run_student_clustering(
+    db: AsyncSession, n_clusters: Optional[int] = None, seed: Optional[int] = 0
+) -> Dict[str, Any]:
+    """对全部学生聚类，并重新生成各簇的共享推荐缓存
+
+    Args:
+        db: 数据库会话
+        n_clusters: 簇数，为空时按学生数自动确定
+        seed: 随机种子
+
+    Returns:
+        统计信息：学生数、簇数、聚类与总耗时
+    """
+    # 避免循环导入：推荐服务在线使用本模块的簇缓存
+    from app.services.recommender import SchoolRecommender
+
+    started = time.perf_counter()
+    students = (
+        (await db.execute(select(Student).where(Student.total_score != None)))
+        .scalars()
+        .all()
+    )
+    await db.execute(delete(StudentCluster))
+    if not students:
+        await db.commit()
+        student_cluster_store.invalidate()
+        return {"students": 0, "clusters": 0, "fit_seconds": 0.0, "elapsed_seconds": 0.0}
+
+    points = np.stack([embed_student(student) for student in students]).astype(np.float64)
+    if not n_clusters:
+        n_clusters = int(np.clip(np.sqrt(len(students) / 2), 1, settings.STUDENT_CLUSTER_MAX))
+
+    fit_started = time.perf_counter()
+    centroids, labels = minibatch_kmeans(points, n_clusters, seed=seed)
+    fit_seconds = time.perf_counter() - fit_started
+
+    await score_table_store.ensure_fresh()
+    semaphore = asyncio.Semaphore(settings.STUDENT_CLUSTER_LLM_CONCURRENCY)
+
+    async def llm_recommendations(medoid: Student) -> Dict[str, Any]:
+        # 并发请求各用独立的会话
+        async with semaphore, async_session() as session:
+            recommender = SchoolRecommender(session)
+            return {
+                strategy: await recommender._get_llm_recommendations(medoid, strategy)
+                for strategy in CLUSTER_STRATEGIES
+            }
+
+    # 按簇编号排序后每个簇的成员是连续的一段
+    order = np.argsort(labels, kind="stable")
+    bounds = np.searchsorted(labels[order], np.arange(len(centroids) + 1))
+
+    clusters = []
+    medoids = []
+    for c in range(len(centroids)):
+        members = order[bounds[c] : bounds[c + 1]]
+        member_students = [students[i] for i in members.tolist()]
+        distances = ((points[members] - centroids[c]) ** 2).sum(axis=1)
+        medoid = member_students[int(distances.argmin())]
+        scores = [s.total_score for s in member_students]
+
+        # 协同过滤：簇内学生的目标院校按出现次数排序
+        counter = Counter(
+            school_id for s in member_students for school_id in target_school_ids(s)
+        )
+        cf_school_ids = [
+            school_id
+            for school_id, _ in counter.most_common(settings.STUDENT_CLUSTER_CF_SCHOOLS)
+        ]
+
+        # 内容推荐候选院校：簇内各省份分数线在簇内分数范围附近的院校
+        provinces = {s.province for s in member_students if s.province}
+        candidates = {
+            province: _candidate_school_ids(province, min(scores), max(scores))
+            for province in provinces
+        }
+
+        medoids.append(medoid)
+        clusters.append(
+            StudentCluster(
+                centroid=[round(float(x), 6) for x in centroids[c]],
+                size=len(members),
+                medoid_student_id=medoid.id,
+                score_min=min(scores),
+                score_max=max(scores),
+                cf_school_ids=cf_school_ids,
+                candidate_school_ids=candidates,
+            )
+        )
+
+    # LLM推荐以最接近簇中心的学生为代表，各簇并发请求
+    results = await asyncio.gather(*[llm_recommendations(m) for m in medoids])
+    for cluster, result in zip(clusters, results):
+        cluster.llm_recommendations = result
+
+    db.add_all(clusters)
+    await db.commit()
+    student_cluster_store.invalidate()
+
+    return {
+        "students": len(students),
+        "clusters": len(clusters),
+        "fit_seconds": round(fit_seconds, 3),
+        "elapsed_seconds": round(time.perf_counter() - started, 3),
+    }
+
+
+class ClusterCache:
+    """单个簇的共享推荐缓存"""
+
+    def __init__(self, cluster: StudentCluster, similarity: float):
+        self.id = cluster.id
+        self.similarity = similarity
+        self.score_min = cluster.score_min
+        self.score_max = cluster.score_max
+        self.llm_recommendations = cluster.llm_recommendations or {}
+        self.cf_school_ids = cluster.cf_school_ids or []
+        self.candidate_school_ids = cluster.candidate_school_ids or {}
+
+    def candidates_for(self, student: Student) -> Optional[set]:
+        """学生可用的候选院校集合，分数超出簇内范围或省份不在簇内时返回None（不限）"""
+        if self.score_min is None or not (
+            self.score_min <= student.total_score <= self.score_max
+        ):
+            return None
+        candidates = self.candidate_school_ids.get(student.province)
+        return set(candidates) if candidates else None
+
+
+class StudentClusterStore:
+    """簇中心的内存视图，聚类任务重新运行后（簇ID变化）自动重新加载"""
+
+    def __init__(self):
+        self._version: Optional[Tuple[int, int]] = None
+        self._ids: List[int] = []
+        self._centroids = np.zeros((0, 0))
+
+    def invalidate(self) -> None:
+        self._version = None
+
+    async def ensure_fresh(self, db: AsyncSession) -> None:
+        """簇数或最大簇ID变化时重新加载簇中心"""
+        result = await db.execute(
+            select(func.count(StudentCluster.id), func.max(StudentCluster.id))
+        )
+        version = tuple(result.one())
+        if version == self._version:
+            return
+        result = await db.execute(select(StudentCluster.id, StudentCluster.centroid))
+        rows = result.all()
+        self._ids = [row.id for row in rows]
+        self._centroids = (
+            np.array([row.centroid for row in rows], dtype=np.float64)
+            if rows
+            else np.zeros((0, 0))
+        )
+        self._version = version
+
+    async def lookup(self, db: AsyncSession, student: Student) -> Optional[ClusterCache]:
+        """学生所属的簇，未聚类或画像与最近的簇中心不够相似时返回None"""
+        await self.ensure_fresh(db)
+        if not self._ids:
+            return None
+        vector = embed_student(student).astype(np.float64)
+        norms = np.linalg.norm(self._centroids, axis=1)
+        similarities = self._centroids @ vector / np.where(norms > 0, norms, 1.0)
+        best = int(similarities.argmax())
+        if similarities[best] < settings.STUDENT_CLUSTER_MIN_SIMILARITY:
+            return None
+        cluster = await db.get(StudentCluster, self._ids[best])
+        return ClusterCache(cluster, float(similarities[best])) if cluster else None
+
+
+# 全局簇中心存储
+student_cluster_store = StudentClusterStore()
@@ -0,0 +1,300 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+学生画像近似最近邻索引
+将学生编码为定长向量（归一化的各科成绩、省份独热编码、兴趣/职业/目标专业的特征哈希），
+单位化后以余弦相似度衡量学生之间的相似程度
+
+索引采用随机超平面局部敏感哈希（LSH）：每张哈希表用若干随机超平面把向量空间切分为桶，
+查询时只在各表中与查询向量同桶的学生里精确计算相似度；
+新学生只需计算一次哈希码并追加到对应桶，无需重建
+"""
+
+import zlib
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.db.events import invalidate_on_commit
+from app.models.student import Student
+from app.services.school_features import REGIONS
+
+# 成绩字段及满分（用于归一化）
+SCORE_FIELDS: Tuple[Tuple[str, float], ...] = (
+    ("total_score", 750.0),
+    ("chinese_score", 150.0),
+    ("math_score", 150.0),
+    ("english_score", 150.0),
+    ("physics_score", 100.0),
+    ("chemistry_score", 100.0),
+    ("biology_score", 100.0),
+    ("history_score", 100.0),
+    ("geography_score", 100.0),
+    ("politics_score", 100.0),
+)
+PROVINCES: List[str] = [p for provinces in REGIONS.values() for p in provinces]
+_PROVINCE_INDEX = {province: i for i, province in enumerate(PROVINCES)}
+
+# 兴趣、职业目标、目标专业的特征哈希维数
+HASH_DIM = 32
+
+# 各部分的权重：总分最能决定可选院校，省份决定分数线口径
+BLOCK_WEIGHTS = {"total": 3.0, "subjects": 1.0, "province": 1.5, "hashed": 1.0}
+
+EMBEDDING_DIM = len(SCORE_FIELDS) + len(PROVINCES) + HASH_DIM
+
+# LSH参数：哈希表数、每张表的超平面数
+LSH_TABLES = 8
+LSH_BITS = 20
+# 学生数不超过该值时直接精确查找
+EXACT_SEARCH_MAX = 20000
+
+
+def _text_tokens(student: Any) -> List[str]:
+    """学生的兴趣、职业目标与目标专业文本"""
+    tokens = []
+    interests = getattr(student, "interests", None)
+    if isinstance(interests, list):
+        tokens.extend(f"interest:{i}" for i in interests if isinstance(i, str))
+    career_goals = getattr(student, "career_goals", None)
+    if isinstance(career_goals, str):
+        tokens.append(f"career:{career_goals}")
+    elif isinstance(career_goals, dict) and isinstance(career_goals.get("goal"), str):
+        tokens.append(f"career:{career_goals['goal']}")
+    target_majors = getattr(student, "target_majors", None)
+    if isinstance(target_majors, list):
+        tokens.extend(f"major:{m}" for m in target_majors if isinstance(m, str))
+    return tokens
+
+
+def embed_student(student: Any) -> np.ndarray:
+    """将学生（或具有相同属性的对象）编码为单位向量"""
+    vector = np.zeros(EMBEDDING_DIM, dtype=np.float32)
+
+    # 成绩：按满分归一化，缺失的科目为0
+    for i, (field, full_score) in enumerate(SCORE_FIELDS):
+        value = getattr(student, field, None)
+        if value:
+            weight = BLOCK_WEIGHTS["total"] if i == 0 else BLOCK_WEIGHTS["subjects"]
+            vector[i] = weight * min(float(value) / full_score, 1.0)
+
+    offset = len(SCORE_FIELDS)
+    province_index = _PROVINCE_INDEX.get(getattr(student, "province", None))
+    if province_index is not None:
+        vector[offset + province_index] = BLOCK_WEIGHTS["province"]
+
+    # 特征哈希：crc32决定桶和符号，结果与进程无关
+    offset += len(PROVINCES)
+    tokens = _text_tokens(student)
+    if tokens:
+        weight = BLOCK_WEIGHTS["hashed"] / np.sqrt(len(tokens))
+        for token in tokens:
+            code = zlib.crc32(token.lower().encode("utf-8"))
+            sign = 1.0 if code & 1 else -1.0
+            vector[offset + (code >> 1) % HASH_DIM] += sign * weight
+
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm > 0 else vector
+
+
+class StudentANNIndex:
+    """学生画像的随机超平面LSH索引
+
+    向量按插入顺序存放在可扩容的矩阵中。各哈希表以“按桶编号排序的行号 + 有序桶编号”
+    的紧凑数组存储，查询时二分定位桶的区间；增量插入的行先放入小的待合并桶，
+    累积到已索引行数的一定比例后统一重新哈希合并（均摊开销为常数）。
+    超平面经过全部向量的均值点，避免画像向量集中在同一象限时大部分学生落入同一个桶。
+    学生信息更新时旧行作废、追加新行，删除时只作废
+    """
+
+    def __init__(self, n_tables: int = LSH_TABLES, n_bits: int = LSH_BITS, seed: int = 0):
+        rng = np.random.default_rng(seed)
+        self.n_tables = n_tables
+        self.n_bits = n_bits
+        # 全部哈希表的超平面合并为一个矩阵，一次矩阵乘法得到所有哈希码
+        self._planes = rng.standard_normal((n_tables * n_bits, EMBEDDING_DIM)).astype(np.float32)
+        self._powers = (1 << np.arange(n_bits)).astype(np.int64)
+        self._reset()
+        self._built = False
+
+    def _reset(self) -> None:
+        self._vectors = np.zeros((1024, EMBEDDING_DIM), dtype=np.float32)
+        self._ids = np.full(1024, -1, dtype=np.int64)
+        self._size = 0
+        self._rows: Dict[int, int] = {}
+        self._center = np.zeros(EMBEDDING_DIM, dtype=np.float32)
+        # 已合并部分：每张表的有序桶编号及对应行号 (n_tables, 有效行数)，merged_size为合并时的行数
+        self._merged_size = 0
+        self._sorted_codes = np.zeros((self.n_tables, 0), dtype=np.int64)
+        self._sorted_rows = np.zeros((self.n_tables, 0), dtype=np.int64)
+        # 待合并部分：每张表的 桶编号 -> 行号列表
+        self._pending: List[Dict[int, List[int]]] = [{} for _ in range(self.n_tables)]
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    @property
+    def is_built(self) -> bool:
+        return self._built
+
+    def _hash(self, vectors: np.ndarray) -> np.ndarray:
+        """计算向量在各哈希表中的桶编号 (M, n_tables)"""
+        bits = ((vectors - self._center) @ self._planes.T > 0).reshape(
+            len(vectors), self.n_tables, self.n_bits
+        )
+        return bits.astype(np.int64) @ self._powers
+
+    def _grow(self, capacity: int) -> None:
+        if capacity <= len(self._ids):
+            return
+        capacity = max(capacity, 2 * len(self._ids))
+        vectors = np.zeros((capacity, EMBEDDING_DIM), dtype=np.float32)
+        vectors[: self._size] = self._vectors[: self._size]
+        ids = np.full(capacity, -1, dtype=np.int64)
+        ids[: self._size] = self._ids[: self._size]
+        self._vectors, self._ids = vectors, ids
+
+    def _merge(self) -> None:
+        """以当前全部有效行重新计算均值点和哈希码，并合并待合并桶"""
+        live = np.nonzero(self._ids[: self._size] >= 0)[0]
+        if len(live):
+            self._center = self._vectors[live].mean(axis=0)
+        codes = self._hash(self._vectors[live]).T if len(live) else np.zeros((self.n_tables, 0), dtype=np.int64)
+        order = np.argsort(codes, axis=1, kind="stable")
+        self._sorted_codes = np.take_along_axis(codes, order, axis=1)
+        self._sorted_rows = live[order]
+        self._merged_size = self._size
+        self._pending = [{} for _ in range(self.n_tables)]
+
+    def add_many(self, student_ids: Iterable[int], vectors: np.ndarray) -> None:
+        """批量插入（已存在的学生先作废旧行）"""
+        student_ids = list(student_ids)
+        if not student_ids:
+            return
+        for student_id in student_ids:
+            self.remove(student_id)
+        start = self._size
+        self._grow(start + len(student_ids))
+        self._vectors[start : start + len(student_ids)] = vectors
+        self._ids[start : start + len(student_ids)] = student_ids
+        self._size += len(student_ids)
+        for offset, student_id in enumerate(student_ids):
+            self._rows[student_id] = start + offset
+
+        # 待合并的行超过已索引行数的1/4时整体合并，否则只写入待合并桶
+        pending = self._size - self._merged_size
+        if pending > max(1024, self._merged_size // 4):
+            self._merge()
+            return
+        codes = self._hash(np.asarray(vectors, dtype=np.float32)).tolist()
+        for offset, row_codes in enumerate(codes):
+            for table, code in zip(self._pending, row_codes):
+                table.setdefault(code, []).append(start + offset)
+
+    def add(self, student: Any) -> None:
+        """插入或更新单个学生"""
+        self.add_many([student.id], embed_student(student)[None, :])
+
+    def remove(self, student_id: int) -> None:
+        """作废学生对应的行（桶中的行号在查询时跳过）"""
+        row = self._rows.pop(student_id, None)
+        if row is not None:
+            self._ids[row] = -1
+
+    def build(self, students: Iterable[Any]) -> None:
+        """根据全部学生重建索引"""
+        students = list(students)
+        self._reset()
+        if students:
+            self._grow(len(students))
+            self._vectors[: len(students)] = np.stack([embed_student(s) for s in students])
+            self._ids[: len(students)] = [student.id for student in students]
+            self._size = len(students)
+            self._rows = {student.id: row for row, student in enumerate(students)}
+            self._merge()
+        self._built = True
+
+    async def refresh(self, db: AsyncSession) -> None:
+        """从数据库加载全部学生并重建索引"""
+        result = await db.execute(select(Student))
+        self.build(result.scalars().all())
+
+    async def ensure_fresh(self, db: AsyncSession) -> None:
+        """首次使用时构建索引（之后由学生变更事件增量维护）"""
+        if not self._built:
+            await self.refresh(db)
+
+    def _candidates(self, vector: np.ndarray) -> np.ndarray:
+        """与查询向量在任一哈希表中同桶的行号"""
+        codes = self._hash(vector[None, :])[0]
+        lows = [np.searchsorted(self._sorted_codes[t], codes[t], side="left") for t in range(self.n_tables)]
+        highs = [np.searchsorted(self._sorted_codes[t], codes[t], side="right") for t in range(self.n_tables)]
+        parts = [self._sorted_rows[t, lows[t] : highs[t]] for t in range(self.n_tables)]
+        for table, code in zip(self._pending, codes.tolist()):
+            if code in table:
+                parts.append(np.asarray(table[code], dtype=np.int64))
+        # 候选只有数千个，排序去重比np.unique快
+        rows = np.sort(np.concatenate(parts))
+        return rows[np.r_[True, rows[1:] != rows[:-1]]] if len(rows) else rows
+
+    def query(
+        self, vector: np.ndarray, k: int = 10, exclude_id: Optional[int] = None
+    ) -> List[Tuple[int, float]]:
+        """近似查找与向量最相似的k个学生
+
+        Returns:
+            [(学生ID, 余弦相似度)]，按相似度降序
+        """
+        def live(rows):
+            ids = self._ids[rows]
+            valid = ids >= 0
+            if exclude_id is not None:
+                valid &= ids != exclude_id
+            return rows[valid], ids[valid]
+
+        # 学生较少或同桶学生不足k个时退回精确查找
+        exact = self._size <= EXACT_SEARCH_MAX
+        rows, ids = live(np.arange(self._size) if exact else self._candidates(vector))
+        if not exact and len(rows) < k:
+            rows, ids = live(np.arange(self._size))
+        if len(rows) == 0:
+            return []
+
+        similarities = self._vectors[rows] @ vector
+        if len(rows) > k:
+            top = np.argpartition(-similarities, k - 1)[:k]
+        else:
+            top = np.arange(len(rows))
+        top = top[np.argsort(-similarities[top], kind="stable")]
+        return [(int(ids[i]), float(similarities[i])) for i in top]
+
+    def nearest(self, student: Any, k: int = 10) -> List[Tuple[int, float]]:
+        """查找与学生最相似的k个其他学生"""
+        return self.query(embed_student(student), k, exclude_id=student.id)
+
+
+# 全局学生画像索引（首次使用时构建，之后随学生增删改增量维护）
+student_index = StudentANNIndex()
+
+
+@event.listens_for(Student, "after_insert")
+@event.listens_for(Student, "after_update")
+def _index_student(mapper, connection, target):
+    """新建或更新学生时（提交后）增量写入索引"""
+    invalidate_on_commit(target, _add_if_built, target)
+
+
+@event.listens_for(Student, "after_delete")
+def _remove_student(mapper, connection, target):
+    """删除学生时（提交后）从索引中作废"""
+    invalidate_on_commit(target, student_index.remove, target.id)
+
+
+def _add_if_built(student: Student) -> None:
+    """索引已构建时写入学生向量，未构建时留待首次构建"""
+    if student_index.is_built:
+        student_index.add(student)
@@ -5,7 +5,9 @@
 学习计划生成服务
 """
 
-from typing import List, Dict, Any, Optional
+import time
+import asyncio
+from typing import Awaitable, Callable, List, Dict, Any, Optional, Tuple
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 
@@ -14,14 +16,39 @@ from app.models.school import School
 from app.models.major import Major
 from app.models.score_line import ScoreLine
 from app.models.study_plan import StudyPlan
-from app.services.llm_service import get_llm_study_plan
+from app.core.config import settings
+from app.services.llm_service import get_llm_study_plan, get_llm_study_plan_template
+from app.services.plan_template_cache import make_template_key, render
+
+
+class StudyPlanError(Exception):
+    """学习计划请求无效（如缺少重点学科、不支持的计划类型）"""
 
 
 class StudyPlanGenerator:
     """学习计划生成器"""
 
-    def __init__(self, db: AsyncSession):
+    def __init__(
+        self,
+        db: AsyncSession,
+        llm_concurrency: Optional[int] = None,
+        dedupe_requests: bool = False,
+    ):
+        """
+        Args:
+            db: 数据库会话
+            llm_concurrency: 同时进行的LLM请求上限（None表示不限制）
+            dedupe_requests: 是否合并计划参数（分段后）相同的LLM请求（批量生成时使用）
+        """
         self.db = db
+        self._llm_semaphore = (
+            asyncio.Semaphore(llm_concurrency) if llm_concurrency else None
+        )
+        self._request_memo: Optional[Dict[Tuple, asyncio.Future]] = (
+            {} if dedupe_requests else None
+        )
+        self.llm_requests = 0
+        self.deduplicated_requests = 0
 
     async def generate_study_plan(
         self,
@@ -37,7 +64,8 @@ class StudyPlanGenerator:
 
         Args:
             student_id: 学生ID
-            plan_type: 计划类型(overall-总体计划, weekly-周计划, subject-学科计划)
+            plan_type: 计划类型(overall-总体计划, weekly-周计划, subject-学科计划,
+                multi_subject-多学科综合计划)
             duration: 计划时长
             focus_subjects: 重点科目
             target_score: 目标分数
@@ -54,7 +82,191 @@ class StudyPlanGenerator:
         if not student:
             return {"status": "error", "message": "未找到学生信息"}
 
-        # 获取学生的目标院校信息
+        # 获取学生的目标院校、专业信息
+        target_school_data, target_major_data = await self._load_targets(
+            target_schools, target_majors
+        )
+
+        try:
+            plan_data, focus_subjects, weak_subjects = await self._build_plan_content(
+                student,
+                plan_type,
+                duration,
+                focus_subjects,
+                target_score,
+                target_school_data,
+                target_major_data,
+            )
+        except StudyPlanError as e:
+            return {"status": "error", "message": str(e)}
+
+        # 创建学习计划记录
+        study_plan = self._make_study_plan(
+            student, plan_type, duration, focus_subjects, weak_subjects, plan_data
+        )
+
+        self.db.add(study_plan)
+        await self.db.commit()
+        await self.db.refresh(study_plan)
+
+        return {
+            "status": "success",
+            "plan_id": study_plan.id,
+            "plan_type": plan_type,
+            "title": study_plan.title,
+            "overview": plan_data.get("overview"),
+            "weekly_schedule": plan_data.get("weekly_schedule"),
+            "daily_tasks": plan_data.get("daily_tasks"),
+            "goals": plan_data.get("goals"),
+            "focus_areas": focus_subjects,
+            "learning_resources": plan_data.get("learning_resources"),
+            "subject_plans": plan_data.get("subject_plans"),
+        }
+
+    async def generate_bulk_study_plans(
+        self,
+        student_ids: Optional[List[int]] = None,
+        province: Optional[str] = None,
+        current_school: Optional[str] = None,
+        plan_type: str = "overall",
+        duration: str = "3个月",
+        focus_subjects: Optional[List[str]] = None,
+        target_score: Optional[float] = None,
+        target_schools: Optional[List[int]] = None,
+        target_majors: Optional[List[int]] = None,
+        batch_size: int = 50,
+        progress_callback: Optional[Callable[[Dict[str, Any]], None]] = None,
+    ) -> Dict[str, Any]:
+        """为一批学生批量生成学习计划
+
+        一次查询加载全部学生，所有学生的计划内容同时进入受并发上限约束的LLM流水线；
+        按批次依次收集结果并批量写入学习计划记录，每完成一批报告一次进度。
+
+        Args:
+            student_ids: 学生ID列表
+            province: 按省份筛选学生
+            current_school: 按就读学校筛选学生
+            batch_size: 每批写入的计划数
+            progress_callback: 每批完成后调用，参数为该批的进度信息
+            其余参数同generate_study_plan
+
+        Returns:
+            批量生成结果汇总
+        """
+        if not student_ids and not province and not current_school:
+            return {"status": "error", "message": "请指定学生ID列表或筛选条件"}
+
+        # 一次查询加载全部学生
+        query = select(Student)
+        if student_ids:
+            query = query.where(Student.id.in_(set(student_ids)))
+        if province:
+            query = query.where(Student.province == province)
+        if current_school:
+            query = query.where(Student.current_school == current_school)
+        result = await self.db.execute(query.order_by(Student.id))
+        students = result.scalars().all()
+
+        missing_ids = []
+        if student_ids:
+            found = {s.id for s in students}
+            missing_ids = sorted(set(student_ids) - found)
+
+        target_school_data, target_major_data = await self._load_targets(
+            target_schools, target_majors
+        )
+
+        started = time.monotonic()
+        batch_size = max(1, batch_size)
+        total_batches = (len(students) + batch_size - 1) // batch_size
+
+        # 全部学生的计划内容同时排队生成，实际并发由LLM信号量控制，
+        # 写入前一批时后续批次的LLM请求仍在进行
+        tasks = [
+            asyncio.ensure_future(
+                self._build_plan_content(
+                    student,
+                    plan_type,
+                    duration,
+                    focus_subjects,
+                    target_score,
+                    target_school_data,
+                    target_major_data,
+                )
+            )
+            for student in students
+        ]
+
+        plans: List[Dict[str, Any]] = []
+        errors: List[Dict[str, Any]] = []
+        batches: List[Dict[str, Any]] = []
+        try:
+            for batch_index in range(total_batches):
+                batch_start = batch_index * batch_size
+                batch_students = students[batch_start : batch_start + batch_size]
+                batch_results = await asyncio.gather(
+                    *tasks[batch_start : batch_start + batch_size],
+                    return_exceptions=True,
+                )
+
+                rows = []
+                for student, content in zip(batch_students, batch_results):
+                    if isinstance(content, BaseException):
+                        errors.append({"student_id": student.id, "message": str(content)})
+                        continue
+                    plan_data, subjects, weak_subjects = content
+                    rows.append(
+                        self._make_study_plan(
+                            student, plan_type, duration, subjects, weak_subjects, plan_data
+                        )
+                    )
+
+                # 批量写入本批计划
+                self.db.add_all(rows)
+                await self.db.commit()
+                plans.extend(
+                    {"student_id": row.student_id, "plan_id": row.id, "title": row.title}
+                    for row in rows
+                )
+
+                progress = {
+                    "batch": batch_index + 1,
+                    "total_batches": total_batches,
+                    "processed": min(batch_start + batch_size, len(students)),
+                    "total": len(students),
+                    "created": len(rows),
+                    "failed": len(batch_students) - len(rows),
+                    "elapsed_seconds": round(time.monotonic() - started, 2),
+                }
+                batches.append(progress)
+                if progress_callback:
+                    progress_callback(progress)
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+        return {
+            "status": "success",
+            "plan_type": plan_type,
+            "total_students": len(students),
+            "created": len(plans),
+            "failed": len(errors),
+            "missing_student_ids": missing_ids,
+            "llm_requests": self.llm_requests,
+            "deduplicated_requests": self.deduplicated_requests,
+            "elapsed_seconds": round(time.monotonic() - started, 2),
+            "batches": batches,
+            "plans": plans,
+            "errors": errors,
+        }
+
+    async def _load_targets(
+        self,
+        target_schools: Optional[List[int]],
+        target_majors: Optional[List[int]],
+    ) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """获取目标院校与目标专业信息"""
         target_school_data = []
         if target_schools:
             result = await self.db.execute(
@@ -65,7 +277,6 @@ class StudyPlanGenerator:
                 {"id": s.id, "name": s.name, "rank": s.rank} for s in schools
             ]
 
-        # 获取学生的目标专业信息
         target_major_data = []
         if target_majors:
             result = await self.db.execute(
@@ -76,6 +287,26 @@ class StudyPlanGenerator:
                 {"id": m.id, "name": m.name, "category": m.category} for m in majors
             ]
 
+        return target_school_data, target_major_data
+
+    async def _build_plan_content(
+        self,
+        student: Student,
+        plan_type: str,
+        duration: str,
+        focus_subjects: Optional[List[str]],
+        target_score: Optional[float],
+        target_school_data: List[Dict[str, Any]],
+        target_major_data: List[Dict[str, Any]],
+    ) -> Tuple[Dict[str, Any], Optional[List[str]], List[str]]:
+        """生成单个学生的计划内容（不访问数据库）
+
+        Returns:
+            (计划内容, 重点科目, 薄弱学科)
+
+        Raises:
+            StudyPlanError: 请求参数无效
+        """
         # 如果没有指定目标分数，使用学生当前分数增加一定值
         if not target_score and student.total_score:
             target_score = student.total_score + 30  # 默认目标是提高30分
@@ -88,8 +319,6 @@ class StudyPlanGenerator:
             focus_subjects = weak_subjects if isinstance(weak_subjects, list) else []
 
         # 根据计划类型生成不同的学习计划
-        plan_data = {}
-
         if plan_type == "overall":
             # 生成总体学习计划
             plan_data = await self._generate_overall_plan(
@@ -107,22 +336,42 @@ class StudyPlanGenerator:
             )
         elif plan_type == "subject":
             # 生成学科学习计划
-            if focus_subjects and len(focus_subjects) > 0:
-                plan_data = await self._generate_subject_plan(
-                    student, focus_subjects[0], duration  # 取第一个科目作为重点
-                )
-            else:
-                return {"status": "error", "message": "请指定需要重点提升的学科"}
+            if not focus_subjects:
+                raise StudyPlanError("请指定需要重点提升的学科")
+            plan_data = await self._generate_subject_plan(
+                student, focus_subjects[0], duration  # 取第一个科目作为重点
+            )
+        elif plan_type == "multi_subject":
+            # 并发生成每个重点科目的学科计划并合并
+            if not focus_subjects:
+                raise StudyPlanError("请指定需要重点提升的学科")
+            focus_subjects = list(dict.fromkeys(focus_subjects))
+            plan_data = await self._generate_multi_subject_plan(
+                student, focus_subjects, duration
+            )
         else:
-            return {"status": "error", "message": f"不支持的计划类型: {plan_type}"}
+            raise StudyPlanError(f"不支持的计划类型: {plan_type}")
 
-        # 创建学习计划记录
+        return plan_data, focus_subjects, weak_subjects
+
+    def _make_study_plan(
+        self,
+        student: Student,
+        plan_type: str,
+        duration: str,
+        focus_subjects: Optional[List[str]],
+        weak_subjects: List[str],
+        plan_data: Dict[str, Any],
+    ) -> StudyPlan:
+        """根据计划内容创建学习计划记录（未写入数据库）"""
         plan_title = f"{duration}{plan_type.capitalize()}学习计划"
         if plan_type == "subject" and focus_subjects:
             plan_title = f"{focus_subjects[0]}学科{duration}提升计划"
+        elif plan_type == "multi_subject" and focus_subjects:
+            plan_title = f"{'、'.join(focus_subjects)}学科{duration}提升计划"
 
-        study_plan = StudyPlan(
-            student_id=student_id,
+        return StudyPlan(
+            student_id=student.id,
             title=plan_title,
             plan_type=plan_type,
             duration=duration,
@@ -138,22 +387,42 @@ class StudyPlanGenerator:
             progress_tracking=plan_data.get("progress_tracking"),
         )
 
-        self.db.add(study_plan)
-        await self.db.commit()
-        await self.db.refresh(study_plan)
+    async def _request_llm_plan(self, plan_data: Dict[str, Any]) -> Dict[str, Any]:
+        """请求LLM生成计划内容
 
-        return {
-            "status": "success",
-            "plan_id": study_plan.id,
-            "plan_type": plan_type,
-            "title": plan_title,
-            "overview": plan_data.get("overview"),
-            "weekly_schedule": plan_data.get("weekly_schedule"),
-            "daily_tasks": plan_data.get("daily_tasks"),
-            "goals": plan_data.get("goals"),
-            "focus_areas": focus_subjects,
-            "learning_resources": plan_data.get("learning_resources"),
-        }
+        开启去重时，计划参数（与模板缓存相同的分段键）相同的请求只调用一次LLM
+        生成不含学生信息的模板，各学生的姓名、分数在本地填入。
+        """
+        if self._request_memo is None or not settings.OPENAI_API_KEY:
+            return await self._call_llm(get_llm_study_plan, plan_data)
+
+        key = make_template_key(plan_data)
+        future = self._request_memo.get(key)
+        if future is None:
+            future = asyncio.ensure_future(
+                self._call_llm(get_llm_study_plan_template, plan_data)
+            )
+            self._request_memo[key] = future
+        else:
+            self.deduplicated_requests += 1
+        template = await asyncio.shield(future)
+        if template is None:
+            # 模板生成失败时按单个学生请求（失败时为模拟计划）
+            return await self._call_llm(get_llm_study_plan, plan_data)
+        return render(template, plan_data)
+
+    async def _call_llm(
+        self,
+        request: Callable[[Dict[str, Any]], Awaitable[Optional[Dict[str, Any]]]],
+        plan_data: Dict[str, Any],
+    ) -> Optional[Dict[str, Any]]:
+        """调用LLM服务（受并发上限约束）"""
+        if self._llm_semaphore is None:
+            self.llm_requests += 1
+            return await request(plan_data)
+        async with self._llm_semaphore:
+            self.llm_requests += 1
+            return await request(plan_data)
 
     async def _generate_overall_plan(
         self,
@@ -187,7 +456,7 @@ class StudyPlanGenerator:
             "target_majors": target_majors,
         }
 
-        llm_plan = await get_llm_study_plan(plan_data)
+        llm_plan = await self._request_llm_plan(plan_data)
 
         # 整理计划数据
         return {
@@ -222,7 +491,7 @@ class StudyPlanGenerator:
             "focus_subjects": focus_subjects,
         }
 
-        llm_plan = await get_llm_study_plan(plan_data)
+        llm_plan = await self._request_llm_plan(plan_data)
 
         # 整理每周计划数据
         weekly_schedule = {}
@@ -282,7 +551,7 @@ class StudyPlanGenerator:
             "subject": subject,
         }
 
-        llm_plan = await get_llm_study_plan(plan_data)
+        llm_plan = await self._request_llm_plan(plan_data)
 
         # 整理学科计划数据
         return {
@@ -292,3 +561,52 @@ class StudyPlanGenerator:
             "recommended_materials": llm_plan.get("recommended_materials", []),
             "milestones": llm_plan.get("milestones", []),
         }
+
+    async def _generate_multi_subject_plan(
+        self, student: Student, subjects: List[str], duration: str
+    ) -> Dict[str, Any]:
+        """并发生成多个学科的学习计划并合并为一份综合计划
+
+        各学科计划通过信号量限制并发数同时请求LLM，总耗时约为单次LLM调用的延迟。
+        """
+        semaphore = asyncio.Semaphore(settings.STUDY_PLAN_SUBJECT_CONCURRENCY)
+
+        async def generate(subject: str) -> Dict[str, Any]:
+            async with semaphore:
+                return await self._generate_subject_plan(student, subject, duration)
+
+        subject_plans = await asyncio.gather(*(generate(s) for s in subjects))
+
+        # 合并各学科内容，条目标注所属学科
+        overview_parts = []
+        goals = []
+        learning_resources = []
+        recommended_materials = []
+        milestones = []
+        for subject, plan in zip(subjects, subject_plans):
+            if plan.get("overview"):
+                overview_parts.append(f"【{subject}】{plan['overview']}")
+            goals.extend(f"{subject}：{goal}" for goal in plan.get("goals") or [])
+            for resource in plan.get("learning_resources") or []:
+                if isinstance(resource, dict):
+                    learning_resources.append({**resource, "subject": subject})
+            for material in plan.get("recommended_materials") or []:
+                if isinstance(material, dict):
+                    recommended_materials.append({"subject": subject, **material})
+            for milestone in plan.get("milestones") or []:
+                if isinstance(milestone, dict):
+                    milestones.append({**milestone, "subject": subject})
+
+        # 里程碑按周次排序，便于按时间线展示
+        milestones.sort(
+            key=lambda m: m.get("week") if isinstance(m.get("week"), (int, float)) else 0
+        )
+
+        return {
+            "overview": "\n".join(overview_parts),
+            "goals": goals,
+            "learning_resources": learning_resources,
+            "recommended_materials": recommended_materials,
+            "milestones": milestones,
+            "subject_plans": dict(zip(subjects, subject_plans)),
+        }
@@ -14,7 +14,13 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from app.api.api import api_router
 from app.core.config import settings
+from app.db.base import async_session
 from app.db.init_db import init_db
+from app.services.school_name_index import school_name_index
+from app.services.school_bitmap_index import school_bitmap_index
+from app.services.score_tables import score_table_store
+from app.services.school_features import school_feature_store
+from app.services.student_index import student_index
 
 # 创建FastAPI应用
 app = FastAPI(
@@ -46,6 +52,20 @@ async def startup_event():
     # 初始化数据库
     await init_db()
 
+    # 构建院校名称解析索引
+    async with async_session() as session:
+        await school_name_index.refresh(session)
+        # 构建院校属性位图索引
+        await school_bitmap_index.refresh(session)
+        # 构建学生画像近似最近邻索引（之后随学生增删改增量维护）
+        await student_index.refresh(session)
+
+    # 加载院校特征（缺失的院校即时计算）
+    await school_feature_store.ensure_fresh()
+
+    # 补齐缺失的按分数索引的院校分类表
+    await score_table_store.ensure_fresh()
+
 
 # 主程序入口
 if __name__ == "__main__":
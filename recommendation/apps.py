@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class RecommendationConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "recommendation"
+
+    def ready(self):
+        # 注册学校特征更新信号
+        from . import signals  # noqa: F401
@@ -0,0 +1,63 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+学生各维度得分向量的缓存
+每个(学生, 维度)缓存一条对全部院校的得分向量，连同计算时该维度依赖字段的取值；
+学生只修改了个别字段时，只有依赖这些字段的维度需要重新计算，其余维度直接复用，
+最终的加权合成（权重、策略调整）每次请求重新计算
+
+修改学生后无需主动失效：每次读取都比对依赖字段的当前取值，取值变化的维度重新计算，
+因此其他工作进程对学生的修改同样能被发现；条目同时记录计算时的院校目录版本，版本不同时作废
+
+缓存在每个进程内各有一份，院校目录的版本见topk.CatalogVersion
+"""
+
+from collections import OrderedDict
+
+# 最多缓存的学生数（按最近使用淘汰）
+MAX_STUDENTS = 1024
+
+
+class DimensionVectorCache:
+    """(学生, 维度) -> 得分向量"""
+
+    def __init__(self, dimension_fields, max_students=MAX_STUDENTS):
+        """
+        参数:
+            dimension_fields: 维度 -> 该维度依赖的学生字段列表
+            max_students: 最多缓存的学生数
+        """
+        self.dimension_fields = dimension_fields
+        self.max_students = max_students
+        self._entries = OrderedDict()  # 学生ID -> {维度: (版本, 依赖字段取值, 向量)}
+
+    def field_values(self, student, dimension):
+        """学生在某维度依赖字段上的取值"""
+        return tuple(getattr(student, field) for field in self.dimension_fields[dimension])
+
+    def get(self, student, dimension, version, compute):
+        """
+        获取学生某维度的得分向量，缺失或依赖字段已变化时调用compute()重新计算
+
+        未保存的学生（没有ID）不缓存
+        """
+        if student.pk is None:
+            return compute()
+        key = self.field_values(student, dimension)
+        vectors = self._entries.setdefault(student.pk, {})
+        self._entries.move_to_end(student.pk)
+        cached = vectors.get(dimension)
+        if cached is not None and cached[0] == version and cached[1] == key:
+            return cached[2]
+
+        vector = compute()
+        vector.flags.writeable = False  # 向量在多次请求间共享，不允许原地修改
+        vectors[dimension] = (version, key, vector)
+        while len(self._entries) > self.max_students:
+            self._entries.popitem(last=False)
+        return vector
+
+    def invalidate(self, student_id):
+        """丢弃学生的全部维度得分（学生删除后释放内存）"""
+        self._entries.pop(student_id, None)
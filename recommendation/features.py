@@ -0,0 +1,129 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+学校特征预计算
+推荐时反复用到的学校属性（层次、城市消费水平、区域、特色关键词、各省最新分数线）
+预先计算后存入SchoolFeature表，学校或分数线变更时重新计算
+"""
+
+import re
+
+from .models import School, SchoolFeature, ScoreLine
+from .geo import get_city_table
+
+# 985高校列表(示例)
+TIER1_SCHOOLS = ['清华大学', '北京大学', '复旦大学', '上海交通大学', '浙江大学', '南京大学',
+                 '中国科学技术大学', '哈尔滨工业大学', '西安交通大学', '中山大学']
+
+# 211高校但非985(示例)
+TIER2_SCHOOLS = ['北京师范大学', '北京理工大学', '重庆大学', '东北大学', '华中师范大学',
+                 '厦门大学', '四川大学', '华南理工大学', '中央民族大学']
+
+# 双一流但非211(示例)
+TIER3_SCHOOLS = ['上海财经大学', '中国传媒大学', '中央音乐学院', '北京体育大学']
+
+# 学校简介按标点切分后保留的关键词长度范围
+_KEYWORD_SPLIT = re.compile(r'[，,。；;、：:（）()\s]+')
+_KEYWORD_MIN_LEN = 2
+_KEYWORD_MAX_LEN = 8
+
+
+def get_school_tier(school_name):
+    """获取学校层次，返回1-4的整数，1为最高层次"""
+    if school_name in TIER1_SCHOOLS:
+        return 1
+    elif school_name in TIER2_SCHOOLS:
+        return 2
+    elif school_name in TIER3_SCHOOLS:
+        return 3
+    else:
+        return 4
+
+
+def get_cost_class(city):
+    """获取城市消费水平（按城市参考数据中的消费指数分档）"""
+    return get_city_table().cost_class(city)
+
+
+def extract_keywords(school):
+    """提取学校特色关键词：类型、层次标签及简介中的短语"""
+    keywords = []
+    for value in [school.type, school.level]:
+        if value:
+            keywords.append(value.strip().lower())
+    if school.is_985:
+        keywords.append('985')
+    if school.is_211:
+        keywords.append('211')
+    if school.is_double_first_class:
+        keywords.append('双一流')
+    if school.description:
+        for phrase in _KEYWORD_SPLIT.split(school.description):
+            if _KEYWORD_MIN_LEN <= len(phrase) <= _KEYWORD_MAX_LEN:
+                keywords.append(phrase.lower())
+    return list(dict.fromkeys(keywords))
+
+
+def latest_cutoffs(score_lines):
+    """取各省最新一年的学校（不分专业）分数线"""
+    cutoffs = {}
+    for line in score_lines:
+        if line.major_id is not None:
+            continue
+        current = cutoffs.get(line.province)
+        if current is None or line.year > current['year']:
+            cutoffs[line.province] = {'year': line.year, 'score': line.score, 'min_rank': line.min_rank}
+    return cutoffs
+
+
+def compute_school_feature(school, score_lines=()):
+    """计算学校特征（返回未保存的SchoolFeature）"""
+    return SchoolFeature(
+        school=school,
+        tier=get_school_tier(school.name),
+        cost_class=get_cost_class(school.city),
+        is_tier1_city=get_city_table().is_tier1(school.city),
+        region=get_city_table().region(school.province),
+        keywords=extract_keywords(school),
+        latest_cutoffs=latest_cutoffs(score_lines),
+    )
+
+
+def get_school_feature(school):
+    """获取学校特征，特征表中缺失时即时计算（不保存）"""
+    try:
+        return school.feature
+    except SchoolFeature.DoesNotExist:
+        return compute_school_feature(school, ScoreLine.objects.filter(school=school, major__isnull=True))
+
+
+def rebuild_school_features(school_ids=None):
+    """
+    重新计算学校特征并写入SchoolFeature表
+
+    参数:
+        school_ids: 需要重新计算的学校ID列表，为空时重新计算全部学校
+
+    返回:
+        写入的特征记录数
+    """
+    schools = School.objects.all()
+    lines = ScoreLine.objects.filter(major__isnull=True)
+    if school_ids is not None:
+        schools = schools.filter(id__in=school_ids)
+        lines = lines.filter(school_id__in=school_ids)
+
+    lines_by_school = {}
+    for line in lines:
+        lines_by_school.setdefault(line.school_id, []).append(line)
+
+    features = [compute_school_feature(school, lines_by_school.get(school.id, ())) for school in schools]
+
+    # 先删除旧记录再批量写入
+    stale = SchoolFeature.objects.all()
+    if school_ids is not None:
+        stale = stale.filter(school_id__in=school_ids)
+    stale.delete()
+    SchoolFeature.objects.bulk_create(features)
+    return len(features)
@@ -0,0 +1,127 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+城市参考数据
+城市所属省份、区域、坐标、是否一线城市及消费指数取自data/cities.csv，
+首次使用时加载为数组，地域偏好与经济条件匹配按数组批量计算；
+偏好城市之外的院校按到最近偏好城市的球面距离（haversine）衰减
+"""
+
+import csv
+from pathlib import Path
+
+import numpy as np
+from django.conf import settings
+
+CITY_DATA_PATH = Path(settings.BASE_DIR) / 'data' / 'cities.csv'
+
+# 消费指数分档：不低于HIGH为高消费城市，不低于MEDIUM为中等消费城市
+HIGH_COST_INDEX = 0.8
+MEDIUM_COST_INDEX = 0.6
+# 距离衰减的特征距离（公里）：相距该距离时加分衰减为1/e
+DISTANCE_DECAY_KM = 300.0
+EARTH_RADIUS_KM = 6371.0
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """两点（可广播的数组）之间的球面距离（公里）"""
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(x, dtype=float)) for x in (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+
+
+def nearest_distance_km(lat, lon, place_lat, place_lon):
+    """各点 (N,) 到一组地点 (P,) 中最近者的距离，坐标未知或没有地点时为NaN"""
+    lat = np.asarray(lat, dtype=float)
+    if len(place_lat) == 0:
+        return np.full(lat.shape, np.nan)
+    distances = haversine_km(lat[:, None], np.asarray(lon, dtype=float)[:, None],
+                             np.asarray(place_lat)[None, :], np.asarray(place_lon)[None, :])
+    return distances.min(axis=1)
+
+
+def distance_decay(distances, floor, ceiling, decay_km=DISTANCE_DECAY_KM):
+    """按距离指数衰减的得分：距离为0时为ceiling，越远越接近floor，距离未知时为floor"""
+    distances = np.asarray(distances, dtype=float)
+    decayed = floor + (ceiling - floor) * np.exp(-distances / decay_km)
+    return np.where(np.isnan(distances), floor, decayed)
+
+
+class CityTable:
+    """城市参考数据的数组视图"""
+
+    def __init__(self, rows):
+        self.names = np.array([row['city'] for row in rows], dtype=object)
+        self.provinces = np.array([row['province'] for row in rows], dtype=object)
+        self.regions = np.array([row['region'] for row in rows], dtype=object)
+        self.capital = np.array([row['capital'] == '1' for row in rows], dtype=bool)
+        self.tier1 = np.array([row['tier1'] == '1' for row in rows], dtype=bool)
+        self.lat = np.array([float(row['lat']) for row in rows])
+        self.lon = np.array([float(row['lon']) for row in rows])
+        self.cost_index = np.array([float(row['cost_index']) for row in rows])
+
+        self._index = {name: i for i, name in enumerate(self.names)}
+        # 省份 -> 省会城市（按省份指代地点时取省会坐标）、所属区域
+        self._capitals = {}
+        self._province_region = {}
+        for i, (province, region) in enumerate(zip(self.provinces, self.regions)):
+            self._province_region.setdefault(province, region)
+            if self.capital[i]:
+                self._capitals.setdefault(province, i)
+
+    @classmethod
+    def load(cls, path=CITY_DATA_PATH):
+        with open(path, encoding='utf-8', newline='') as f:
+            return cls(list(csv.DictReader(f)))
+
+    def lookup(self, names):
+        """城市名称 -> 行号数组，未收录的城市为-1"""
+        return np.array([self._index.get(name, -1) for name in names], dtype=np.int64)
+
+    def place(self, name):
+        """城市或省份名称对应的行号（省份取省会），未收录时为-1"""
+        if name in self._index:
+            return self._index[name]
+        return self._capitals.get(name, -1)
+
+    def coordinates(self, codes):
+        """行号数组 -> (纬度, 经度) 数组，行号为-1时为NaN"""
+        codes = np.asarray(codes, dtype=np.int64)
+        known = codes >= 0
+        lat = np.full(codes.shape, np.nan)
+        lon = np.full(codes.shape, np.nan)
+        lat[known] = self.lat[codes[known]]
+        lon[known] = self.lon[codes[known]]
+        return lat, lon
+
+    def cost_class(self, city):
+        """城市消费水平，未收录的城市为低消费"""
+        i = self._index.get(city)
+        if i is None:
+            return 'low'
+        if self.cost_index[i] >= HIGH_COST_INDEX:
+            return 'high'
+        elif self.cost_index[i] >= MEDIUM_COST_INDEX:
+            return 'medium'
+        return 'low'
+
+    def is_tier1(self, city):
+        """是否一线城市"""
+        i = self._index.get(city)
+        return i is not None and bool(self.tier1[i])
+
+    def region(self, province):
+        """省份所属区域"""
+        return self._province_region.get(province)
+
+
+_city_table = None
+
+
+def get_city_table():
+    """城市参考数据（进程内只加载一次）"""
+    global _city_table
+    if _city_table is None:
+        _city_table = CityTable.load()
+    return _city_table
@@ -0,0 +1,24 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+重新计算学校特征表的命令
+使用方法: python manage.py build_school_features [--school-ids 1 2 3]
+"""
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from recommendation.features import rebuild_school_features
+
+
+class Command(BaseCommand):
+    help = '重新计算学校特征（层次、消费水平、区域、关键词、最新分数线）'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--school-ids', type=int, nargs='*', help='只重新计算指定学校')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            count = rebuild_school_features(options['school_ids'] or None)
+        self.stdout.write(self.style.SUCCESS(f'已重新计算{count}所学校的特征'))
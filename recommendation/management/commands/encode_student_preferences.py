@@ -0,0 +1,25 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+重新计算学生偏好位集的命令（城市参考数据或词表变更后运行）
+使用方法: python manage.py encode_student_preferences
+"""
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from recommendation.models import Student
+from recommendation.preferences import PREFERENCE_BIT_FIELDS
+
+
+class Command(BaseCommand):
+    help = '按当前词表重新计算全部学生的偏好位集（目标城市、兴趣、职业目标）'
+
+    def handle(self, *args, **options):
+        students = list(Student.objects.all())
+        for student in students:
+            student.encode_preferences()
+        with transaction.atomic():
+            Student.objects.bulk_update(students, PREFERENCE_BIT_FIELDS, batch_size=1000)
+        self.stdout.write(self.style.SUCCESS(f'已重新计算{len(students)}名学生的偏好位集'))
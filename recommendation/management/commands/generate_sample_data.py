@@ -11,6 +11,7 @@ from datetime import date, timedelta
 from django.core.management.base import BaseCommand
 from django.utils import timezone
 from recommendation.models import School, Major, ScoreLine, Student
+from recommendation.features import rebuild_school_features
 
 class Command(BaseCommand):
     help = '生成示例学校、专业和学生数据'
@@ -30,6 +31,9 @@ class Command(BaseCommand):
         # 创建学生
         self.create_students()
         
+        # 分数线为批量写入（不触发信号），统一重新计算学校特征
+        rebuild_school_features()
+        
         self.stdout.write(self.style.SUCCESS('示例数据生成成功!'))
 
     def create_majors(self):
@@ -426,7 +430,9 @@ class Command(BaseCommand):
             )
             students.append(student)
         
-        # 批量创建
+        # 批量创建（不调用save()，先计算偏好位集）
+        for student in students:
+            student.encode_preferences()
         Student.objects.bulk_create(students)
         
         self.stdout.write(self.style.SUCCESS(f'已创建 {len(students)} 名学生'))
\ No newline at end of file
@@ -0,0 +1,31 @@
+# Generated by Django 4.2.23 on 2026-10-19 06:57
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recommendation', '0004_school_majors'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SchoolFeature',
+            fields=[
+                ('school', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='feature', serialize=False, to='recommendation.school', verbose_name='学校')),
+                ('tier', models.IntegerField(default=4, verbose_name='学校层次')),
+                ('cost_class', models.CharField(choices=[('high', '高消费城市'), ('medium', '中等消费城市'), ('low', '低消费城市')], default='low', max_length=10, verbose_name='城市消费水平')),
+                ('is_tier1_city', models.BooleanField(default=False, verbose_name='一线城市')),
+                ('region', models.CharField(blank=True, max_length=20, null=True, verbose_name='所在区域')),
+                ('keywords', models.JSONField(blank=True, default=list, verbose_name='特色关键词')),
+                ('latest_cutoffs', models.JSONField(blank=True, default=dict, verbose_name='各省最新分数线')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='更新时间')),
+            ],
+            options={
+                'verbose_name': '学校特征',
+                'verbose_name_plural': '学校特征',
+            },
+        ),
+    ]
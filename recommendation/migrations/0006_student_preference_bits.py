@@ -0,0 +1,33 @@
+# Generated by Django 4.2.23 on 2026-10-19 07:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recommendation', '0005_schoolfeature'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='student',
+            name='career_bits',
+            field=models.BigIntegerField(default=0, editable=False, verbose_name='职业目标位集'),
+        ),
+        migrations.AddField(
+            model_name='student',
+            name='interest_bits',
+            field=models.BigIntegerField(default=0, editable=False, verbose_name='兴趣位集'),
+        ),
+        migrations.AddField(
+            model_name='student',
+            name='target_city_bits',
+            field=models.BigIntegerField(default=0, editable=False, verbose_name='目标城市位集'),
+        ),
+        migrations.AddField(
+            model_name='student',
+            name='target_province_bits',
+            field=models.BigIntegerField(default=0, editable=False, verbose_name='目标省份位集'),
+        ),
+    ]
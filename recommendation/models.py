@@ -2,6 +2,8 @@ from django.db import models
 from django.utils import timezone
 from django.core.validators import MinValueValidator, MaxValueValidator
 
+from . import preferences
+
 # 学校模型
 class School(models.Model):
     name = models.CharField("学校名称", max_length=100)
@@ -24,6 +26,30 @@ class School(models.Model):
     def __str__(self):
         return self.name
 
+# 学校派生特征（由学校与分数线数据预先计算）
+class SchoolFeature(models.Model):
+    COST_CLASS_CHOICES = [
+        ('high', '高消费城市'),
+        ('medium', '中等消费城市'),
+        ('low', '低消费城市'),
+    ]
+
+    school = models.OneToOneField(School, verbose_name="学校", on_delete=models.CASCADE, primary_key=True, related_name="feature")
+    tier = models.IntegerField("学校层次", default=4)  # 1为最高层次
+    cost_class = models.CharField("城市消费水平", max_length=10, choices=COST_CLASS_CHOICES, default='low')
+    is_tier1_city = models.BooleanField("一线城市", default=False)
+    region = models.CharField("所在区域", max_length=20, blank=True, null=True)
+    keywords = models.JSONField("特色关键词", default=list, blank=True)
+    latest_cutoffs = models.JSONField("各省最新分数线", default=dict, blank=True)  # {省份: {year, score, min_rank}}
+    updated_at = models.DateTimeField("更新时间", auto_now=True)
+
+    class Meta:
+        verbose_name = "学校特征"
+        verbose_name_plural = "学校特征"
+
+    def __str__(self):
+        return f"{self.school.name}特征"
+
 # 专业模型
 class Major(models.Model):
     name = models.CharField("专业名称", max_length=100)
@@ -170,12 +196,30 @@ class Student(models.Model):
     rank = models.IntegerField("位次", blank=True, null=True)
     created_at = models.DateTimeField("创建时间", default=timezone.now)
     
+    # 偏好位集：保存时由目标城市、兴趣爱好、职业目标文本计算（见preferences.py）
+    target_city_bits = models.BigIntegerField("目标城市位集", default=0, editable=False)
+    target_province_bits = models.BigIntegerField("目标省份位集", default=0, editable=False)
+    interest_bits = models.BigIntegerField("兴趣位集", default=0, editable=False)
+    career_bits = models.BigIntegerField("职业目标位集", default=0, editable=False)
+    
     class Meta:
         verbose_name = "学生"
         verbose_name_plural = "学生"
         
     def __str__(self):
         return self.name
+    
+    def encode_preferences(self):
+        """根据偏好文本重新计算偏好位集（不保存）"""
+        for field, bits in preferences.encode_preferences(self).items():
+            setattr(self, field, bits)
+    
+    def save(self, *args, **kwargs):
+        self.encode_preferences()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:  # 只保存部分字段时一并保存偏好位集
+            kwargs['update_fields'] = set(update_fields) | set(preferences.PREFERENCE_BIT_FIELDS)
+        super().save(*args, **kwargs)
 
 # 推荐结果
 class Recommendation(models.Model):
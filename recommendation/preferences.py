@@ -0,0 +1,158 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+学生偏好的位集编码
+目标城市、兴趣爱好、职业目标等自由文本在学生保存时按固定词表编码为整数位集并存入Student，
+推荐时与学校的位集做按位与、数1的个数，不再逐次切分字符串、做包含判断
+
+城市词表为城市参考数据中的城市（外加“一线城市”），省份词表为其中的省份；
+词表顺序决定位的含义，城市参考数据增删城市后需运行 manage.py encode_student_preferences 重新编码。
+位集存放在64位整数中，城市参考数据超出位集容量的城市没有对应的位，
+与不在参考数据中的城市一样按字符串比较匹配（见unencoded_cities）
+"""
+
+import re
+from functools import lru_cache
+
+from .geo import get_city_table
+
+# 偏好文本的分隔符（兼容中英文逗号、顿号、分号、空白）
+_SPLIT = re.compile(r'[,，、;；\s]+')
+
+# 目标城市中表示“任一一线城市”的偏好
+TIER1_PREFERENCE = '一线城市'
+
+# 兴趣词表：兴趣文本或学校特色关键词中包含该词即置位
+INTEREST_VOCABULARY = [
+    '计算机', '人工智能', '软件', '数据', '电子', '通信', '机械', '自动化', '土木', '建筑',
+    '材料', '化学', '物理', '数学', '生物', '医学', '药学', '经济', '金融', '会计',
+    '管理', '法学', '政治', '社会', '教育', '心理', '文学', '新闻', '传播', '外语',
+    '历史', '哲学', '艺术', '设计', '音乐', '体育', '农业', '环境', '师范', '理工',
+]
+
+# 职业词表：目标方向、目标公司类型或职业规划中包含该词即置位
+CAREER_VOCABULARY = [
+    '学术科研', '企业就业', '公务员', '事业单位', '外企', '大厂', '创业', '国企',
+    '央企', '互联网', '银行', '券商', '高校', '研究所', '出国', 'BAT',
+]
+
+# 位集存放在有符号64位整数中，每个词表至多63个词
+MAX_BITS = 63
+# Student上的偏好位集字段
+PREFERENCE_BIT_FIELDS = ['target_city_bits', 'target_province_bits', 'interest_bits', 'career_bits']
+
+
+def split_preferences(text):
+    """切分偏好文本，去掉空项"""
+    return [token for token in _SPLIT.split(text or '') if token]
+
+
+def vocabulary_bits(text, vocabulary):
+    """文本中出现的词表词对应的位集"""
+    if not text:
+        return 0
+    bits = 0
+    for i, term in enumerate(vocabulary):
+        if term in text:
+            bits |= 1 << i
+    return bits
+
+
+def bit_positions(bits):
+    """位集中置位的位置（从低位起）"""
+    positions = []
+    while bits:
+        low = bits & -bits
+        positions.append(low.bit_length() - 1)
+        bits ^= low
+    return positions
+
+
+@lru_cache(maxsize=None)
+def city_vocabulary():
+    """
+    城市词表（城市参考数据中的城市 + 一线城市）与省份词表
+
+    返回:
+        (城市 -> 位, 省份 -> 位)
+    """
+    table = get_city_table()
+    # 超出容量的城市/省份不编码（一线城市偏好总占一位）
+    cities = list(table.names[:MAX_BITS - 1]) + [TIER1_PREFERENCE]
+    provinces = list(dict.fromkeys(table.provinces))[:MAX_BITS]
+    return ({name: i for i, name in enumerate(cities)},
+            {name: i for i, name in enumerate(provinces)})
+
+
+def tier1_bit():
+    """目标城市位集中“一线城市”偏好的位"""
+    return 1 << city_vocabulary()[0][TIER1_PREFERENCE]
+
+
+def target_city_bits(target_cities):
+    """
+    目标城市文本 -> (城市位集, 省份位集)
+
+    直接写出的省份记入省份位集；不在词表中的城市无法编码，由unencoded_cities给出
+    """
+    city_index, province_index = city_vocabulary()
+    city_bits = province_bits = 0
+    for token in split_preferences(target_cities):
+        if token in city_index:
+            city_bits |= 1 << city_index[token]
+        elif token in province_index:
+            province_bits |= 1 << province_index[token]
+    return city_bits, province_bits
+
+
+def encode_preferences(student):
+    """
+    计算学生的偏好位集
+
+    返回:
+        字段名 -> 位集：target_city_bits、target_province_bits、interest_bits、career_bits
+    """
+    city_bits, province_bits = target_city_bits(student.target_cities)
+    career_text = ' '.join(filter(None, [student.career_direction, student.target_companies, student.career_goals]))
+    return {
+        'target_city_bits': city_bits,
+        'target_province_bits': province_bits,
+        'interest_bits': vocabulary_bits(student.interests, INTEREST_VOCABULARY),
+        'career_bits': vocabulary_bits(career_text, CAREER_VOCABULARY),
+    }
+
+
+def unencoded_cities(target_cities):
+    """目标城市中没有对应位的项（超出词表容量或不在城市参考数据中），按字符串比较匹配"""
+    city_index, province_index = city_vocabulary()
+    return [token for token in split_preferences(target_cities)
+            if token not in city_index and token not in province_index]
+
+
+def preferred_places(city_bits, province_bits, extra_cities=()):
+    """
+    偏好位集 -> (偏好城市及偏好省份省会在城市参考数据中的行号, 偏好城市所在省份与偏好省份的位集)
+
+    extra_cities为没有对应位的偏好城市，收录在城市参考数据中的同样计入
+    """
+    table = get_city_table()
+    city_index, province_index = city_vocabulary()
+    provinces = list(province_index)
+    # 城市位即城市在参考数据中的行号；一线城市偏好不对应具体地点
+    places = [position for position in bit_positions(city_bits) if position != city_index[TIER1_PREFERENCE]]
+    places += [code for code in (table.place(city) for city in extra_cities) if code >= 0]
+    nearby_provinces = province_bits
+    for code in places:
+        if table.provinces[code] in province_index:
+            nearby_provinces |= 1 << province_index[table.provinces[code]]
+    for position in bit_positions(province_bits):
+        code = table.place(provinces[position])
+        if code >= 0:
+            places.append(code)
+    return places, nearby_provinces
+
+
+def career_mask(*terms):
+    """职业词表中若干词的位集"""
+    return sum(1 << CAREER_VOCABULARY.index(term) for term in terms)
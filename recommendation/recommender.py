@@ -6,7 +6,58 @@
 实现基于多种因素的院校推荐功能
 """
 
-from .models import School, Major, ScoreLine, Student, Recommendation
+import copy
+
+import numpy as np
+from django.db.models import Count, Max
+
+from .models import School, SchoolFeature, Major, ScoreLine, Student, Recommendation
+from .features import get_school_tier, get_school_feature
+from .geo import get_city_table, nearest_distance_km, distance_decay
+from .preferences import (INTEREST_VOCABULARY, bit_positions, career_mask, city_vocabulary,
+                          preferred_places, tier1_bit, unencoded_cities, vocabulary_bits)
+from .simulation import simulate_admission_probabilities, ESTIMATED_SCORE_STD, CUTOFF_SCORE_STD
+from .skyline import skyline
+from .topk import CatalogVersion, SortedListCache, threshold_top_k
+from .dimension_cache import DimensionVectorCache
+
+# 假设情形分析中可调整的学生字段
+WHAT_IF_FIELDS = ['estimated_score', 'strategy_preference', 'target_cities', 'economic_condition', 'career_direction']
+# 各维度依赖的学生偏好字段（调整该字段时需重新计算对应维度）
+FIELD_DIMENSIONS = {'career': 'career_direction', 'location': 'target_cities', 'economic': 'economic_condition'}
+# 各维度得分依赖的学生字段（字段取值相同的学生共用该维度的排序列表）
+DIMENSION_FIELDS = {
+    'profile': ['current_school', 'current_major', 'gpa_ranking', 'english_level', 'math_level'],
+    'career': ['career_direction', 'academic_preference', 'overseas_plan'],
+    'location': ['target_cities'],
+    'economic': ['economic_condition'],
+    'score': ['estimated_score'],
+}
+# 单次假设情形分析的最大情形数
+MAX_WHAT_IF_VARIANTS = 50
+# 天际线可比较的维度 -> _score_variants结果中的得分
+SKYLINE_DIMENSIONS = {
+    'match_score': 'match_score',                      # 综合匹配度
+    'admission_probability': 'admission_probability',  # 录取概率
+    'location': 'location_match',                      # 地域偏好
+    'cost': 'economic_match',                          # 经济条件（学费/生活成本）
+}
+# 热门专业及其复试线上浮分数
+HOT_MAJORS = ['计算机科学与技术', '人工智能', '软件工程', '金融学', '会计学']
+HOT_MAJOR_BONUS = 15
+# 经济条件 -> (高、中、低消费城市的经济条件匹配度)，其余取值（经济条件有限）见ECONOMIC_MATCH_DEFAULT
+ECONOMIC_MATCH = {
+    '高': (100, 100, 100),  # 可以接受任何城市
+    '中': (60, 90, 100),    # 高消费城市能接受但压力较大，低消费城市完全匹配
+}
+ECONOMIC_MATCH_DEFAULT = (30, 60, 90)
+
+# 院校目录及Top-K查询中各画像类别的排序列表（进程内共享）
+_sorted_lists = SortedListCache()
+# 院校目录版本（学校、专业、分数线的信号在提交后bump）
+catalog_version = CatalogVersion()
+# 各学生的维度得分向量（学生修改个别字段后只重新计算受影响的维度）
+dimension_vectors = DimensionVectorCache(DIMENSION_FIELDS)
 
 class SchoolRecommender:
     """院校推荐引擎"""
@@ -15,17 +66,18 @@ class SchoolRecommender:
         """初始化推荐引擎"""
         pass
     
-    def _calculate_user_profile_match(self, student, school, major=None):
+    def _calculate_user_profile_match(self, student, school, major=None, feature=None):
         """
         计算用户画像与学校/专业匹配度
         1. 用户画像：本科专业、院校、GPA、四六级、数学基础等
         """
         match_score = 50  # 基础匹配分
+        feature = feature or get_school_feature(school)
         
         # 1.1 计算学校层次匹配度
         # 根据学生当前学校层次和目标学校层次的差距来计算
         student_school_tier = self._get_school_tier(student.current_school)
-        target_school_tier = self._get_school_tier(school.name)
+        target_school_tier = feature.tier
         
         # 层次提升或相当
         tier_diff = target_school_tier - student_school_tier
@@ -39,14 +91,7 @@ class SchoolRecommender:
             tier_match = 30
         
         # 1.2 计算专业背景匹配度
-        major_match = 50
-        if major and student.current_major:
-            if self._is_same_major_category(student.current_major, major.name):
-                major_match = 90  # 跨度小，同类专业
-            elif self._is_related_major(student.current_major, major.name):
-                major_match = 70  # 相关专业
-            else:
-                major_match = 30  # 跨度大
+        major_match = self._calculate_major_background_match(student, major.name if major else None)
                 
         # 1.3 计算GPA/排名匹配度
         gpa_match = 50
@@ -79,6 +124,17 @@ class SchoolRecommender:
         profile_match = (tier_match * 0.4) + (major_match * 0.3) + (gpa_match * 0.2) + english_bonus + math_bonus
         return min(100, profile_match)
     
+    def _calculate_major_background_match(self, student, major_name):
+        """计算本科专业与目标专业的背景匹配度"""
+        if not major_name or not student.current_major:
+            return 50
+        if self._is_same_major_category(student.current_major, major_name):
+            return 90  # 跨度小，同类专业
+        elif self._is_related_major(student.current_major, major_name):
+            return 70  # 相关专业
+        else:
+            return 30  # 跨度大
+    
     def _calculate_career_match(self, student, school, major=None):
         """
         计算职业目标与学校/专业的匹配度
@@ -130,61 +186,88 @@ class SchoolRecommender:
                 
         return min(100, match_score)
         
-    def _calculate_location_match(self, student, school):
+    def _calculate_location_match(self, student, school, feature=None):
         """
         计算地理位置匹配度
         3. 城市偏好：对一线城市或特定地区（如上海、成都等）的偏好
         """
+        columns = self._geo_columns([school], [feature or get_school_feature(school)])
+        return float(self._location_match_array(student, columns)[0])
+    
+    def _location_match_array(self, student, columns):
+        """
+        批量计算地理位置匹配度
+        
+        参数:
+            columns: _geo_columns的结果
+        """
         if not student.target_cities:
-            return 50  # 没有位置偏好，默认匹配度
-            
-        # 检查学校所在城市是否在学生偏好城市列表中
-        preferred_cities = [city.strip() for city in student.target_cities.split(',')]
+            return np.full(len(columns['city_bit']), 50.0)  # 没有位置偏好，默认匹配度
         
-        if school.city in preferred_cities or school.province in preferred_cities:
-            return 100  # 完全匹配城市偏好
+        # 偏好城市/省份取保存学生时计算的位集，与学校的城市位、省份位按位与
+        city_bits = np.uint64(student.target_city_bits)
+        province_bits = np.uint64(student.target_province_bits)
+        # 没有对应位的偏好城市（超出位集容量或不在城市参考数据中）按字符串比较
+        extra_cities = unencoded_cities(student.target_cities)
+        places, nearby_provinces = preferred_places(student.target_city_bits, student.target_province_bits,
+                                                    extra_cities)
         
-        # 检查是否是一线城市偏好
-        tier1_cities = ['北京', '上海', '广州', '深圳']
-        if '一线城市' in preferred_cities and school.city in tier1_cities:
-            return 90
-            
-        # 检查是否在同一省份
-        for city in preferred_cities:
-            if city in school.province:
-                return 80  # 同省份不同城市
+        # 学校所在城市或省份在学生偏好城市列表中：完全匹配城市偏好
+        exact = ((columns['city_bit'] & city_bits) | (columns['province_bit'] & province_bits)) != 0
+        if extra_cities:
+            exact |= np.isin(columns['city'], extra_cities) | np.isin(columns['province'], extra_cities)
+        # 一线城市偏好
+        tier1 = columns['tier1'] & bool(student.target_city_bits & tier1_bit())
+        # 同省份不同城市（偏好城市所在省份或直接写出的省份）
+        same_province = (columns['province_bit'] & np.uint64(nearby_provinces)) != 0
+        
+        # 不在偏好城市列表：按到最近偏好城市（或偏好省份的省会）的距离从80衰减到40
+        place_lat, place_lon = get_city_table().coordinates(places)
+        distances = nearest_distance_km(columns['lat'], columns['lon'], place_lat, place_lon)
         
-        return 40  # 不在偏好城市列表
+        return np.select([exact, tier1, same_province], [100.0, 90.0, 80.0],
+                         distance_decay(distances, 40.0, 80.0))
     
-    def _calculate_economic_match(self, student, school):
+    def _calculate_economic_match(self, student, school, feature=None):
         """
         计算经济条件匹配度
         5. 经济条件：能否接受高学费/生活成本较高的城市
         """
+        columns = self._geo_columns([school], [feature or get_school_feature(school)])
+        return float(self._economic_match_array(student, columns)[0])
+    
+    def _economic_match_array(self, student, columns):
+        """批量计算经济条件匹配度（城市消费水平取自预计算的学校特征）"""
         if not student.economic_condition:
-            return 50  # 没有经济条件信息，默认匹配度
-            
-        # 高消费城市列表
-        high_cost_cities = ['北京', '上海', '深圳', '广州', '杭州']
-        # 中等消费城市
-        medium_cost_cities = ['南京', '武汉', '成都', '重庆', '西安', '天津', '苏州', '厦门']
-        
-        if student.economic_condition == '高':
-            return 100  # 可以接受任何城市
-        elif student.economic_condition == '中':
-            if school.city in high_cost_cities:
-                return 60  # 能接受但压力较大
-            elif school.city in medium_cost_cities:
-                return 90  # 比较合适
-            else:
-                return 100  # 低消费城市，完全匹配
-        else:  # 经济条件有限
-            if school.city in high_cost_cities:
-                return 30  # 不太适合
-            elif school.city in medium_cost_cities:
-                return 60  # 有一定压力
-            else:
-                return 90  # 较为适合
+            return np.full(len(columns['cost_class']), 50.0)  # 没有经济条件信息，默认匹配度
+        
+        high, medium, low = ECONOMIC_MATCH.get(student.economic_condition, ECONOMIC_MATCH_DEFAULT)
+        cost_class = columns['cost_class']
+        return np.select([cost_class == 'high', cost_class == 'medium'], [high, medium], low).astype(float)
+    
+    def _geo_columns(self, schools, features):
+        """学校的城市位、省份位、坐标、一线城市及消费水平数组（地域偏好、经济条件批量计算用）"""
+        table = get_city_table()
+        city_index, province_index = city_vocabulary()
+        codes = table.lookup(school.city for school in schools)
+        lat, lon = table.coordinates(codes)
+        city_codes = np.array([city_index.get(school.city, -1) for school in schools], dtype=np.int64)
+        province_codes = np.array([province_index.get(school.province, -1) for school in schools], dtype=np.int64)
+        return {
+            # 没有对应位的城市/省份（不在城市参考数据中或超出位集容量）位取0，按city/province字符串匹配
+            'city_bit': np.where(city_codes >= 0,
+                                 np.left_shift(np.uint64(1), np.maximum(city_codes, 0).astype(np.uint64)),
+                                 np.uint64(0)),
+            'province_bit': np.where(province_codes >= 0,
+                                     np.left_shift(np.uint64(1), np.maximum(province_codes, 0).astype(np.uint64)),
+                                     np.uint64(0)),
+            'city': np.array([school.city or '' for school in schools], dtype=object),
+            'province': np.array([school.province or '' for school in schools], dtype=object),
+            'lat': lat,
+            'lon': lon,
+            'tier1': np.array([feature.is_tier1_city for feature in features], dtype=bool),
+            'cost_class': np.array([feature.cost_class for feature in features], dtype=object),
+        }
                 
     def _calculate_score_match(self, student, school, major=None):
         """
@@ -242,25 +325,7 @@ class SchoolRecommender:
     
     def _get_school_tier(self, school_name):
         """获取学校层次，返回1-4的整数，1为最高层次"""
-        # 985高校列表(示例)
-        tier1_schools = ['清华大学', '北京大学', '复旦大学', '上海交通大学', '浙江大学', '南京大学', 
-                        '中国科学技术大学', '哈尔滨工业大学', '西安交通大学', '中山大学']
-        
-        # 211高校但非985(示例)
-        tier2_schools = ['北京师范大学', '北京理工大学', '重庆大学', '东北大学', '华中师范大学',
-                        '厦门大学', '四川大学', '华南理工大学', '中央民族大学']
-                        
-        # 双一流但非211(示例)
-        tier3_schools = ['上海财经大学', '中国传媒大学', '中央音乐学院', '北京体育大学']
-        
-        if school_name in tier1_schools:
-            return 1
-        elif school_name in tier2_schools:
-            return 2
-        elif school_name in tier3_schools:
-            return 3
-        else:
-            return 4
+        return get_school_tier(school_name)
             
     def _is_same_major_category(self, major1, major2):
         """判断两个专业是否属于同一大类"""
@@ -320,14 +385,286 @@ class SchoolRecommender:
             base_score = 300  # 其他院校复试线预估
             
         # 如果是热门专业，分数线上浮
-        if major:
-            hot_majors = ['计算机科学与技术', '人工智能', '软件工程', '金融学', '会计学']
-            if major.name in hot_majors:
-                base_score += 15
+        if major and major.name in HOT_MAJORS:
+            base_score += HOT_MAJOR_BONUS
                 
         return base_score
     
-    def recommend_schools(self, student_id, strategy="balanced", num_recommendations=9):
+    def _get_weights(self, student):
+        """根据学生的具体情况确定各维度权重"""
+        weights = {
+            'profile': 0.25,   # 用户画像
+            'career': 0.15,    # 职业目标
+            'location': 0.15,  # 地域偏好
+            'economic': 0.05,  # 经济条件
+            'score': 0.4       # 分数匹配
+        }
+        
+        # 如果学生特别关注某些维度，可以调整权重
+        if student.career_direction and student.career_direction in ['学术科研', '外企']:
+            weights['career'] = 0.25  # 提高职业目标维度权重
+            weights['profile'] = 0.20
+            weights['score'] = 0.35
+        
+        if student.target_cities:
+            weights['location'] = 0.20  # 提高地域偏好维度权重
+            weights['profile'] = 0.20
+            weights['score'] = 0.35
+        return weights
+    
+    def _score_match_array(self, scores, cutoffs):
+        """批量计算考研分数匹配度（同_calculate_score_match），预估分数为NaN时取默认匹配度"""
+        score_diff = scores - cutoffs
+        score_match = np.select(
+            [score_diff >= 20, score_diff >= 10, score_diff >= 0, score_diff >= -10, score_diff >= -20],
+            [90, 80, 70, 50, 30], 10).astype(float)
+        score_match[np.isnan(np.broadcast_to(scores, score_match.shape))] = 50  # 没有预估分数，默认匹配度
+        return score_match
+    
+    def _adjust_strategy_array(self, student, match_score):
+        """批量按策略偏好调整匹配度（同_calculate_strategy_match）"""
+        if student.strategy_preference == '保守':
+            boost, factor = match_score >= 80, 1.2
+        elif student.strategy_preference == '冲刺':
+            boost, factor = match_score < 60, 1.2
+        elif student.strategy_preference == '均衡':
+            boost, factor = (match_score >= 60) & (match_score < 80), 1.1
+        else:
+            return match_score
+        return np.where(boost, np.minimum(100, match_score * factor), match_score)
+    
+    def _load_catalog(self):
+        """
+        加载院校目录
+        
+        返回:
+            目录字典：schools、majors（每校最多3个专业）、features列表，cutoff复试线数组
+        """
+        # 获取所有学校（连同预计算的学校特征）
+        schools = list(School.objects.select_related('feature'))
+        catalog = {'schools': schools, 'majors': [], 'features': []}
+        cutoffs = []
+        
+        for school in schools:
+            # 获取该校热门专业，最多考虑3个专业
+            majors = list(Major.objects.filter(schools=school)[:3])
+            catalog['majors'].append(majors)
+            catalog['features'].append(get_school_feature(school))
+            # 6. 考试分数维度所需的复试线
+            cutoffs.append(self._get_major_cutoff_score(school, majors[0] if majors else None))
+        
+        catalog['cutoff'] = np.array(cutoffs, dtype=float)
+        catalog['geo'] = self._geo_columns(schools, catalog['features'])
+        return catalog
+    
+    def _build_candidates(self, student):
+        """
+        取各维度得分（每所学校只计算一次，按学生缓存，依赖字段未变的维度直接复用）
+        
+        返回:
+            候选字典：schools、majors、features列表，
+            以及profile、career、location、economic、score（分数匹配度）、cutoff数组（与schools一一对应）
+        """
+        catalog = self._catalog()
+        candidates = dict(catalog)
+        # 维度得分与所用目录的版本一起缓存（目录可能在本次请求期间被其他线程重新加载）
+        version = catalog['version']
+        # 1. 用户画像维度（本科专业、院校、GPA等）
+        # 2. 职业目标维度（学术、就业导向等）
+        # 3. 地域偏好维度
+        # 5. 经济条件维度
+        for name in ['profile', 'career', 'location', 'economic']:
+            candidates[name] = dimension_vectors.get(
+                student, name, version, lambda: self._dimension_array(student, catalog, name))
+        # 6. 考试分数维度
+        candidates['score'] = dimension_vectors.get(
+            student, 'score', version, lambda: self._score_match_array(
+                np.float64(student.estimated_score) if student.estimated_score else np.nan, catalog['cutoff']))
+        return candidates
+    
+    def _dimension_array(self, student, candidates, dimension):
+        """按（可能调整过偏好的）学生计算某一维度"""
+        if dimension == 'location':
+            return self._location_match_array(student, candidates['geo'])
+        if dimension == 'economic':
+            return self._economic_match_array(student, candidates['geo'])
+        values = []
+        for school, majors, feature in zip(candidates['schools'], candidates['majors'], candidates['features']):
+            if dimension == 'profile':
+                values.append(self._calculate_user_profile_match(student, school, majors[0] if majors else None, feature))
+            else:
+                values.append(self._calculate_career_match(student, school, majors[0] if majors else None))
+        return np.array(values, dtype=float)
+    
+    def _score_variants(self, base_student, candidates, variants, seed=None):
+        """
+        对多个假设情形批量打分，复用已计算的非分数维度
+        
+        参数:
+            base_student: 基准学生
+            candidates: _build_candidates的结果
+            variants: 假设情形列表，每项为覆盖学生字段的字典（字段见WHAT_IF_FIELDS）
+            seed: 录取概率模拟的随机种子
+            
+        返回:
+            每个情形一个字典：student（未保存的学生副本）、各维度得分、
+            score_match、match_score、admission_probability数组
+        """
+        students = []
+        for variant in variants:
+            student = copy.copy(base_student)
+            for field, value in variant.items():
+                setattr(student, field, value)
+            if variant:
+                student.encode_preferences()
+            students.append(student)
+        
+        # 偏好调整只影响对应维度，且同一取值只重新计算一次
+        dimension_cache = {}
+        
+        def dimension(student, name):
+            if name == 'profile':
+                return candidates['profile']
+            field = FIELD_DIMENSIONS[name]
+            value = getattr(student, field)
+            if value == getattr(base_student, field):
+                return candidates[name]
+            if (name, value) not in dimension_cache:
+                dimension_cache[(name, value)] = self._dimension_array(student, candidates, name)
+            return dimension_cache[(name, value)]
+        
+        dimensions = {
+            name: np.stack([dimension(student, name) for student in students])
+            for name in ['profile', 'career', 'location', 'economic']
+        }
+        
+        # 6. 考试分数维度：预估分数未调整的情形复用已计算的分数匹配度，其余一次计算 (V, N)
+        scores = np.array([s.estimated_score if s.estimated_score else np.nan for s in students], dtype=float)
+        score_match = self._score_match_array(scores[:, None], candidates['cutoff'][None, :])
+        for v, student in enumerate(students):
+            if student.estimated_score == base_student.estimated_score:
+                score_match[v] = candidates['score']
+        
+        # 综合计算最终匹配度（不同维度的加权平均）
+        weights = [self._get_weights(student) for student in students]
+        match_score = (
+            dimensions['profile'] * np.array([w['profile'] for w in weights])[:, None] +
+            dimensions['career'] * np.array([w['career'] for w in weights])[:, None] +
+            dimensions['location'] * np.array([w['location'] for w in weights])[:, None] +
+            dimensions['economic'] * np.array([w['economic'] for w in weights])[:, None] +
+            score_match * np.array([w['score'] for w in weights])[:, None]
+        )
+        
+        # 7. 根据学生的策略偏好调整最终匹配度
+        for v, student in enumerate(students):
+            match_score[v] = self._adjust_strategy_array(student, match_score[v])
+        
+        # 录取概率：有预估分数时对预估分数与各校复试线的不确定性做蒙特卡洛模拟，否则取分数匹配度
+        admission_probability = score_match.copy()
+        has_score = ~np.isnan(scores)
+        if has_score.any() and len(candidates['schools']):
+            admission_probability[has_score] = simulate_admission_probabilities(
+                scores[has_score], ESTIMATED_SCORE_STD, candidates['cutoff'], CUTOFF_SCORE_STD, seed=seed) * 100
+        
+        return [
+            {
+                'student': student,
+                'profile_match': dimensions['profile'][v],
+                'career_match': dimensions['career'][v],
+                'location_match': dimensions['location'][v],
+                'economic_match': dimensions['economic'][v],
+                'score_match': score_match[v],
+                'match_score': match_score[v],
+                'admission_probability': admission_probability[v],
+            }
+            for v, student in enumerate(students)
+        ]
+    
+    def _categorize(self, score_match, strategy):
+        """按分数匹配度划分冲刺/匹配/保底院校"""
+        # 确定院校类别（冲刺、匹配、保底），设置更低的分数门槛，确保有不同类别
+        # 策略偏好会影响院校分类
+        if strategy == "aggressive":
+            safety_line, match_line = 50, 30  # 降低保底、匹配院校标准
+        elif strategy == "conservative":
+            safety_line, match_line = 70, 50  # 提高冲刺、匹配院校标准
+        else:
+            safety_line, match_line = 60, 40
+        return np.where(score_match >= safety_line, 'safety',
+                        np.where(score_match >= match_line, 'match', 'challenge'))
+    
+    def _select_recommendations(self, scored, strategy, num_recommendations):
+        """
+        按匹配度排序并划分冲刺/匹配/保底院校
+        
+        返回:
+            [(学校下标, 类别)] 列表
+        """
+        categories = self._categorize(scored['score_match'], strategy)
+        
+        # 根据匹配度排序
+        order = np.argsort(-scored['match_score'], kind='stable').tolist()
+        
+        # 强制根据分数分配不同类别，确保至少有一个底、匹配和冲刺院校
+        total = len(order)
+        if total >= 3:  # 至少需要3个学校才能分类
+            # 将学校按匹配度分为三部分：前1/3为保底院校，中间1/3为匹配院校，后1/3为冲刺院校
+            third = total // 3
+            for rank, i in enumerate(order):
+                categories[i] = 'safety' if rank < third else 'match' if rank < 2 * third else 'challenge'
+        
+        # 根据策略筛选学校
+        safety = [i for i in order if categories[i] == 'safety']
+        match = [i for i in order if categories[i] == 'match']
+        challenge = [i for i in order if categories[i] == 'challenge']
+        
+        # 默认比例：3保底+3匹配+3冲刺
+        safety_count = 3
+        match_count = 3
+        challenge_count = 3
+        
+        # 根据策略调整各类别数量
+        if strategy == "aggressive":
+            safety_count = 2
+            match_count = 2
+            challenge_count = 5
+        elif strategy == "conservative":
+            safety_count = 5
+            match_count = 2
+            challenge_count = 2
+            
+        # 取各类别的前N个学校
+        final_safety = safety[:safety_count]
+        final_match = match[:match_count]
+        final_challenge = challenge[:challenge_count]
+        
+        # 如果某类别不足，从其他类别补充
+        remaining = num_recommendations - len(final_safety) - len(final_match) - len(final_challenge)
+        if remaining > 0:
+            # 优先从match类别补充
+            if len(match) > match_count:
+                additional = match[match_count:match_count + remaining]
+                final_match.extend(additional)
+                remaining -= len(additional)
+            
+            # 其次从safety类别补充
+            if remaining > 0 and len(safety) > safety_count:
+                additional = safety[safety_count:safety_count + remaining]
+                final_safety.extend(additional)
+                remaining -= len(additional)
+            
+            # 最后从challenge类别补充
+            if remaining > 0 and len(challenge) > challenge_count:
+                additional = challenge[challenge_count:challenge_count + remaining]
+                final_challenge.extend(additional)
+        
+        # 合并结果并限制总数量
+        selected = ([(i, 'safety') for i in final_safety] +
+                    [(i, 'match') for i in final_match] +
+                    [(i, 'challenge') for i in final_challenge])
+        return selected[:num_recommendations]
+    
+    def recommend_schools(self, student_id, strategy="balanced", num_recommendations=9, seed=None):
         """
         根据学生情况推荐考研院校
         
@@ -338,6 +675,7 @@ class SchoolRecommender:
                 - "conservative": 偏向保底
                 - "balanced": 平衡策略（默认）
             num_recommendations: 推荐学校数量
+            seed: 录取概率模拟的随机种子，指定后结果可复现
             
         返回:
             包含推荐结果的字典
@@ -346,176 +684,36 @@ class SchoolRecommender:
             # 获取学生信息
             student = Student.objects.get(id=student_id)
             
-            # 获取所有学校
-            schools = School.objects.all()
+            candidates = self._build_candidates(student)
+            scored = self._score_variants(student, candidates, [{}], seed)[0]
             
-            results = []
-            for school in schools:
-                # 获取该校热门专业
-                majors_queryset = Major.objects.filter(schools=school)
-                majors = list(majors_queryset[:3])  # 最多考虑3个专业，转换为列表防止后续查询问题
-                
-                # 每个学校计算多个维度的匹配度
-                # 1. 用户画像维度（本科专业、院校、GPA等）
-                profile_match = self._calculate_user_profile_match(student, school, majors[0] if majors else None)
-                
-                # 2. 职业目标维度（学术、就业导向等）
-                career_match = self._calculate_career_match(student, school, majors[0] if majors else None)
-                
-                # 3. 地域偏好维度
-                location_match = self._calculate_location_match(student, school)
-                
-                # 5. 经济条件维度
-                economic_match = self._calculate_economic_match(student, school)
-                
-                # 6. 考试分数维度
-                score_match = self._calculate_score_match(student, school, majors[0] if majors else None)
-                
-                # 综合计算最终匹配度（不同维度的加权平均）
-                # 根据学生的具体情况调整各维度权重
-                weights = {
-                    'profile': 0.25,   # 用户画像
-                    'career': 0.15,    # 职业目标
-                    'location': 0.15,  # 地域偏好
-                    'economic': 0.05,  # 经济条件
-                    'score': 0.4       # 分数匹配
+            final_results = []
+            for i, category in self._select_recommendations(scored, strategy, num_recommendations):
+                school = candidates['schools'][i]
+                dimension_scores = {  # 保存各维度得分，用于前端展示
+                    name: round(float(scored[name][i]), 2)
+                    for name in ['profile_match', 'career_match', 'location_match', 'economic_match', 'score_match']
                 }
-                
-                # 如果学生特别关注某些维度，可以调整权重
-                if student.career_direction and student.career_direction in ['学术科研', '外企']:
-                    weights['career'] = 0.25  # 提高职业目标维度权重
-                    weights['profile'] = 0.20
-                    weights['score'] = 0.35
-                
-                if student.target_cities:
-                    weights['location'] = 0.20  # 提高地域偏好维度权重
-                    weights['profile'] = 0.20
-                    weights['score'] = 0.35
-                
-                # 计算综合匹配分数
-                match_score = (
-                    profile_match * weights['profile'] +
-                    career_match * weights['career'] +
-                    location_match * weights['location'] +
-                    economic_match * weights['economic'] +
-                    score_match * weights['score']
-                )
-                
-                # 7. 根据学生的策略偏好调整最终匹配度
-                match_score = self._calculate_strategy_match(student, school, match_score)
-                
-                # 确定院校类别（冲刺、匹配、保底）
-                # 设置更低的分数门槛，确保有不同类别
-                if score_match >= 60:
-                    category = "safety"  # 保底院校
-                elif score_match >= 40:
-                    category = "match"   # 匹配院校
-                else:
-                    category = "challenge"  # 冲刺院校
-                    
-                # 策略偏好会影响院校分类
-                if strategy == "aggressive":
-                    if score_match >= 50:  # 降低保底院校标准
-                        category = "safety"
-                    elif score_match >= 30:  # 降低匹配院校标准
-                        category = "match"
-                elif strategy == "conservative":
-                    if score_match < 50:  # 提高冲刺院校标准
-                        category = "challenge"
-                    elif score_match < 70:  # 提高匹配院校标准
-                        category = "match"
-                
-                # 录取概率计算（主要基于分数匹配度）
-                admission_probability = score_match  # 简单起见，可以将分数匹配度直接作为录取概率的指标
+                match_score = float(scored['match_score'][i])
                 
                 # 生成推荐理由
-                reason = self._generate_recommendation_reason(student, school, match_score, 
-                                                           profile_match, career_match, 
-                                                           location_match, score_match)
+                reason = self._generate_recommendation_reason(student, school, match_score,
+                                                           dimension_scores['profile_match'],
+                                                           dimension_scores['career_match'],
+                                                           dimension_scores['location_match'],
+                                                           dimension_scores['score_match'])
                 
-                results.append({
+                final_results.append({
                     'school': school,
                     'match_score': round(match_score, 2),
-                    'admission_probability': round(admission_probability, 2),
+                    'admission_probability': round(float(scored['admission_probability'][i]), 2),
                     'category': category,
                     'reason': reason,
-                    'recommended_majors': list(majors),
-                    'dimension_scores': {  # 保存各维度得分，用于前端展示
-                        'profile_match': round(profile_match, 2),
-                        'career_match': round(career_match, 2),
-                        'location_match': round(location_match, 2),
-                        'economic_match': round(economic_match, 2),
-                        'score_match': round(score_match, 2)
-                    }
+                    'recommended_majors': candidates['majors'][i],
+                    'cutoff_score': float(candidates['cutoff'][i]),
+                    'dimension_scores': dimension_scores,
                 })
             
-            # 根据匹配度排序
-            results = sorted(results, key=lambda x: x['match_score'], reverse=True)
-            
-            # 强制根据分数分配不同类别，确保至少有一个底、匹配和冲刺院校
-            total = len(results)
-            if total >= 3:  # 至少需要3个学校才能分类
-                # 将学校按匹配度分为三部分
-                third = total // 3
-                for i, result in enumerate(results):
-                    if i < third:  # 前1/3为保底院校
-                        result['category'] = 'safety'
-                    elif i < 2 * third:  # 中间1/3为匹配院校
-                        result['category'] = 'match'
-                    else:  # 后1/3为冲刺院校
-                        result['category'] = 'challenge'
-            
-            # 根据策略筛选学校
-            safety = [r for r in results if r['category'] == 'safety']
-            match = [r for r in results if r['category'] == 'match']
-            challenge = [r for r in results if r['category'] == 'challenge']
-            
-            # 默认比例：3保底+3匹配+3冲刺
-            safety_count = 3
-            match_count = 3
-            challenge_count = 3
-            
-            # 根据策略调整各类别数量
-            if strategy == "aggressive":
-                safety_count = 2
-                match_count = 2
-                challenge_count = 5
-            elif strategy == "conservative":
-                safety_count = 5
-                match_count = 2
-                challenge_count = 2
-                
-            # 取各类别的前N个学校
-            final_safety = safety[:safety_count]
-            final_match = match[:match_count]
-            final_challenge = challenge[:challenge_count]
-            
-            # 如果某类别不足，从其他类别补充
-            remaining = num_recommendations - len(final_safety) - len(final_match) - len(final_challenge)
-            if remaining > 0:
-                # 优先从match类别补充
-                if len(match) > match_count:
-                    additional = match[match_count:match_count + remaining]
-                    final_match.extend(additional)
-                    remaining -= len(additional)
-                
-                # 其次从safety类别补充
-                if remaining > 0 and len(safety) > safety_count:
-                    additional = safety[safety_count:safety_count + remaining]
-                    final_safety.extend(additional)
-                    remaining -= len(additional)
-                
-                # 最后从challenge类别补充
-                if remaining > 0 and len(challenge) > challenge_count:
-                    additional = challenge[challenge_count:challenge_count + remaining]
-                    final_challenge.extend(additional)
-            
-            # 合并结果
-            final_results = final_safety + final_match + final_challenge
-            
-            # 限制总数量
-            final_results = final_results[:num_recommendations]
-            
             # 删除该学生的旧推荐记录，确保不会影响分类显示
             Recommendation.objects.filter(student=student).delete()
             
@@ -557,7 +755,328 @@ class SchoolRecommender:
                 'status': 'error',
                 'message': f'推荐过程中发生错误: {str(e)}'
             }
+    
+    def what_if(self, student_id, variants, strategy="balanced", num_recommendations=9, seed=None):
+        """
+        假设情形分析：比较不同预估分数或偏好下的推荐结果，不保存任何记录
+        
+        参数:
+            student_id: 基准学生ID
+            variants: 假设情形列表，每项为覆盖学生字段的字典（字段见WHAT_IF_FIELDS）
+            strategy: 推荐策略
+            num_recommendations: 每个情形的推荐学校数量
+            seed: 录取概率模拟的随机种子
+            
+        返回:
+            包含各情形推荐结果的字典
+        """
+        try:
+            student = Student.objects.get(id=student_id)
+        except Student.DoesNotExist:
+            return {
+                'status': 'error',
+                'message': f'学生ID {student_id} 不存在'
+            }
+        
+        candidates = self._build_candidates(student)
+        results = []
+        for variant, scored in zip(variants, self._score_variants(student, candidates, variants, seed)):
+            recommendations = {'safety': [], 'match': [], 'challenge': []}
+            for i, category in self._select_recommendations(scored, strategy, num_recommendations):
+                school = candidates['schools'][i]
+                majors = candidates['majors'][i]
+                recommendations[category].append({
+                    'school_id': school.id,
+                    'name': school.name,
+                    'major': majors[0].name if majors else None,
+                    'match_score': round(float(scored['match_score'][i]), 2),
+                    'score_match': round(float(scored['score_match'][i]), 2),
+                    'admission_probability': round(float(scored['admission_probability'][i]), 2),
+                })
+            results.append({
+                'params': variant,
+                'estimated_score': scored['student'].estimated_score,
+                'recommendations': recommendations,
+            })
+        
+        return {
+            'status': 'success',
+            'student_id': student.id,
+            'estimated_score': student.estimated_score,
+            'variants': results,
+        }
             
+    def skyline(self, student_id, dimensions=None, seed=None):
+        """
+        多目标择校：返回在所选维度上不被其他院校支配的院校（Pareto天际线），不保存推荐记录
+        
+        参数:
+            student_id: 学生ID
+            dimensions: 参与比较的维度（见SKYLINE_DIMENSIONS），默认全部
+            seed: 录取概率模拟的随机种子
+            
+        返回:
+            包含天际线院校的字典（按综合匹配度降序）
+        """
+        try:
+            student = Student.objects.get(id=student_id)
+        except Student.DoesNotExist:
+            return {
+                'status': 'error',
+                'message': f'学生ID {student_id} 不存在'
+            }
+        
+        dimensions = list(dimensions or SKYLINE_DIMENSIONS)
+        candidates = self._build_candidates(student)
+        scored = self._score_variants(student, candidates, [{}], seed)[0]
+        
+        # 各维度得分已按院校计算，直接组成 (N, D) 矩阵
+        values = np.stack([scored[SKYLINE_DIMENSIONS[name]] for name in dimensions], axis=1)
+        front = skyline(values)
+        front = front[np.argsort(-scored['match_score'][front], kind='stable')]
+        
+        schools = []
+        for i in front.tolist():
+            school = candidates['schools'][i]
+            majors = candidates['majors'][i]
+            schools.append({
+                'school_id': school.id,
+                'name': school.name,
+                'province': school.province,
+                'city': school.city,
+                'major': majors[0].name if majors else None,
+                'cutoff_score': float(candidates['cutoff'][i]),
+                'scores': {name: round(float(scored[SKYLINE_DIMENSIONS[name]][i]), 2) for name in SKYLINE_DIMENSIONS},
+            })
+        
+        return {
+            'status': 'success',
+            'student_id': student.id,
+            'dimensions': dimensions,
+            'school_count': len(candidates['schools']),
+            'schools': schools,
+        }
+    
+    def _query_catalog_version(self):
+        """数据库中院校目录的版本：学校、学校特征、专业及开设关系任一变化时不同"""
+        return (
+            tuple(School.objects.aggregate(n=Count('id'), last=Max('id')).values()),
+            tuple(SchoolFeature.objects.aggregate(n=Count('pk'), updated=Max('updated_at')).values()),
+            tuple(Major.objects.aggregate(n=Count('id'), last=Max('id')).values()),
+            School.majors.through.objects.count(),
+        )
+    
+    def _catalog(self):
+        """共享的院校目录（目录版本变化时重新加载，version为加载时的目录版本）"""
+        version = catalog_version.get(self._query_catalog_version)
+        if version != _sorted_lists.version:
+            catalog = self._load_catalog()
+            catalog['version'] = version
+            _sorted_lists.reset(version, catalog)
+        return _sorted_lists.catalog
+    
+    def _sorted_list(self, student, dimension):
+        """学生所属画像类别在某一维度上的排序列表（按依赖字段的取值缓存）"""
+        catalog = _sorted_lists.catalog
+        key = tuple(getattr(student, field) for field in DIMENSION_FIELDS[dimension])
+        if dimension == 'score':
+            scores = np.float64(student.estimated_score) if student.estimated_score else np.nan
+            return _sorted_lists.get(dimension, key, lambda: self._score_match_array(scores, catalog['cutoff']))
+        return _sorted_lists.get(dimension, key, lambda: self._dimension_array(student, catalog, dimension))
+    
+    def top_k_schools(self, student_id, k=10, strategy="balanced", seed=None):
+        """
+        综合匹配度最高的K所院校（阈值算法提前终止，只对少量院校评分），不保存推荐记录
+        
+        各维度按学生所属画像类别取缓存的排序列表，轮流读取各列表靠前的院校并计算综合匹配度，
+        第K高的匹配度不低于未读取院校匹配度的上界时停止
+        
+        只适用于“取综合匹配度最高的K所”：recommend_schools按录取概率将全部院校分为
+        冲刺/稳妥/保底三类后各取若干所，类别划分依赖全部院校的得分，仍对全部院校评分
+        
+        参数:
+            student_id: 学生ID
+            k: 返回的院校数
+            strategy: 推荐策略，只影响院校类别的划分
+            seed: 录取概率模拟的随机种子
+            
+        返回:
+            包含前K所院校（按综合匹配度降序）及评分院校数的字典
+        """
+        try:
+            student = Student.objects.get(id=student_id)
+        except Student.DoesNotExist:
+            return {
+                'status': 'error',
+                'message': f'学生ID {student_id} 不存在'
+            }
+        
+        catalog = self._catalog()
+        
+        weights = self._get_weights(student)
+        names = ['profile', 'career', 'location', 'economic', 'score']
+        weight_vector = np.array([weights[name] for name in names])
+        lists = [self._sorted_list(student, name) for name in names]
+        
+        # 策略调整只会提高匹配度（至多提高到原来的factor倍），作为未读取院校的上界
+        factor = {'保守': 1.2, '冲刺': 1.2, '均衡': 1.1}.get(student.strategy_preference, 1.0)
+        result = threshold_top_k(
+            lists,
+            lambda values: self._adjust_strategy_array(student, values @ weight_vector),
+            k,
+            upper_bound=lambda values: np.minimum(100, values @ weight_vector * factor),
+        )
+        top = result['indices']
+        
+        dimension_values = {name: values[top] for name, (_, values) in zip(names, lists)}
+        categories = self._categorize(dimension_values['score'], strategy)
+        admission_probability = dimension_values['score'].copy()
+        if student.estimated_score and len(top):
+            admission_probability = simulate_admission_probabilities(
+                student.estimated_score, ESTIMATED_SCORE_STD, catalog['cutoff'][top], CUTOFF_SCORE_STD, seed=seed) * 100
+        
+        schools = []
+        for rank, i in enumerate(top.tolist()):
+            school = catalog['schools'][i]
+            majors = catalog['majors'][i]
+            schools.append({
+                'school_id': school.id,
+                'name': school.name,
+                'province': school.province,
+                'city': school.city,
+                'major': majors[0].name if majors else None,
+                'category': str(categories[rank]),
+                'match_score': round(float(result['scores'][rank]), 2),
+                'admission_probability': round(float(admission_probability[rank]), 2),
+                'cutoff_score': float(catalog['cutoff'][i]),
+                'dimension_scores': {
+                    f'{name}_match': round(float(dimension_values[name][rank]), 2) for name in names
+                },
+            })
+        
+        return {
+            'status': 'success',
+            'student_id': student.id,
+            'school_count': len(catalog['schools']),
+            'scored_count': result['scored'],
+            'schools': schools,
+        }
+    
+    def _build_pairs(self, student):
+        """
+        构建学校×专业组合（只包含学校实际开设的专业，稀疏存储）
+        
+        与专业无关的维度按学校计算一次，与学校无关的专业背景匹配度按专业计算一次，
+        再按组合的(学校下标, 专业下标)展开为组合数组
+        
+        返回:
+            组合字典：schools、majors列表，school_index、major_index数组（每个组合一项），
+            以及各维度得分和复试线数组（与组合一一对应）
+        """
+        schools = list(School.objects.select_related('feature'))
+        school_positions = {school.id: i for i, school in enumerate(schools)}
+        
+        # 学校-专业多对多关系即稀疏组合矩阵的非零位置
+        links = list(School.majors.through.objects.values_list('school_id', 'major_id'))
+        majors = list(Major.objects.filter(id__in={major_id for _, major_id in links}))
+        major_positions = {major.id: i for i, major in enumerate(majors)}
+        school_index = np.array([school_positions[s] for s, _ in links], dtype=np.int64)
+        major_index = np.array([major_positions[m] for _, m in links], dtype=np.int64)
+        
+        # 按学校计算（不含专业背景的用户画像、职业目标、地域偏好、经济条件及基础复试线）
+        features = [get_school_feature(school) for school in schools]
+        by_school = {name: [] for name in ['profile', 'career', 'cutoff']}
+        for school, feature in zip(schools, features):
+            by_school['profile'].append(self._calculate_user_profile_match(student, school, None, feature))
+            by_school['career'].append(self._calculate_career_match(student, school))
+            by_school['cutoff'].append(self._get_major_cutoff_score(school))
+        by_school = {name: np.array(values, dtype=float) for name, values in by_school.items()}
+        geo = self._geo_columns(schools, features)
+        by_school['location'] = self._location_match_array(student, geo)
+        by_school['economic'] = self._economic_match_array(student, geo)
+        
+        # 按专业计算（专业背景匹配度、热门专业分数线上浮）
+        background = np.array([self._calculate_major_background_match(student, m.name) for m in majors], dtype=float)
+        hot = np.array([m.name in HOT_MAJORS for m in majors], dtype=bool)
+        
+        # 展开为组合：专业背景在用户画像中占0.3权重，不含专业时按50计
+        profile = by_school['profile'][school_index] + 0.3 * (background[major_index] - 50)
+        return {
+            'schools': schools,
+            'majors': majors,
+            'school_index': school_index,
+            'major_index': major_index,
+            'profile': np.minimum(100, profile),
+            'career': by_school['career'][school_index],
+            'location': by_school['location'][school_index],
+            'economic': by_school['economic'][school_index],
+            'cutoff': by_school['cutoff'][school_index] + HOT_MAJOR_BONUS * hot[major_index],
+        }
+    
+    def recommend_pairs(self, student_id, strategy="balanced", num_recommendations=9, seed=None):
+        """
+        学校×专业组合推荐：对学校开设的全部专业逐一打分，不保存推荐记录
+        
+        参数与recommend_schools相同
+            
+        返回:
+            包含各类别推荐组合的字典
+        """
+        try:
+            student = Student.objects.get(id=student_id)
+        except Student.DoesNotExist:
+            return {
+                'status': 'error',
+                'message': f'学生ID {student_id} 不存在'
+            }
+        
+        pairs = self._build_pairs(student)
+        weights = self._get_weights(student)
+        score = student.estimated_score if student.estimated_score else np.nan
+        score_match = self._score_match_array(np.array(score, dtype=float), pairs['cutoff'])
+        match_score = (
+            pairs['profile'] * weights['profile'] +
+            pairs['career'] * weights['career'] +
+            pairs['location'] * weights['location'] +
+            pairs['economic'] * weights['economic'] +
+            score_match * weights['score']
+        )
+        match_score = self._adjust_strategy_array(student, match_score)
+        
+        admission_probability = score_match
+        if student.estimated_score and len(pairs['cutoff']):
+            admission_probability = simulate_admission_probabilities(
+                student.estimated_score, ESTIMATED_SCORE_STD, pairs['cutoff'], CUTOFF_SCORE_STD, seed=seed) * 100
+        
+        scored = {'score_match': score_match, 'match_score': match_score}
+        recommendations = {'safety': [], 'match': [], 'challenge': []}
+        for i, category in self._select_recommendations(scored, strategy, num_recommendations):
+            school = pairs['schools'][pairs['school_index'][i]]
+            major = pairs['majors'][pairs['major_index'][i]]
+            recommendations[category].append({
+                'school_id': school.id,
+                'school': school.name,
+                'major_id': major.id,
+                'major': major.name,
+                'match_score': round(float(match_score[i]), 2),
+                'admission_probability': round(float(admission_probability[i]), 2),
+                'cutoff_score': float(pairs['cutoff'][i]),
+                'dimension_scores': {
+                    'profile_match': round(float(pairs['profile'][i]), 2),
+                    'career_match': round(float(pairs['career'][i]), 2),
+                    'location_match': round(float(pairs['location'][i]), 2),
+                    'economic_match': round(float(pairs['economic'][i]), 2),
+                    'score_match': round(float(score_match[i]), 2),
+                },
+            })
+        
+        return {
+            'status': 'success',
+            'student_id': student.id,
+            'pair_count': len(pairs['cutoff']),
+            'recommendations': recommendations,
+        }
+    
     def _generate_recommendation_reason(self, student, school, match_score, 
                                        profile_match, career_match, 
                                        location_match, score_match):
@@ -598,15 +1117,23 @@ class SchoolRecommender:
         elif school.is_double_first_class:
             reasons.append("双一流高校，优势学科实力突出")
         
-        # 根据就业目标补充
-        if student.career_direction:
-            if student.career_direction == '学术科研' and (school.is_985 or school.is_211):
+        # 兴趣与学校特色关键词的交集
+        common_interests = student.interest_bits & vocabulary_bits(' '.join(get_school_feature(school).keywords),
+                                                                  INTEREST_VOCABULARY)
+        if common_interests:
+            terms = '、'.join(INTEREST_VOCABULARY[i] for i in bit_positions(common_interests))
+            reasons.append(f"学校特色与您的兴趣（{terms}）契合")
+        
+        # 根据就业目标补充（目标方向、目标公司类型、职业规划的位集）
+        career_bits = student.career_bits
+        if career_bits:
+            if career_bits & career_mask('学术科研') and (school.is_985 or school.is_211):
                 reasons.append("适合您的学术研究发展方向")
-            elif student.career_direction in ['公务员', '事业单位'] and hasattr(school, 'type') and school.type and ('师范' in school.type or '政法' in school.type):
+            elif career_bits & career_mask('公务员', '事业单位') and hasattr(school, 'type') and school.type and ('师范' in school.type or '政法' in school.type):
                 reasons.append("该校毕业生在公职考试中表现出色")
-            elif student.career_direction == '外企' and hasattr(school, 'city') and school.city and school.city in ['北京', '上海', '深圳', '广州']:
+            elif career_bits & career_mask('外企') and hasattr(school, 'city') and school.city and school.city in ['北京', '上海', '深圳', '广州']:
                 reasons.append("所在城市外企资源丰富，对接国际就业市场")
-            elif student.career_direction in ['企业就业', '大厂'] and hasattr(school, 'city') and school.city and school.city in ['北京', '上海', '深圳', '杭州']:
+            elif career_bits & career_mask('企业就业', '大厂', '互联网', 'BAT') and hasattr(school, 'city') and school.city and school.city in ['北京', '上海', '深圳', '杭州']:
                 reasons.append("地处就业机会丰富的城市，大型企业集中")
         
         return "；".join(reasons) + "。"
\ No newline at end of file
@@ -0,0 +1,53 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+信号处理：学校或分数线变更时重新计算学校特征；学生删除时清除其维度得分缓存；
+学校、专业、开设关系或分数线变更并提交后更新院校目录版本
+"""
+
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_save, post_delete
+from django.dispatch import receiver
+
+from .models import Major, School, ScoreLine, Student
+from .features import rebuild_school_features
+from .recommender import catalog_version, dimension_vectors
+
+
+@receiver(post_save, sender=School)
+def update_school_feature(sender, instance, raw=False, **kwargs):
+    """学校保存后重新计算其特征"""
+    if raw:  # 导入fixture时跳过
+        return
+    rebuild_school_features([instance.id])
+
+
+@receiver(post_save, sender=ScoreLine)
+@receiver(post_delete, sender=ScoreLine)
+def update_school_cutoffs(sender, instance, raw=False, **kwargs):
+    """分数线变更后重新计算对应学校的最新分数线"""
+    if raw:
+        return
+    if School.objects.filter(id=instance.school_id).exists():
+        rebuild_school_features([instance.school_id])
+
+
+@receiver(post_delete, sender=Student)
+def drop_student_dimensions(sender, instance, **kwargs):
+    """学生删除后清除其维度得分缓存"""
+    dimension_vectors.invalidate(instance.pk)
+
+
+@receiver(post_save, sender=School)
+@receiver(post_delete, sender=School)
+@receiver(post_save, sender=Major)
+@receiver(post_delete, sender=Major)
+@receiver(post_save, sender=ScoreLine)
+@receiver(post_delete, sender=ScoreLine)
+@receiver(m2m_changed, sender=School.majors.through)
+def bump_catalog_version(sender, raw=False, **kwargs):
+    """院校目录变更提交后更新目录版本，本进程下次推荐时重新加载"""
+    if raw:
+        return
+    transaction.on_commit(catalog_version.bump)
@@ -0,0 +1,63 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+录取概率蒙特卡洛模拟
+同时对考生预估分数和各院校复试线估计值的不确定性抽样，估计考生分数高于复试线的概率；
+全部院校共用同一组标准正态样本，复试线标准差相同的院校只需排序一次样本，
+每所院校的概率即为一次二分查找
+"""
+
+import numpy as np
+
+# 预估分数的标准差（考前预估与实际成绩的偏差）
+ESTIMATED_SCORE_STD = 10.0
+# 按院校层次估计的复试线的标准差
+CUTOFF_SCORE_STD = 12.0
+# 默认样本数
+DEFAULT_SAMPLES = 10000
+
+# 概率上下限：模拟之外仍有模型未覆盖的风险，不输出0或1
+PROBABILITY_FLOOR = 0.01
+PROBABILITY_CEIL = 0.99
+
+
+def simulate_admission_probabilities(score, score_std, cutoffs, cutoff_stds,
+                                     n_samples=DEFAULT_SAMPLES, seed=None, std_step=0.5):
+    """
+    模拟考生被各院校录取的概率
+
+    参数:
+        score: 考生预估分数，可为数组 (V,)，同时模拟多个假设分数
+        score_std: 预估分数的标准差
+        cutoffs: 各院校复试线 (N,)
+        cutoff_stds: 各院校复试线的标准差 (N,)，可为单个数值
+        n_samples: 样本数
+        seed: 随机种子，指定后结果可复现
+        std_step: 复试线标准差的分组精度
+
+    返回:
+        各院校的录取概率数组（0-1），形状为 (N,)；score为数组时为 (V, N)
+    """
+    cutoffs = np.asarray(cutoffs, dtype=np.float64)
+    if cutoffs.size == 0:
+        return np.zeros(0)
+    cutoff_stds = np.broadcast_to(np.asarray(cutoff_stds, dtype=np.float64), cutoffs.shape)
+
+    rng = np.random.default_rng(seed)
+    student_noise = score_std * rng.standard_normal(n_samples)
+    cutoff_noise = rng.standard_normal(n_samples)
+
+    # 录取当且仅当 score_std·z - σ_j·w > 复试线_j - 预估分数
+    groups, inverse = np.unique(np.round(np.maximum(cutoff_stds, 0) / std_step) * std_step,
+                                return_inverse=True)
+    inverse = inverse.reshape(-1)
+    # 多个假设分数共用同一组样本，分数之间的概率差异不受抽样噪声影响
+    margins = cutoffs - np.asarray(score, dtype=np.float64)[..., None]
+    probabilities = np.empty_like(margins)
+    for g, sigma in enumerate(groups):
+        diffs = np.sort(student_noise - sigma * cutoff_noise)
+        members = inverse == g
+        probabilities[..., members] = 1 - np.searchsorted(diffs, margins[..., members], side='right') / n_samples
+
+    return np.clip(probabilities, PROBABILITY_FLOOR, PROBABILITY_CEIL)
@@ -0,0 +1,53 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+多目标择校的Pareto天际线
+院校A在所有维度上都不差于B且至少一个维度更好时，称A支配B；
+不被任何院校支配的院校构成天际线，即“无法在不牺牲某一方面的前提下找到更好选择”的院校
+
+采用排序过滤天际线（SFS）：按各维度之和降序排列后，后面的点不可能支配前面的点，
+依次按块与已确定的天际线及块内的点做向量化支配判断
+"""
+
+import numpy as np
+
+# 每块处理的候选数（块内两两比较的内存为 块大小^2 × 维数）
+BLOCK_SIZE = 256
+
+
+def _dominated_by(candidates, points):
+    """candidates中的每个点是否被points中的某个点支配 (M,)"""
+    if len(points) == 0 or len(candidates) == 0:
+        return np.zeros(len(candidates), dtype=bool)
+    not_worse = (points[None, :, :] >= candidates[:, None, :]).all(axis=2)
+    better = (points[None, :, :] > candidates[:, None, :]).any(axis=2)
+    return (not_worse & better).any(axis=1)
+
+
+def skyline(values, block_size=BLOCK_SIZE):
+    """
+    计算天际线（各维度越大越好）
+    
+    参数:
+        values: (N, D) 各院校各维度的得分
+        block_size: 每块处理的候选数
+        
+    返回:
+        天际线中的行号数组（按各维度之和降序）
+    """
+    values = np.asarray(values, dtype=float)
+    if len(values) == 0:
+        return np.zeros(0, dtype=np.int64)
+    
+    order = np.argsort(-values.sum(axis=1), kind='stable')
+    result = []
+    front = np.zeros((0, values.shape[1]))
+    for start in range(0, len(order), block_size):
+        block = order[start:start + block_size]
+        # 先与已确定的天际线比较，再在块内剩余的点之间比较
+        block = block[~_dominated_by(values[block], front)]
+        block = block[~_dominated_by(values[block], values[block])]
+        result.append(block)
+        front = np.vstack([front, values[block]])
+    return np.concatenate(result)
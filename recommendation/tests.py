@@ -1,3 +1,161 @@
-from django.test import TestCase
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+from django.test import SimpleTestCase, TestCase
+
+from . import preferences
+from .geo import CityTable
+from .models import School, Student
+from .recommender import SchoolRecommender, catalog_version
+from .skyline import skyline
+from .topk import CatalogVersion, sorted_list, threshold_top_k
+
+
+def _city_rows(count):
+    """生成count个城市的城市参考数据（每省一个城市，均为省会）"""
+    return [
+        {'city': f'城市{i}', 'province': f'省份{i}', 'region': '华东', 'capital': '1', 'tier1': '0',
+         'lat': '30', 'lon': str(100 + i * 0.1), 'cost_index': '0.5'}
+        for i in range(count)
+    ]
+
+
+class PreferenceBitsTests(SimpleTestCase):
+    """偏好位集编码"""
+
+    def setUp(self):
+        preferences.city_vocabulary.cache_clear()
+        self.addCleanup(preferences.city_vocabulary.cache_clear)
+
+    def test_encodes_cities_and_provinces(self):
+        city_index, province_index = preferences.city_vocabulary()
+        city_bits, province_bits = preferences.target_city_bits('北京、上海,四川 一线城市')
+        self.assertEqual(preferences.bit_positions(city_bits),
+                         sorted([city_index['北京'], city_index['上海'], city_index['一线城市']]))
+        self.assertEqual(province_bits, 1 << province_index['四川'])
+
+    def test_city_table_beyond_capacity_is_not_encoded(self):
+        table = CityTable(_city_rows(100))
+        with mock.patch.object(preferences, 'get_city_table', return_value=table):
+            city_index, province_index = preferences.city_vocabulary()
+            self.assertEqual(len(city_index), preferences.MAX_BITS)
+            self.assertEqual(len(province_index), preferences.MAX_BITS)
+            self.assertIn(preferences.TIER1_PREFERENCE, city_index)
+
+            city_bits, _ = preferences.target_city_bits('城市1,城市80')
+            self.assertEqual(city_bits, 1 << city_index['城市1'])
+            self.assertLess(city_bits, 1 << preferences.MAX_BITS)
+            self.assertEqual(preferences.unencoded_cities('城市1,城市80,某市'), ['城市80', '某市'])
+
+            # 没有对应位的城市仍按参考数据中的坐标参与距离衰减
+            places, _ = preferences.preferred_places(city_bits, 0, ['城市80', '某市'])
+            self.assertEqual(sorted(places), [1, 80])
+
+
+class LocationMatchTests(TestCase):
+    """地域偏好匹配"""
+
+    def setUp(self):
+        self.recommender = SchoolRecommender()
+
+    def _student(self, target_cities):
+        student = Student(name='测试', target_cities=target_cities)
+        student.encode_preferences()
+        return student
+
+    def test_exact_city_match(self):
+        school = School.objects.create(name='成都某大学', province='四川', city='成都')
+        self.assertEqual(self.recommender._calculate_location_match(self._student('成都'), school), 100)
+
+    def test_unencoded_city_still_matches_exactly(self):
+        school = School.objects.create(name='某市大学', province='某省', city='某市')
+        self.assertEqual(self.recommender._calculate_location_match(self._student('某市'), school), 100)
+        self.assertEqual(self.recommender._calculate_location_match(self._student('某省'), school), 100)
+
+    def test_tier1_and_distance(self):
+        beijing = School.objects.create(name='北京某大学', province='北京', city='北京')
+        kunming = School.objects.create(name='昆明某大学', province='云南', city='昆明')
+        student = self._student('一线城市')
+        self.assertEqual(self.recommender._calculate_location_match(student, beijing), 90)
+        far = self.recommender._calculate_location_match(self._student('哈尔滨'), kunming)
+        self.assertGreaterEqual(far, 40)
+        self.assertLess(far, 50)
+
+
+class ThresholdTopKTests(SimpleTestCase):
+    """阈值算法Top-K"""
+
+    def test_matches_brute_force_on_random_catalogs(self):
+        rng = np.random.default_rng(0)
+        for n, k, batch_size in [(500, 10, 32), (37, 5, 4), (200, 200, 16), (1, 3, 32)]:
+            values = rng.uniform(0, 100, size=(n, 5))
+            values[rng.random(n) < 0.1] = 50  # 含同分院校
+            weights = rng.dirichlet(np.ones(5))
+            lists = [sorted_list(values[:, d]) for d in range(5)]
+            result = threshold_top_k(lists, lambda v: v @ weights, k, batch_size=batch_size)
+
+            scores = values @ weights
+            expected = np.lexsort((np.arange(n), -scores))[:k]
+            np.testing.assert_array_equal(result['indices'], expected)
+            np.testing.assert_allclose(result['scores'], scores[expected])
+
+    def test_stops_early_on_correlated_dimensions(self):
+        rng = np.random.default_rng(1)
+        base = rng.uniform(0, 100, size=2000)
+        values = np.stack([base + rng.normal(0, 1, size=2000) for _ in range(3)], axis=1)
+        lists = [sorted_list(values[:, d]) for d in range(3)]
+        result = threshold_top_k(lists, lambda v: v.sum(axis=1), 10)
+        self.assertLess(result['scored'], 2000)
+        np.testing.assert_array_equal(result['indices'], np.argsort(-values.sum(axis=1), kind='stable')[:10])
+
+
+class CatalogVersionTests(TestCase):
+    """院校目录版本"""
+
+    def test_query_cached_until_ttl_or_bump(self):
+        query = mock.Mock(side_effect=[('a',), ('b',), ('c',)])
+        version = CatalogVersion(ttl=60)
+        first = version.get(query)
+        self.assertEqual(version.get(query), first)
+        self.assertEqual(query.call_count, 1)
+
+        version.bump()
+        self.assertEqual(version.get(query), (1, ('b',)))
+        with mock.patch('recommendation.topk.time.monotonic', return_value=1e12):
+            self.assertEqual(version.get(query), (1, ('c',)))
+        self.assertEqual(query.call_count, 3)
+
+    def test_school_change_bumps_after_commit(self):
+        generation = catalog_version.generation
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            School.objects.create(name='某大学', province='四川', city='成都')
+            self.assertEqual(catalog_version.generation, generation)
+        self.assertTrue(callbacks)
+        self.assertGreater(catalog_version.generation, generation)
+
+
+def _brute_force_skyline(values):
+    """两两比较求天际线（测试用）"""
+    return [
+        i for i, point in enumerate(values)
+        if not any((other >= point).all() and (other > point).any() for other in values)
+    ]
+
+
+class SkylineTests(SimpleTestCase):
+    """Pareto天际线"""
+
+    def test_no_dominated_point_and_matches_brute_force(self):
+        rng = np.random.default_rng(0)
+        for n, d, block_size in [(300, 2, 256), (300, 4, 16), (50, 3, 7)]:
+            values = rng.integers(0, 10, size=(n, d)).astype(float)  # 取值离散，含重复点
+            front = skyline(values, block_size=block_size)
+            self.assertEqual(sorted(front.tolist()), _brute_force_skyline(values))
+            for i in front:
+                dominated = (values >= values[i]).all(axis=1) & (values > values[i]).any(axis=1)
+                self.assertFalse(dominated.any())
+
+    def test_identical_points_all_kept(self):
+        values = np.array([[1.0, 2.0], [1.0, 2.0], [0.5, 1.0]])
+        self.assertEqual(sorted(skyline(values).tolist()), [0, 1])
+        self.assertEqual(len(skyline(np.zeros((0, 3)))), 0)
@@ -0,0 +1,154 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+加权Top-K院校的阈值算法（Fagin's Threshold Algorithm）
+每个维度维护一个按得分降序排列的院校列表，轮流按顺序读取各列表的下一批院校，
+对新出现的院校随机访问其余维度的得分并计算综合得分；
+各列表当前位置得分的加权和（阈值）是所有尚未出现的院校综合得分的上界，
+第K高的综合得分不低于该上界时即可停止，大部分院校无需参与评分
+
+排序列表只与学生的某几个字段有关（如地域偏好只与目标城市有关），
+按这些字段的取值（画像类别）缓存，同一类别的学生共用
+"""
+
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+# 每轮从每个列表读取的院校数（按批读取便于向量化，阈值取本批最后一个位置的得分）
+BATCH_SIZE = 32
+# 每个维度最多缓存的画像类别数
+MAX_CLASSES = 256
+# 院校目录版本的数据库查询结果缓存的秒数（其他进程修改院校目录后，最迟在此时间后被发现）
+CATALOG_VERSION_TTL = 5.0
+
+
+def sorted_list(values):
+    """
+    生成维度的排序列表
+
+    返回:
+        (按得分降序的院校下标, 按院校下标排列的得分)
+    """
+    values = np.asarray(values, dtype=float)
+    return np.argsort(-values, kind='stable'), values
+
+
+def threshold_top_k(lists, aggregate, k, upper_bound=None, batch_size=BATCH_SIZE):
+    """
+    用阈值算法求综合得分最高的K所院校
+
+    参数:
+        lists: 各维度的排序列表 [(order, values)]，见sorted_list
+        aggregate: 综合得分函数，输入 (M, D) 各院校各维度得分，返回 (M,)
+        k: 返回的院校数
+        upper_bound: 综合得分的单调上界函数（输入输出同aggregate），
+            aggregate本身对各维度单调不减时可省略
+        batch_size: 每轮从每个列表读取的院校数
+
+    返回:
+        字典：indices（按综合得分降序的院校下标）、scores（综合得分）、
+        scored（参与评分的院校数）、depth（各列表读取的深度）
+    """
+    upper_bound = upper_bound or aggregate
+    n = len(lists[0][1]) if lists else 0
+    k = min(k, n)
+    if k <= 0:
+        return {'indices': np.zeros(0, dtype=np.int64), 'scores': np.zeros(0), 'scored': 0, 'depth': 0}
+
+    seen = np.zeros(n, dtype=bool)
+    indices = np.zeros(0, dtype=np.int64)
+    scores = np.zeros(0)
+    depth = 0
+    while depth < n:
+        end = min(depth + batch_size, n)
+        # 顺序读取：各列表的下一批院校中尚未评分的（去重）
+        batch = np.sort(np.concatenate([order[depth:end] for order, _ in lists]))
+        batch = batch[~seen[batch]]
+        if len(batch):
+            batch = batch[np.concatenate(([True], batch[1:] != batch[:-1]))]
+            seen[batch] = True
+            # 随机访问：各维度得分
+            batch_values = np.stack([values[batch] for _, values in lists], axis=1)
+            indices = np.concatenate([indices, batch])
+            scores = np.concatenate([scores, aggregate(batch_values)])
+        depth = end
+
+        if len(scores) >= k and depth < n:
+            threshold = np.array([[values[order[depth - 1]] for order, values in lists]])
+            kth = np.partition(scores, len(scores) - k)[len(scores) - k]
+            if kth >= upper_bound(threshold)[0]:
+                break
+
+    # 同分时按院校下标排序（第K名与未评分院校同分时取已评分的院校）
+    top = np.lexsort((indices, -scores))[:k]
+    return {'indices': indices[top], 'scores': scores[top], 'scored': len(indices), 'depth': depth}
+
+
+class SortedListCache:
+    """
+    各维度按画像类别缓存的排序列表
+
+    院校目录变化（version不同）时清空；每个维度按最近使用保留至多max_classes个类别
+    """
+
+    def __init__(self, max_classes=MAX_CLASSES):
+        self.max_classes = max_classes
+        self.version = None
+        self.catalog = None
+        self._lists = {}
+
+    def reset(self, version, catalog):
+        """更换院校目录"""
+        self.version = version
+        self.catalog = catalog
+        self._lists = {}
+
+    def invalidate(self):
+        self.version = None
+        self.catalog = None
+        self._lists = {}
+
+    def get(self, dimension, key, compute):
+        """
+        获取维度在某画像类别下的排序列表，缺失时调用compute()计算该类别下各院校的得分
+        """
+        lists = self._lists.setdefault(dimension, OrderedDict())
+        if key in lists:
+            lists.move_to_end(key)
+            return lists[key]
+        lists[key] = sorted_list(compute())
+        if len(lists) > self.max_classes:
+            lists.popitem(last=False)
+        return lists[key]
+
+
+class CatalogVersion:
+    """
+    院校目录的版本（进程内）
+
+    版本由本进程的修改计数和数据库聚合查询结果组成：本进程内的修改由信号调用bump()立即生效，
+    其他进程（管理命令、其他工作进程）的修改由至多缓存ttl秒的数据库查询发现，
+    避免每次请求都执行聚合查询
+    """
+
+    def __init__(self, ttl=CATALOG_VERSION_TTL):
+        self.ttl = ttl
+        self.generation = 0
+        self._stored = None
+        self._checked_at = 0.0
+
+    def bump(self):
+        """本进程修改了院校目录"""
+        self.generation += 1
+        self._stored = None
+
+    def get(self, query):
+        """当前版本，查询结果缺失或超过ttl秒时调用query()重新查询数据库"""
+        now = time.monotonic()
+        if self._stored is None or now - self._checked_at >= self.ttl:
+            self._stored = query()
+            self._checked_at = now
+        return (self.generation, self._stored)
@@ -19,6 +19,10 @@ urlpatterns = [
     path('students/<int:pk>/edit/', views.StudentUpdateView.as_view(), name='student_edit'),
     path('students/<int:pk>/delete/', views.StudentDeleteView.as_view(), name='student_delete'),
     path('students/<int:student_id>/recommend/', views.recommend_schools, name='recommend_schools'),
+    path('students/<int:student_id>/what-if/', views.what_if_recommendations, name='what_if_recommendations'),
+    path('students/<int:student_id>/recommend-pairs/', views.pair_recommendations, name='pair_recommendations'),
+    path('students/<int:student_id>/skyline/', views.skyline_recommendations, name='skyline_recommendations'),
+    path('students/<int:student_id>/top-k/', views.top_k_recommendations, name='top_k_recommendations'),
     
     # 学校相关路由
     path('schools/', views.SchoolListView.as_view(), name='school_list'),
@@ -6,13 +6,15 @@
 """
 
 import datetime
+import itertools
+from django.http import JsonResponse
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib import messages
 from django.views.generic import ListView, DetailView, CreateView, UpdateView, DeleteView
 from django.urls import reverse_lazy
 from .models import Student, School, Major, Recommendation, StudyPlan
 from .forms import StudentForm, RecommendationForm, AIRecommendationForm
-from .recommender import SchoolRecommender
+from .recommender import SchoolRecommender, WHAT_IF_FIELDS, MAX_WHAT_IF_VARIANTS, SKYLINE_DIMENSIONS
 
 def index(request):
     """首页"""
@@ -116,6 +118,160 @@ def recommend_schools(request, student_id):
         'student': student,
     })
 
+def _parse_int_list(request, name):
+    """解析逗号分隔或重复出现的整数参数"""
+    values = []
+    for raw in request.GET.getlist(name):
+        values.extend(int(item) for item in raw.split(',') if item.strip())
+    return values
+
+def _parse_recommend_params(request):
+    """解析推荐策略、推荐数量和随机种子参数，无效时抛出ValueError"""
+    try:
+        num_recommendations = int(request.GET.get('num_recommendations', 9))
+        seed = int(request.GET['seed']) if request.GET.get('seed') else None
+    except ValueError:
+        raise ValueError('推荐数量和随机种子必须为整数')
+    strategy = request.GET.get('strategy', 'balanced')
+    if strategy not in ('aggressive', 'conservative', 'balanced'):
+        raise ValueError(f'不支持的推荐策略: {strategy}')
+    if not 1 <= num_recommendations <= 30:
+        raise ValueError('推荐数量必须在1到30之间')
+    return strategy, num_recommendations, seed
+
+def what_if_recommendations(request, student_id):
+    """
+    假设情形分析接口（只读，不保存推荐记录）
+    
+    GET参数:
+        scores: 假设的预估分数，逗号分隔，如 scores=330,350,370
+        offsets: 相对当前预估分数的增减，如 offsets=-20,0,20（与scores二选一）
+        strategy_preference/target_cities/economic_condition/career_direction:
+            假设的偏好取值，可重复给出多个，与分数取值组合成全部情形
+        strategy: 推荐策略（aggressive/conservative/balanced）
+        num_recommendations: 每个情形的推荐学校数量
+        seed: 录取概率模拟的随机种子
+    """
+    student = Student.objects.filter(id=student_id).first()
+    if student is None:
+        return JsonResponse({'status': 'error', 'message': f'学生ID {student_id} 不存在'}, status=404)
+    
+    try:
+        scores = _parse_int_list(request, 'scores')
+        offsets = _parse_int_list(request, 'offsets')
+    except ValueError:
+        return JsonResponse({'status': 'error', 'message': '分数必须为整数'}, status=400)
+    try:
+        strategy, num_recommendations, seed = _parse_recommend_params(request)
+    except ValueError as e:
+        return JsonResponse({'status': 'error', 'message': str(e)}, status=400)
+    
+    if offsets:
+        if scores:
+            return JsonResponse({'status': 'error', 'message': 'scores与offsets不能同时指定'}, status=400)
+        if not student.estimated_score:
+            return JsonResponse({'status': 'error', 'message': '该学生没有预估分数，无法按offsets调整'}, status=400)
+        scores = [student.estimated_score + offset for offset in offsets]
+    
+    # 各字段的候选取值，分数之外的偏好字段需在模型定义的选项内
+    options = [('estimated_score', scores)] if scores else []
+    for field in WHAT_IF_FIELDS:
+        if field == 'estimated_score' or field not in request.GET:
+            continue
+        values = request.GET.getlist(field)
+        choices = Student._meta.get_field(field).choices
+        if choices:
+            valid = {value for value, _ in choices}
+            invalid = [value for value in values if value not in valid]
+            if invalid:
+                return JsonResponse({'status': 'error', 'message': f'{field}取值无效: {", ".join(invalid)}'}, status=400)
+        options.append((field, [value or None for value in values]))
+    
+    fields = [field for field, _ in options]
+    variants = [dict(zip(fields, combination)) for combination in itertools.product(*[values for _, values in options])]
+    if len(variants) > MAX_WHAT_IF_VARIANTS:
+        return JsonResponse({'status': 'error', 'message': f'情形数量不能超过{MAX_WHAT_IF_VARIANTS}个'}, status=400)
+    
+    recommender = SchoolRecommender()
+    result = recommender.what_if(student_id, variants, strategy=strategy,
+                                 num_recommendations=num_recommendations, seed=seed)
+    if result['status'] != 'success':
+        return JsonResponse(result, status=400)
+    return JsonResponse(result, json_dumps_params={'ensure_ascii': False})
+
+def pair_recommendations(request, student_id):
+    """
+    学校×专业组合推荐接口（只读，不保存推荐记录）
+    
+    GET参数:
+        strategy: 推荐策略（aggressive/conservative/balanced）
+        num_recommendations: 推荐组合数量
+        seed: 录取概率模拟的随机种子
+    """
+    if not Student.objects.filter(id=student_id).exists():
+        return JsonResponse({'status': 'error', 'message': f'学生ID {student_id} 不存在'}, status=404)
+    try:
+        strategy, num_recommendations, seed = _parse_recommend_params(request)
+    except ValueError as e:
+        return JsonResponse({'status': 'error', 'message': str(e)}, status=400)
+    
+    recommender = SchoolRecommender()
+    result = recommender.recommend_pairs(student_id, strategy=strategy,
+                                         num_recommendations=num_recommendations, seed=seed)
+    if result['status'] != 'success':
+        return JsonResponse(result, status=400)
+    return JsonResponse(result, json_dumps_params={'ensure_ascii': False})
+
+def skyline_recommendations(request, student_id):
+    """
+    多目标择校接口：返回不被其他院校支配的院校（只读，不保存推荐记录）
+    
+    GET参数:
+        dimensions: 参与比较的维度，逗号分隔，可选 match_score/admission_probability/location/cost，默认全部
+        seed: 录取概率模拟的随机种子
+    """
+    if not Student.objects.filter(id=student_id).exists():
+        return JsonResponse({'status': 'error', 'message': f'学生ID {student_id} 不存在'}, status=404)
+    
+    dimensions = [d.strip() for raw in request.GET.getlist('dimensions') for d in raw.split(',') if d.strip()]
+    invalid = [d for d in dimensions if d not in SKYLINE_DIMENSIONS]
+    if invalid:
+        return JsonResponse({'status': 'error', 'message': f'不支持的维度: {", ".join(invalid)}'}, status=400)
+    if len(set(dimensions)) != len(dimensions):
+        return JsonResponse({'status': 'error', 'message': '维度不能重复'}, status=400)
+    try:
+        seed = int(request.GET['seed']) if request.GET.get('seed') else None
+    except ValueError:
+        return JsonResponse({'status': 'error', 'message': '随机种子必须为整数'}, status=400)
+    
+    recommender = SchoolRecommender()
+    result = recommender.skyline(student_id, dimensions=dimensions or None, seed=seed)
+    if result['status'] != 'success':
+        return JsonResponse(result, status=400)
+    return JsonResponse(result, json_dumps_params={'ensure_ascii': False})
+
+def top_k_recommendations(request, student_id):
+    """
+    综合匹配度最高的K所院校（只读，不保存推荐记录）
+    
+    GET参数:
+        num_recommendations: 返回的院校数（1-30，默认9）
+        strategy: 推荐策略，只影响院校类别的划分
+        seed: 录取概率模拟的随机种子
+    """
+    if not Student.objects.filter(id=student_id).exists():
+        return JsonResponse({'status': 'error', 'message': f'学生ID {student_id} 不存在'}, status=404)
+    try:
+        strategy, num_recommendations, seed = _parse_recommend_params(request)
+    except ValueError as e:
+        return JsonResponse({'status': 'error', 'message': str(e)}, status=400)
+    
+    recommender = SchoolRecommender()
+    result = recommender.top_k_schools(student_id, k=num_recommendations, strategy=strategy, seed=seed)
+    if result['status'] != 'success':
+        return JsonResponse(result, status=400)
+    return JsonResponse(result, json_dumps_params={'ensure_ascii': False})
+
 class SchoolListView(ListView):
     """学校列表视图"""
     model = School
@@ -0,0 +1,43 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+重新计算院校特征表（school_features）
+院校或分数线批量导入后运行；日常增删改由应用自动增量更新
+
+使用方法:
+    python scripts/build_school_features.py
+    python scripts/build_school_features.py --school-ids 1 2 3
+"""
+
+import os
+import sys
+import asyncio
+import argparse
+
+# 设置项目路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.db.base import engine, Base, async_session
+from app.services.school_features import school_feature_store
+
+
+async def build(school_ids):
+    # 确保特征表存在
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    async with async_session() as session:
+        count = await school_feature_store.rebuild(session, school_ids)
+    print(f"已重新计算{count}所院校的特征")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="重新计算院校特征表")
+    parser.add_argument("--school-ids", type=int, nargs="*", help="只重新计算指定院校")
+    args = parser.parse_args()
+    asyncio.run(build(args.school_ids or None))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+重新生成按分数索引的院校分类表（SCORE_TABLE_DIR下的.npy文件）
+分数线批量导入后运行；日常增删改由应用自动重新生成对应省份
+
+使用方法:
+    python scripts/build_score_tables.py
+    python scripts/build_score_tables.py --provinces 重庆 四川
+"""
+
+import os
+import sys
+import asyncio
+import argparse
+
+# 设置项目路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.db.base import async_session
+from app.services.score_tables import score_table_store
+
+
+async def build(provinces):
+    async with async_session() as session:
+        count = await score_table_store.rebuild(session, provinces)
+    print(f"已生成{count}张分类表，保存在{score_table_store.root}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="重新生成按分数索引的院校分类表")
+    parser.add_argument("--provinces", nargs="*", help="只重新生成指定省份")
+    args = parser.parse_args()
+    asyncio.run(build(args.provinces or None))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+批量生成学习计划
+为指定学生（ID列表或按省份/就读学校筛选）批量生成学习计划，逐批输出进度
+
+使用方法:
+    python scripts/bulk_generate_study_plans.py --student-ids 1 2 3 --plan-type overall
+    python scripts/bulk_generate_study_plans.py --province 重庆 --plan-type multi_subject \
+        --duration 1个月 --concurrency 16 --batch-size 100
+"""
+
+import os
+import sys
+import asyncio
+import argparse
+
+# 设置项目路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.config import settings
+from app.db.base import async_session
+from app.services.study_plan_generator import StudyPlanGenerator
+
+
+def print_progress(progress):
+    """输出单批进度"""
+    print(
+        f"第{progress['batch']}/{progress['total_batches']}批完成："
+        f"已处理{progress['processed']}/{progress['total']}名学生，"
+        f"本批成功{progress['created']}、失败{progress['failed']}，"
+        f"累计耗时{progress['elapsed_seconds']}秒"
+    )
+
+
+async def bulk_generate(args):
+    async with async_session() as session:
+        generator = StudyPlanGenerator(
+            session, llm_concurrency=args.concurrency, dedupe_requests=True
+        )
+        result = await generator.generate_bulk_study_plans(
+            student_ids=args.student_ids,
+            province=args.province,
+            current_school=args.current_school,
+            plan_type=args.plan_type,
+            duration=args.duration,
+            focus_subjects=args.focus_subjects,
+            target_score=args.target_score,
+            batch_size=args.batch_size,
+            progress_callback=print_progress,
+        )
+
+    if result["status"] != "success":
+        print(f"批量生成失败: {result['message']}")
+        return
+
+    print(
+        f"共{result['total_students']}名学生，生成{result['created']}份计划，"
+        f"失败{result['failed']}份；LLM请求{result['llm_requests']}次，"
+        f"合并重复请求{result['deduplicated_requests']}次，总耗时{result['elapsed_seconds']}秒"
+    )
+    if result["missing_student_ids"]:
+        print(f"未找到的学生ID: {result['missing_student_ids']}")
+    for error in result["errors"]:
+        print(f"学生{error['student_id']}生成失败: {error['message']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="批量生成学习计划")
+    parser.add_argument("--student-ids", type=int, nargs="*", help="学生ID列表")
+    parser.add_argument("--province", help="按省份筛选学生")
+    parser.add_argument("--current-school", help="按就读学校筛选学生")
+    parser.add_argument(
+        "--plan-type",
+        default="overall",
+        choices=["overall", "weekly", "subject", "multi_subject"],
+    )
+    parser.add_argument("--duration", default="3个月", help="计划时长")
+    parser.add_argument("--focus-subjects", nargs="*", help="重点科目")
+    parser.add_argument("--target-score", type=float, help="目标分数")
+    parser.add_argument("--batch-size", type=int, default=50, help="每批写入的计划数")
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=settings.STUDY_PLAN_BULK_CONCURRENCY,
+        help="LLM并发上限",
+    )
+    args = parser.parse_args()
+
+    if not args.student_ids and not args.province and not args.current_school:
+        parser.error("请指定 --student-ids、--province 或 --current-school")
+
+    asyncio.run(bulk_generate(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+对全部学生画像聚类，并为每个簇预先计算共享的推荐结果（student_clusters表）
+学生数据批量导入后或定期（如每天）运行
+
+使用方法:
+    python scripts/cluster_students.py [簇数]
+"""
+
+import os
+import sys
+import asyncio
+
+# 设置项目路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.db.base import engine, Base, async_session
+from app.services.student_clusters import run_student_clustering
+
+
+async def cluster(n_clusters=None):
+    # 确保簇表存在
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    async with async_session() as session:
+        stats = await run_student_clustering(session, n_clusters)
+    print(
+        f"已将{stats['students']}名学生聚为{stats['clusters']}个簇，"
+        f"聚类耗时{stats['fit_seconds']}秒，总耗时{stats['elapsed_seconds']}秒"
+    )
+
+
+def main():
+    n_clusters = int(sys.argv[1]) if len(sys.argv) > 1 else None
+    asyncio.run(cluster(n_clusters))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+根据历年分数线批量预测下一年分数线（score_forecasts表），并重新生成分类表
+分数线导入或每年新数据发布后运行
+
+使用方法:
+    python scripts/forecast_cutoffs.py
+"""
+
+import os
+import sys
+import asyncio
+
+# 设置项目路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.db.base import engine, Base, async_session
+from app.services.cutoff_forecast import run_cutoff_forecast
+
+
+async def forecast():
+    # 确保预测表存在
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    async with async_session() as session:
+        stats = await run_cutoff_forecast(session)
+    print(
+        f"已根据{stats['observations']}条分数线预测{stats['series']}个序列，"
+        f"拟合耗时{stats['fit_seconds']}秒，总耗时{stats['elapsed_seconds']}秒"
+    )
+
+
+def main():
+    asyncio.run(forecast())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+导入一分一段表（每个省份、年份一个CSV文件）
+CSV列：分数、人数，可选累计人数（也可使用英文列名score、count、cumulative）；
+同一省份、年份重复导入时覆盖原有数据
+
+使用方法:
+    python scripts/import_score_segments.py --province 重庆 --year 2024 data/cq_2024.csv
+"""
+
+import os
+import sys
+import csv
+import asyncio
+import argparse
+
+# 设置项目路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy.future import select
+
+from app.db.base import engine, Base, async_session
+from app.models.score_segment import ScoreSegment
+from app.services.rank_tables import ScoreSegmentError, normalize_segment_rows
+
+# 支持的列名
+COLUMNS = {
+    "score": ["分数", "score"],
+    "count": ["人数", "本段人数", "count"],
+    "cumulative": ["累计人数", "累计", "cumulative"],
+}
+
+
+def read_rows(file_path):
+    """读取CSV文件为(分数, 人数, 累计人数)列表"""
+    with open(file_path, encoding="utf-8-sig", newline="") as f:
+        reader = csv.DictReader(f)
+        fields = {}
+        for key, names in COLUMNS.items():
+            fields[key] = next((name for name in names if name in reader.fieldnames), None)
+        if fields["score"] is None or (fields["count"] is None and fields["cumulative"] is None):
+            raise ScoreSegmentError(f"CSV缺少分数或人数列，现有列: {reader.fieldnames}")
+
+        rows = []
+        for row in reader:
+            score = row[fields["score"]].strip()
+            if not score:
+                continue
+            count = row[fields["count"]].strip() if fields["count"] else "0"
+            cumulative = row[fields["cumulative"]].strip() if fields["cumulative"] else None
+            rows.append((score, count or 0, cumulative))
+        return rows
+
+
+async def import_segments(province, year, file_path):
+    # 确保一分一段表存在
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    scores, cumulative = normalize_segment_rows(read_rows(file_path))
+
+    async with async_session() as session:
+        result = await session.execute(
+            select(ScoreSegment).where(
+                ScoreSegment.province == province, ScoreSegment.year == year
+            )
+        )
+        segment = result.scalars().first()
+        if segment is None:
+            segment = ScoreSegment(province=province, year=year)
+            session.add(segment)
+        segment.scores = scores
+        segment.cumulative = cumulative
+        await session.commit()
+
+    print(f"已导入{province}{year}年一分一段表：{len(scores)}个分数段，共{cumulative[-1]}人")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="导入一分一段表")
+    parser.add_argument("file", help="CSV文件路径")
+    parser.add_argument("--province", required=True, help="省份")
+    parser.add_argument("--year", type=int, required=True, help="年份")
+    args = parser.parse_args()
+    try:
+        asyncio.run(import_segments(args.province, args.year, args.file))
+    except ScoreSegmentError as e:
+        print(f"导入失败: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,282 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+本地OpenAI兼容桩服务
+实现 /v1/chat/completions（含流式输出），用于在不调用真实API的情况下
+对LLM相关链路做可复现的压测（连接池、缓存、限流、熔断等）
+
+使用方法:
+    python scripts/llm_stub_server.py --port 8001 --latency-dist lognormal \
+        --latency-mean-ms 800 --latency-std-ms 300 --error-rate 0.02 --rate-limit-rate 0.05
+
+    # 另一个终端中将应用指向桩服务（需设置任意非空API密钥以启用LLM调用）
+    OPENAI_API_BASE=http://127.0.0.1:8001/v1 OPENAI_API_KEY=stub python main.py
+"""
+
+import os
+import re
+import sys
+import json
+import math
+import time
+import uuid
+import random
+import asyncio
+import argparse
+from collections import Counter
+from typing import Any, Dict, List
+
+from aiohttp import web
+
+# 设置项目路径，复用模拟推荐/学习计划的数据结构
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.llm_service import _mock_llm_recommendation, _mock_llm_study_plan
+
+LATENCY_DISTRIBUTIONS = ["fixed", "uniform", "normal", "lognormal"]
+
+
+class StubConfig:
+    """桩服务行为配置"""
+
+    def __init__(
+        self,
+        latency_dist: str = "fixed",
+        latency_mean_ms: float = 0.0,
+        latency_std_ms: float = 0.0,
+        error_rate: float = 0.0,
+        rate_limit_rate: float = 0.0,
+        retry_after: int = 1,
+        fence_rate: float = 0.0,
+        truncate_rate: float = 0.0,
+        stream_chunk_size: int = 16,
+        stream_chunk_delay_ms: float = 0.0,
+        seed: int = None,
+    ):
+        if latency_dist not in LATENCY_DISTRIBUTIONS:
+            raise ValueError(f"不支持的延迟分布: {latency_dist}")
+        self.latency_dist = latency_dist
+        self.latency_mean_ms = latency_mean_ms
+        self.latency_std_ms = latency_std_ms
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.retry_after = retry_after
+        self.fence_rate = fence_rate
+        self.truncate_rate = truncate_rate
+        self.stream_chunk_size = max(1, stream_chunk_size)
+        self.stream_chunk_delay_ms = stream_chunk_delay_ms
+        self.rng = random.Random(seed)
+
+    def sample_latency(self) -> float:
+        """按配置的分布采样一次响应延迟（秒）"""
+        mean, std = self.latency_mean_ms, self.latency_std_ms
+        if self.latency_dist == "fixed" or mean <= 0:
+            latency = mean
+        elif self.latency_dist == "uniform":
+            latency = self.rng.uniform(max(0.0, mean - std), mean + std)
+        elif self.latency_dist == "normal":
+            latency = self.rng.gauss(mean, std)
+        else:
+            # 对数正态分布：给定均值与标准差反推参数，模拟长尾延迟
+            sigma2 = math.log(1 + (std / mean) ** 2)
+            mu = math.log(mean) - sigma2 / 2
+            latency = self.rng.lognormvariate(mu, math.sqrt(sigma2))
+        return max(0.0, latency) / 1000.0
+
+
+def _estimate_tokens(text: str) -> int:
+    """粗略估计token数量（桩服务仅用于压测统计）"""
+    return max(1, len(text) // 2)
+
+
+def _canned_content(messages: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """根据请求内容生成与模拟数据结构一致的回复"""
+    system = " ".join(m.get("content", "") for m in messages if m.get("role") == "system")
+    prompt = " ".join(m.get("content", "") for m in messages if m.get("role") == "user")
+
+    name_match = re.search(r"姓名[:：]\s*(\S+)", prompt)
+    name = name_match.group(1) if name_match else "学生"
+
+    if "学习规划" not in system:
+        strategy = "balanced"
+        for candidate in ["aggressive", "conservative"]:
+            if f"推荐策略: {candidate}" in prompt or f"策略:{candidate}" in prompt:
+                strategy = candidate
+        return _mock_llm_recommendation({"name": name}, strategy)
+
+    subject_match = re.search(r"的([^\s的，,]+?)学科提升计划", prompt)
+    if subject_match:
+        plan_data = {"type": "subject", "subject": subject_match.group(1)}
+    elif "一周" in prompt:
+        plan_data = {"type": "weekly"}
+    else:
+        plan_data = {"type": "overall"}
+    plan_data["student"] = {"name": name}
+    return _mock_llm_study_plan(plan_data)
+
+
+class StubServer:
+    """OpenAI兼容桩服务"""
+
+    def __init__(self, config: StubConfig):
+        self.config = config
+        self.stats = Counter()
+
+    def _render_content(self, messages: List[Dict[str, Any]]) -> str:
+        """生成回复文本，按配置注入代码块包裹或截断"""
+        content = json.dumps(_canned_content(messages), ensure_ascii=False)
+        if self.config.rng.random() < self.config.truncate_rate:
+            self.stats["truncated"] += 1
+            content = content[: max(1, int(len(content) * self.config.rng.uniform(0.5, 0.95)))]
+        if self.config.rng.random() < self.config.fence_rate:
+            self.stats["fenced"] += 1
+            content = f"以下是结果：\n```json\n{content}\n```\n如需调整请告诉我。"
+        return content
+
+    async def chat_completions(self, request: web.Request) -> web.StreamResponse:
+        """/v1/chat/completions"""
+        self.stats["requests"] += 1
+        body = await request.json()
+        messages = body.get("messages", [])
+        model = body.get("model", "stub-model")
+
+        await asyncio.sleep(self.config.sample_latency())
+
+        roll = self.config.rng.random()
+        if roll < self.config.rate_limit_rate:
+            self.stats["rate_limited"] += 1
+            return web.json_response(
+                {"error": {"message": "Rate limit reached", "type": "rate_limit_error"}},
+                status=429,
+                headers={"Retry-After": str(self.config.retry_after)},
+            )
+        if roll < self.config.rate_limit_rate + self.config.error_rate:
+            self.stats["errors"] += 1
+            return web.json_response(
+                {"error": {"message": "Internal server error", "type": "server_error"}},
+                status=500,
+            )
+
+        content = self._render_content(messages)
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:24]}"
+        created = int(time.time())
+
+        if body.get("stream"):
+            self.stats["streamed"] += 1
+            return await self._stream(request, completion_id, created, model, content)
+
+        self.stats["completed"] += 1
+        prompt_tokens = sum(_estimate_tokens(m.get("content", "")) for m in messages)
+        completion_tokens = _estimate_tokens(content)
+        return web.json_response(
+            {
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": created,
+                "model": model,
+                "choices": [
+                    {
+                        "index": 0,
+                        "message": {"role": "assistant", "content": content},
+                        "finish_reason": "stop",
+                    }
+                ],
+                "usage": {
+                    "prompt_tokens": prompt_tokens,
+                    "completion_tokens": completion_tokens,
+                    "total_tokens": prompt_tokens + completion_tokens,
+                },
+            }
+        )
+
+    async def _stream(
+        self,
+        request: web.Request,
+        completion_id: str,
+        created: int,
+        model: str,
+        content: str,
+    ) -> web.StreamResponse:
+        """以SSE格式分块输出回复"""
+        response = web.StreamResponse(
+            headers={"Content-Type": "text/event-stream", "Cache-Control": "no-cache"}
+        )
+        await response.prepare(request)
+
+        def chunk(delta: Dict[str, Any], finish_reason: str = None) -> bytes:
+            payload = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+            }
+            return f"data: {json.dumps(payload, ensure_ascii=False)}\n\n".encode("utf-8")
+
+        await response.write(chunk({"role": "assistant"}))
+        size = self.config.stream_chunk_size
+        for start in range(0, len(content), size):
+            if self.config.stream_chunk_delay_ms > 0:
+                await asyncio.sleep(self.config.stream_chunk_delay_ms / 1000.0)
+            await response.write(chunk({"content": content[start : start + size]}))
+        await response.write(chunk({}, "stop"))
+        await response.write(b"data: [DONE]\n\n")
+        await response.write_eof()
+        return response
+
+    async def get_stats(self, request: web.Request) -> web.Response:
+        """/stats：请求统计，便于压测后核对"""
+        return web.json_response(dict(self.stats))
+
+    async def reset_stats(self, request: web.Request) -> web.Response:
+        """DELETE /stats：清空统计"""
+        self.stats.clear()
+        return web.json_response({"message": "统计已清空"})
+
+
+def create_app(config: StubConfig) -> web.Application:
+    """创建桩服务应用"""
+    server = StubServer(config)
+    app = web.Application()
+    app.router.add_post("/v1/chat/completions", server.chat_completions)
+    app.router.add_get("/stats", server.get_stats)
+    app.router.add_delete("/stats", server.reset_stats)
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="本地OpenAI兼容桩服务")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--latency-dist", choices=LATENCY_DISTRIBUTIONS, default="fixed")
+    parser.add_argument("--latency-mean-ms", type=float, default=0.0, help="平均延迟（毫秒）")
+    parser.add_argument("--latency-std-ms", type=float, default=0.0, help="延迟标准差/半宽（毫秒）")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="返回500的概率")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="返回429的概率")
+    parser.add_argument("--retry-after", type=int, default=1, help="429响应的Retry-After秒数")
+    parser.add_argument("--fence-rate", type=float, default=0.0, help="回复包裹Markdown代码块的概率")
+    parser.add_argument("--truncate-rate", type=float, default=0.0, help="回复被截断的概率")
+    parser.add_argument("--stream-chunk-size", type=int, default=16, help="流式输出每块字符数")
+    parser.add_argument("--stream-chunk-delay-ms", type=float, default=0.0, help="流式输出块间延迟")
+    parser.add_argument("--seed", type=int, default=None, help="随机种子，保证压测可复现")
+    args = parser.parse_args()
+
+    config = StubConfig(
+        latency_dist=args.latency_dist,
+        latency_mean_ms=args.latency_mean_ms,
+        latency_std_ms=args.latency_std_ms,
+        error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate,
+        retry_after=args.retry_after,
+        fence_rate=args.fence_rate,
+        truncate_rate=args.truncate_rate,
+        stream_chunk_size=args.stream_chunk_size,
+        stream_chunk_delay_ms=args.stream_chunk_delay_ms,
+        seed=args.seed,
+    )
+    web.run_app(create_app(config), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+录取概率蒙特卡洛模拟测试
+"""
+
+import math
+
+import numpy as np
+
+from app.services.admission_simulator import (
+    PROBABILITY_CEIL,
+    PROBABILITY_FLOOR,
+    simulate_admission_probabilities,
+)
+
+
+def _exact(score, score_std, cutoffs, cutoff_stds):
+    """两个正态分布之差大于0的概率（解析解）"""
+    return np.array(
+        [
+            0.5 * (1 + math.erf((score - c) / math.sqrt(2 * (score_std ** 2 + s ** 2))))
+            for c, s in zip(cutoffs, cutoff_stds)
+        ]
+    )
+
+
+def test_matches_normal_closed_form():
+    cutoffs = np.array([560, 580, 590, 600, 610, 620, 640], dtype=float)
+    stds = np.array([3.0, 5.0, 8.0, 0.0, 5.0, 12.0, 4.0])
+    probabilities = simulate_admission_probabilities(
+        595, 10, cutoffs, stds, n_samples=200000, seed=0
+    )
+    expected = np.clip(_exact(595, 10, cutoffs, stds), PROBABILITY_FLOOR, PROBABILITY_CEIL)
+    np.testing.assert_allclose(probabilities, expected, atol=0.01)
+
+
+def test_monotone_in_cutoff_and_reproducible():
+    cutoffs = np.linspace(550, 650, 101)
+    first = simulate_admission_probabilities(600, 8, cutoffs, 5.0, seed=42)
+    assert (np.diff(first) <= 0).all()
+    np.testing.assert_array_equal(
+        first, simulate_admission_probabilities(600, 8, cutoffs, 5.0, seed=42)
+    )
+    assert first.min() >= PROBABILITY_FLOOR and first.max() <= PROBABILITY_CEIL
+    assert simulate_admission_probabilities(600, 8, [], []).size == 0
@@ -0,0 +1,165 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+熔断器与对冲请求测试
+"""
+
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from app.services import circuit_breaker
+from app.services.circuit_breaker import CircuitBreaker, CircuitOpenError, hedged_call
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    # 只替换熔断器模块中的time，事件循环仍使用真实时钟
+    monkeypatch.setattr(circuit_breaker, "time", SimpleNamespace(monotonic=fake))
+    return fake
+
+
+async def _fail():
+    raise RuntimeError("down")
+
+
+async def _ok():
+    return "ok"
+
+
+def _trip(breaker):
+    for _ in range(breaker.failure_threshold):
+        with pytest.raises(RuntimeError):
+            asyncio.run(breaker.call(_fail))
+
+
+def test_breaker_opens_half_opens_and_closes(clock):
+    breaker = CircuitBreaker("test", failure_threshold=3, recovery_timeout=30)
+    _trip(breaker)
+    assert breaker.state == CircuitBreaker.OPEN
+    with pytest.raises(CircuitOpenError):
+        asyncio.run(breaker.call(_ok))
+    assert breaker.snapshot()["short_circuited"] == 1
+
+    clock.now += 30
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert asyncio.run(breaker.call(_ok)) == "ok"
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_half_open_failure_reopens(clock):
+    breaker = CircuitBreaker("test", failure_threshold=2, recovery_timeout=10)
+    _trip(breaker)
+    clock.now += 10
+    with pytest.raises(RuntimeError):
+        asyncio.run(breaker.call(_fail))
+    assert breaker.state == CircuitBreaker.OPEN
+
+
+def test_half_open_allows_one_probe_at_a_time(clock):
+    breaker = CircuitBreaker("test", failure_threshold=1, recovery_timeout=5)
+    _trip(breaker)
+    clock.now += 5
+
+    async def main():
+        started = asyncio.Event()
+
+        async def slow():
+            started.set()
+            await asyncio.sleep(0.05)
+            return "probe"
+
+        probe = asyncio.ensure_future(breaker.call(slow))
+        await started.wait()
+        with pytest.raises(CircuitOpenError):
+            await breaker.call(_ok)
+        return await probe
+
+    assert asyncio.run(main()) == "probe"
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_cancelled_probe_does_not_wedge_half_open(clock):
+    breaker = CircuitBreaker("test", failure_threshold=1, recovery_timeout=5)
+    _trip(breaker)
+    clock.now += 5
+
+    async def main():
+        probe = asyncio.ensure_future(breaker.call(lambda: asyncio.sleep(10)))
+        await asyncio.sleep(0)
+        probe.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await probe
+        # 名额已归还，下一个探测可以放行并关闭熔断器
+        return await breaker.call(_ok)
+
+    assert asyncio.run(main()) == "ok"
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_hedge_returns_faster_request_and_cancels_slow_one():
+    calls = []
+
+    async def main():
+        async def request():
+            index = len(calls)
+            calls.append("started")
+            try:
+                await asyncio.sleep(1.0 if index == 0 else 0.01)
+            except asyncio.CancelledError:
+                calls[index] = "cancelled"
+                raise
+            return index
+
+        result = await hedged_call(request, hedge_delay=0.02)
+        await asyncio.sleep(0)
+        return result
+
+    assert asyncio.run(main()) == 1
+    assert calls == ["cancelled", "started"]
+
+
+def test_hedge_not_sent_when_first_fails_fast():
+    calls = []
+
+    async def request():
+        calls.append(1)
+        raise RuntimeError("bad request")
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(hedged_call(request, hedge_delay=1.0))
+    assert len(calls) == 1
+
+
+def test_hedge_cancels_requests_when_caller_is_cancelled():
+    cancelled = []
+
+    async def main():
+        async def request():
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.append(1)
+                raise
+
+        outer = asyncio.ensure_future(hedged_call(request, hedge_delay=5.0))
+        await asyncio.sleep(0.01)
+        outer.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await outer
+        await asyncio.sleep(0)
+        # 在事件循环结束（会取消全部剩余任务）之前检查
+        return list(cancelled)
+
+    assert asyncio.run(main()) == [1]
@@ -0,0 +1,47 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+LLM回复容错JSON解析测试
+"""
+
+from app.services.llm_json import parse_llm_json, validate_recommendation
+
+REPLY = '{"challenge": [{"name": "北京大学", "match": "60%"}], "safety": [{"name": "四川大学", "match": 0.9}]}'
+
+
+def test_plain_json():
+    assert parse_llm_json(REPLY)["safety"][0]["name"] == "四川大学"
+
+
+def test_code_fence_and_surrounding_text():
+    content = f"以下是推荐结果：\n```json\n{REPLY}\n```\n希望对你有帮助。"
+    assert parse_llm_json(content) == parse_llm_json(REPLY)
+
+    # 代码块未闭合（回复在代码块中被截断）
+    assert parse_llm_json(f"```json\n{REPLY}") == parse_llm_json(REPLY)
+
+
+def test_trailing_comma():
+    assert parse_llm_json('{"goals": ["每天练习", "每周复盘",],}') == {"goals": ["每天练习", "每周复盘"]}
+
+
+def test_truncated_array_keeps_complete_items():
+    content = REPLY[: REPLY.index("0.9") - 2]  # 截断在最后一所学校的match字段中
+    data = parse_llm_json(content)
+    assert [school["name"] for school in data["challenge"]] == ["北京大学"]
+    assert data["safety"] == [{"name": "四川大学"}]
+
+
+def test_truncated_inside_string_drops_partial_value():
+    content = '{"challenge": [{"name": "北京大学"}, {"name": "清华大'
+    data = parse_llm_json(content, validate_recommendation)
+    assert [school["name"] for school in data["challenge"]] == ["北京大学"]
+
+
+def test_validator_normalizes_and_rejects():
+    data = parse_llm_json(REPLY, validate_recommendation)
+    assert data["challenge"][0]["match"] == 0.6
+    assert data["challenge"][0]["recommended_majors"] == []
+    assert parse_llm_json('{"challenge": [{"name": ""}]}', validate_recommendation) is None
+    assert parse_llm_json("抱歉，我无法回答这个问题。") is None
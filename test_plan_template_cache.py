@@ -0,0 +1,70 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+学习计划模板缓存测试
+"""
+
+from app.services.plan_template_cache import (
+    PlanTemplateCache,
+    make_template_key,
+    render,
+    templated_request,
+)
+
+
+def _subject_plan(name, score, strengths, weaknesses):
+    return {
+        "type": "subject",
+        "duration": "1个月",
+        "subject": "数学",
+        "student": {
+            "name": name,
+            "subject_score": score,
+            "strengths": strengths,
+            "weaknesses": weaknesses,
+        },
+    }
+
+
+def test_key_separates_strengths_and_weaknesses():
+    """优势/弱项不同的学生不共用模板"""
+    weak = _subject_plan("张三", 80, ["语文"], ["数学"])
+    strong = _subject_plan("李四", 85, ["数学"], ["英语"])
+    neither = _subject_plan("王五", 88, ["语文"], ["英语"])
+    keys = {make_template_key(plan) for plan in (weak, strong, neither)}
+    assert len(keys) == 3
+
+    # 学科计划只关心该学科是否为优势/弱项
+    assert make_template_key(neither) == make_template_key(
+        _subject_plan("赵六", 81, ["物理"], ["化学"])
+    )
+
+
+def test_templated_request_hides_name_and_scores():
+    plan_data = {
+        "type": "overall",
+        "duration": "3个月",
+        "student": {"name": "张三", "total_score": 505, "weaknesses": ["数学"]},
+    }
+    request = templated_request(plan_data)
+    assert request["student"]["name"] == "{{name}}"
+    assert request["student"]["total_score"].startswith("{{total_score}}")
+    assert "505" not in str(request)
+    assert request["student"]["weaknesses"] == ["数学"]
+    # 原参数不被修改
+    assert plan_data["student"]["name"] == "张三"
+
+
+def test_render_keeps_zero_scores():
+    template = {"overview": "{{name}}的数学从{{subject_score}}分起步", "goals": ["每天练习90分钟"]}
+    plan = render(template, _subject_plan("张三", 0, [], ["数学"]))
+    assert plan == {"overview": "张三的数学从0分起步", "goals": ["每天练习90分钟"]}
+
+
+def test_cache_hit_renders_for_requesting_student():
+    cache = PlanTemplateCache()
+    cache.put(_subject_plan("张三", 80, [], ["数学"]), {"overview": "{{name}}: {{subject_score}}"})
+    assert cache.get(_subject_plan("李四", 85, [], ["数学"])) == {"overview": "李四: 85"}
+    assert cache.get(_subject_plan("王五", 85, ["数学"], [])) is None
+    assert cache.stats()["hits"] == 1
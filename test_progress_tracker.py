@@ -0,0 +1,100 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+学习计划进度跟踪测试
+"""
+
+import asyncio
+from datetime import date
+
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.future import select
+from sqlalchemy.orm import sessionmaker
+
+import app.models  # noqa: F401  注册全部模型
+from app.db.base import Base
+from app.models.student import Student
+from app.models.study_plan import StudyPlan, StudyPlanProgressEvent
+from app.services.progress_tracker import get_progress, record_progress, set_task_completed
+
+
+def _run(tmp_path, scenario):
+    """在临时数据库中为一个学习计划执行scenario(db, plan_id)"""
+
+    async def main():
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'progress.db'}")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        session_factory = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+        async with session_factory() as db:
+            student = Student(name="张三", province="四川")
+            db.add(student)
+            await db.flush()
+            plan = StudyPlan(student_id=student.id, title="测试计划")
+            db.add(plan)
+            await db.commit()
+            result = await scenario(db, plan.id)
+        await engine.dispose()
+        return result
+
+    return asyncio.run(main())
+
+
+def test_summary_accumulates_across_batches(tmp_path):
+    async def scenario(db, plan_id):
+        await record_progress(db, plan_id, [{"event_type": "hours_logged", "hours": 1.5}])
+        await record_progress(
+            db,
+            plan_id,
+            [{"event_type": "task_completed"}, {"event_type": "check_in", "hours": 0.5}],
+        )
+        return await get_progress(db, plan_id)
+
+    progress = _run(tmp_path, scenario)
+    assert progress["hours_logged"] == 2.0
+    assert progress["tasks_completed"] == 1
+    assert progress["check_ins"] == 1
+    assert progress["events_count"] == 3
+    assert progress["last_event_type"] == "check_in"
+
+
+def test_retried_events_are_recorded_once(tmp_path):
+    batch = [
+        {"event_id": "a", "event_type": "hours_logged", "hours": 1.0},
+        {"event_id": "a", "event_type": "hours_logged", "hours": 1.0},
+        {"event_id": "b", "event_type": "task_completed"},
+        {"event_type": "check_in"},
+    ]
+
+    async def scenario(db, plan_id):
+        first = await record_progress(db, plan_id, batch)
+        retried = await record_progress(db, plan_id, batch[:3])
+        result = await db.execute(
+            select(StudyPlanProgressEvent).where(StudyPlanProgressEvent.plan_id == plan_id)
+        )
+        return first, retried, len(result.scalars().all()), await get_progress(db, plan_id)
+
+    first, retried, stored, progress = _run(tmp_path, scenario)
+    assert (first, retried, stored) == (3, 0, 3)
+    assert progress["hours_logged"] == 1.0
+    assert progress["tasks_completed"] == 1
+    assert progress["events_count"] == 3
+
+
+def test_task_completion_counted_once_per_change(tmp_path):
+    task_date = date(2024, 3, 1)
+
+    async def scenario(db, plan_id):
+        changes = [
+            await set_task_completed(db, plan_id, task_date, True),
+            await set_task_completed(db, plan_id, task_date, True),
+            await set_task_completed(db, plan_id, task_date, False),
+        ]
+        await db.commit()
+        return changes, await get_progress(db, plan_id)
+
+    changes, progress = _run(tmp_path, scenario)
+    assert changes == [True, False, True]
+    assert progress["tasks_completed"] == 0
+    assert progress["events_count"] == 2
@@ -0,0 +1,81 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+院校属性位图索引测试
+"""
+
+import random
+from types import SimpleNamespace
+
+import pytest
+
+from app.services.school_bitmap_index import BitmapFilterError, SchoolBitmapIndex
+
+PROVINCES = ["北京", "上海", "四川", "湖北"]
+TYPES = ["综合", "理工", "师范"]
+
+
+def _schools(n=200, seed=0):
+    rng = random.Random(seed)
+    return [
+        SimpleNamespace(
+            id=i + 1,
+            rank=rng.choice([None, rng.randint(1, 500)]),
+            province=rng.choice(PROVINCES),
+            city=None,
+            type=rng.choice(TYPES),
+            level="本科",
+            nature="公办",
+            is_985=rng.random() < 0.2,
+            is_211=rng.random() < 0.4,
+            is_double_first_class=False,
+        )
+        for i in range(n)
+    ]
+
+
+def test_expressions_match_linear_filter():
+    schools = _schools()
+    index = SchoolBitmapIndex()
+    index.build(schools)
+    cases = [
+        ({}, lambda s: True),
+        ({"province": "四川"}, lambda s: s.province == "四川"),
+        ({"province": ["北京", "上海"], "is_985": True},
+         lambda s: s.province in ("北京", "上海") and s.is_985),
+        ({"or": [{"is_985": True}, {"type": "师范"}]}, lambda s: s.is_985 or s.type == "师范"),
+        ({"not": {"province": "湖北"}, "is_211": False},
+         lambda s: s.province != "湖北" and not s.is_211),
+        ({"and": [{"type": "理工"}, {"not": {"or": [{"is_985": True}, {"province": "北京"}]}}]},
+         lambda s: s.type == "理工" and not (s.is_985 or s.province == "北京")),
+        ({"city": "成都"}, lambda s: False),
+    ]
+    for expression, predicate in cases:
+        expected = {s.id for s in schools if predicate(s)}
+        assert index.query(expression) == expected, expression
+        assert index.count(index.evaluate(expression)) == len(expected)
+
+
+def test_ids_follow_rank_order_and_paginate():
+    schools = _schools(50)
+    index = SchoolBitmapIndex()
+    index.build(schools)
+    bitmap = index.evaluate({"is_211": True})
+    ordered = [
+        s.id
+        for s in sorted(schools, key=lambda s: (s.rank is None, s.rank or 0, s.id))
+        if s.is_211
+    ]
+    assert index.ids(bitmap) == ordered
+    assert index.ids(bitmap, skip=3, limit=5) == ordered[3:8]
+    assert index.bitmap_of(ordered + [9999]) == bitmap
+    assert all(index.contains(bitmap, school_id) for school_id in ordered)
+
+
+def test_invalid_expressions_raise():
+    index = SchoolBitmapIndex()
+    index.build(_schools(5))
+    for expression in [{"name": "某大学"}, {"is_985": "yes"}, {"or": []}, ["province"]]:
+        with pytest.raises(BitmapFilterError):
+            index.evaluate(expression)
@@ -0,0 +1,46 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+学生画像聚类测试
+"""
+
+import numpy as np
+
+from app.services.student_clusters import assign_clusters, minibatch_kmeans
+
+
+def _blobs(n_per_blob=400, n_blobs=5, dim=8, seed=0):
+    rng = np.random.default_rng(seed)
+    centers = rng.uniform(-10, 10, size=(n_blobs, dim))
+    labels = np.repeat(np.arange(n_blobs), n_per_blob)
+    return centers[labels] + rng.standard_normal((len(labels), dim)) * 0.3, labels, centers
+
+
+def test_assign_clusters_matches_brute_force():
+    rng = np.random.default_rng(1)
+    points = rng.standard_normal((1000, 6))
+    centroids = rng.standard_normal((7, 6))
+    labels, distances = assign_clusters(points, centroids, chunk_size=128)
+    squared = ((points[:, None, :] - centroids[None, :, :]) ** 2).sum(axis=2)
+    np.testing.assert_array_equal(labels, squared.argmin(axis=1))
+    np.testing.assert_allclose(distances, squared.min(axis=1), atol=1e-9)
+
+
+def test_minibatch_kmeans_recovers_separated_blobs():
+    points, truth, centers = _blobs()
+    centroids, labels = minibatch_kmeans(points, 5, batch_size=256, n_iter=100, seed=0)
+    assert len(centroids) == 5
+    # 每个真实簇整体落入同一个簇，且簇中心接近真实中心
+    for blob in range(5):
+        assert len(np.unique(labels[truth == blob])) == 1
+    nearest = np.linalg.norm(centers[:, None, :] - centroids[None, :, :], axis=2).min(axis=1)
+    assert nearest.max() < 0.2
+
+
+def test_minibatch_kmeans_with_fewer_points_than_clusters():
+    points = np.array([[0.0, 0.0], [5.0, 5.0], [5.0, 5.0]])
+    centroids, labels = minibatch_kmeans(points, 10, seed=0)
+    assert len(centroids) <= 3
+    assert labels.min() >= 0 and labels.max() < len(centroids)
+    assert labels[1] == labels[2] != labels[0]
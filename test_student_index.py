@@ -0,0 +1,71 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+学生画像LSH索引测试
+"""
+
+import numpy as np
+
+from app.services import student_index as student_index_module
+from app.services.student_index import EMBEDDING_DIM, StudentANNIndex
+
+
+def _clustered_vectors(n=6000, n_clusters=60, noise=0.05, seed=0):
+    """围绕若干中心的单位向量（相似学生成簇出现）"""
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((n_clusters, EMBEDDING_DIM))
+    vectors = centers[rng.integers(0, n_clusters, n)] + noise * rng.standard_normal((n, EMBEDDING_DIM))
+    return (vectors / np.linalg.norm(vectors, axis=1, keepdims=True)).astype(np.float32)
+
+
+def _brute_force(vectors, ids, vector, k, exclude_id=None):
+    similarities = vectors @ vector
+    order = [i for i in np.argsort(-similarities, kind="stable") if ids[i] != exclude_id]
+    return [int(ids[i]) for i in order[:k]]
+
+
+def test_exact_path_matches_brute_force():
+    vectors = _clustered_vectors(500)
+    ids = np.arange(1, 501)
+    index = StudentANNIndex()
+    index.add_many(ids.tolist(), vectors)
+    for row in [0, 17, 250]:
+        result = index.query(vectors[row], k=10, exclude_id=int(ids[row]))
+        assert [student_id for student_id, _ in result] == _brute_force(
+            vectors, ids, vectors[row], 10, exclude_id=int(ids[row])
+        )
+        similarities = [similarity for _, similarity in result]
+        assert similarities == sorted(similarities, reverse=True)
+
+
+def test_lsh_recall_on_clustered_profiles(monkeypatch):
+    monkeypatch.setattr(student_index_module, "EXACT_SEARCH_MAX", 0)
+    vectors = _clustered_vectors()
+    ids = np.arange(1, len(vectors) + 1)
+    index = StudentANNIndex()
+    # 先批量写入一半再逐批追加，覆盖合并部分与待合并桶
+    index.add_many(ids[:3000].tolist(), vectors[:3000])
+    for start in range(3000, len(vectors), 500):
+        index.add_many(ids[start : start + 500].tolist(), vectors[start : start + 500])
+
+    recalls = []
+    for row in range(0, len(vectors), 150):
+        expected = set(_brute_force(vectors, ids, vectors[row], 10, exclude_id=int(ids[row])))
+        found = {student_id for student_id, _ in index.query(vectors[row], 10, exclude_id=int(ids[row]))}
+        recalls.append(len(found & expected) / 10)
+    assert np.mean(recalls) >= 0.9
+
+
+def test_removed_and_updated_students():
+    vectors = _clustered_vectors(100)
+    index = StudentANNIndex()
+    index.add_many(range(1, 101), vectors)
+    index.remove(2)
+    assert 2 not in {student_id for student_id, _ in index.query(vectors[1], k=100)}
+
+    # 更新后按新向量查找
+    index.add_many([3], -vectors[2:3])
+    best_id, _ = index.query(-vectors[2], k=1)[0]
+    assert best_id == 3
+    assert len(index) == 99
@@ -0,0 +1,86 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+批量生成学习计划测试（LLM接口以本地函数代替）
+"""
+
+import asyncio
+import json
+
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+import app.models  # noqa: F401  注册全部模型
+from app.core.config import settings
+from app.db.base import Base
+from app.models.student import Student
+from app.services import llm_service
+from app.services.plan_template_cache import plan_template_cache
+from app.services.study_plan_generator import StudyPlanGenerator
+
+
+def _run_bulk(tmp_path, monkeypatch, students):
+    """为给定学生批量生成学科计划，返回(生成结果, LLM收到的用户消息)"""
+    prompts = []
+
+    async def fake_chat_completion(messages, kind):
+        prompts.append(messages[-1]["content"])
+        await asyncio.sleep(0.01)
+        return json.dumps(
+            {
+                "overview": "{{name}}的数学从{{subject_score}}分开始提升",
+                "goals": ["每天练习90分钟"],
+                "milestones": [{"week": 2, "target": "巩固基础"}],
+            },
+            ensure_ascii=False,
+        )
+
+    monkeypatch.setattr(settings, "OPENAI_API_KEY", "test-key")
+    monkeypatch.setattr(settings, "STUDY_PLAN_CACHE_ENABLED", True)
+    monkeypatch.setattr(llm_service, "_chat_completion", fake_chat_completion)
+    plan_template_cache.clear()
+
+    async def main():
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'bulk.db'}")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        session_factory = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+        async with session_factory() as db:
+            db.add_all(Student(**fields) for fields in students)
+            await db.commit()
+            generator = StudyPlanGenerator(db, llm_concurrency=4, dedupe_requests=True)
+            result = await generator.generate_bulk_study_plans(
+                province="四川", plan_type="subject", focus_subjects=["数学"], duration="1个月"
+            )
+        await engine.dispose()
+        return result
+
+    result = asyncio.run(main())
+    plan_template_cache.clear()
+    return result, prompts
+
+
+def test_bulk_dedupes_students_with_same_profile(tmp_path, monkeypatch):
+    students = [
+        {"name": name, "province": "四川", "math_score": score, "weaknesses": ["数学"]}
+        for name, score in [("张三", 101), ("李四", 105), ("王五", 110)]
+    ]
+    result, prompts = _run_bulk(tmp_path, monkeypatch, students)
+    assert result["created"] == 3
+    assert result["llm_requests"] == 1
+    assert result["deduplicated_requests"] == 2
+    # LLM只看到占位符，看不到具体学生的姓名和分数
+    assert "张三" not in prompts[0] and "101" not in prompts[0]
+
+
+def test_bulk_requests_each_weakness_profile(tmp_path, monkeypatch):
+    students = [
+        {"name": "张三", "province": "四川", "math_score": 101, "weaknesses": ["数学"]},
+        {"name": "李四", "province": "四川", "math_score": 105, "weaknesses": ["英语"]},
+    ]
+    result, prompts = _run_bulk(tmp_path, monkeypatch, students)
+    assert result["created"] == 2
+    assert result["llm_requests"] == 2
+    assert result["deduplicated_requests"] == 0
+    assert sorted("是否弱项:是" in prompt for prompt in prompts) == [False, True]